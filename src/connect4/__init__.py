@@ -0,0 +1,3 @@
+# Connect 4 agents: the boards (connect4.board), the Minimax and MCTS agents
+# and the tools around them (tournaments, benchmarks, self-play, tuning, the
+# move service). The command line interface is in cli.py.
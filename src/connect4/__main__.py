@@ -0,0 +1,5 @@
+from connect4.cli import main
+import sys
+
+# python -m connect4 (same as the connect4 command)
+sys.exit(main())
@@ -0,0 +1,366 @@
+# Have the agents battle entire games
+
+from connect4.board.board import make_board, BACKENDS, ROWS, COLUMNS, CONNECT
+from math import sqrt, log10
+from time import perf_counter
+import argparse
+import json
+import os
+import random
+
+# Tournament runner: every pair of agents plays a number of game sets (one
+# start per agent) and the games are spread over a process pool. Each game
+# gets its own seed, so a game can be replayed on its own, and each result is
+# written to a JSONL file as soon as the game finishes.
+#
+# Agents are given as "minimax:depth=4,heuristic=1" or
+# "mcts:iterations=1000,exploration=1.41" (or the same dicts in a JSON file).
+# A Minimax agent's evaluator=... is an evaluator name or a JSON file saved
+# by tuning.py (see evaluators.py). With ponder=true an agent searches on
+# its opponent's time (see start_pondering), but both agents of a game run
+# in the same process, so the pondering thread also slows the opponent.
+# time=... (milliseconds, both agents) is given to get_move: Minimax then
+# searches with iterative deepening and MCTS searches until the time is up
+# or its move can't change any more. book=... is an opening book file (see
+# opening_book.py) whose moves the agent plays without searching.
+#
+# Examples:
+#   python -m connect4.battle_agents --agent minimax:depth=4 --agent mcts:iterations=1000 --games 50
+#   python -m connect4.battle_agents --config agents.json --output results.jsonl
+#   python -m connect4.battle_agents --agent minimax:depth=4 --agent mcts:iterations=1000 --rows 8 --connect 5
+
+# Read a true/false option ("1", "true" or true)
+def parse_bool(value):
+    return value in (True, 1, "1", "true", "True")
+
+# Agent type -> {option: (Agent argument, type, default)} (None defaults are
+# left to the agent)
+AGENT_OPTIONS = {
+    "minimax": {"depth": ("search_depth", int, 4), "heuristic": ("heuristic_number", int, 1),
+                "solve_below": ("solve_below", int, 0), "symmetry": ("symmetry", parse_bool, False),
+                "evaluator": ("evaluator", str, None), "workers": ("workers", int, 1),
+                "ponder": ("ponder", parse_bool, False), "book": ("opening_book", str, None)},
+    "mcts": {"iterations": ("number_of_simulations", int, 1000),
+             "exploration": ("exploration_paremeter", float, sqrt(2)),
+             "symmetry": ("symmetry", parse_bool, False), "ponder": ("ponder", parse_bool, False),
+             "solver": ("solver", parse_bool, False), "rave": ("rave", float, 0),
+             "bias": ("progressive_bias", float, 0), "evaluator": ("evaluator", str, None),
+             "book": ("opening_book", str, None), "tree": ("tree", str, "pool")},
+}
+
+# Options of every agent type that are given to get_move instead of the
+# agent: {option: (get_move argument, type)}
+MOVE_OPTIONS = {"time": ("time_limit_ms", float)}
+
+# z value of a 95% confidence interval
+Z_95 = 1.96
+
+# Board shape of the games: (rows, columns, pieces in a row to win)
+STANDARD_SHAPE = (ROWS, COLUMNS, CONNECT)
+
+
+
+# Battle 2 games, return the first agent's wins, second agent's wins, and ties.
+# backend chooses the board implementation (see board.make_board).
+def battle_agents(agent1_move_rule, agent2_move_rule, backend="bitboard", shape=STANDARD_SHAPE):
+
+    start = [-1, 1]
+    agent1_wins = 0
+    agent2_wins = 0
+    ties = 0
+    # Agent 1 will be -1, agent 2 will be 1
+
+    for starting_player in start:
+        board = make_board(starting_player, backend, *shape)
+
+        while(1):
+            # Check turn
+            turn = board.get_turn()
+
+            # If first agent's turn
+            if(turn == -1):
+                move = agent1_move_rule(board)
+                board.move(move)
+                # Did agent win?
+                if(board.check_win(turn)):
+                    agent1_wins += 1
+                    break
+            # If second agent's turn
+            else:
+                move = agent2_move_rule(board)
+                board.move(move)
+                # Did agent win?
+                if(board.check_win(turn)):
+                    agent2_wins += 1
+                    break
+            # If tie
+            if(board.check_full()):
+                ties += 1
+                break
+    return agent1_wins, agent2_wins, ties
+
+
+# Parse "type:option=value,option=value" into an agent config dict
+def parse_agent(spec):
+    agent_type, _, options = spec.partition(":")
+    if(agent_type not in AGENT_OPTIONS):
+        raise ValueError(f"Unknown agent type '{agent_type}' (choose from {', '.join(AGENT_OPTIONS)})")
+    config = {"type": agent_type}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if(key == "name"):
+            config["name"] = value
+        elif(key in AGENT_OPTIONS[agent_type]):
+            config[key] = AGENT_OPTIONS[agent_type][key][1](value)
+        elif(key in MOVE_OPTIONS):
+            config[key] = MOVE_OPTIONS[key][1](value)
+        else:
+            raise ValueError(f"Unknown option '{key}' for {agent_type}")
+    return config
+
+
+# Name of an agent config (its "name", or the type and its options)
+def agent_name(config):
+    if("name" in config):
+        return config["name"]
+    options = [f"{key}={config[key]}" for key in [*AGENT_OPTIONS[config["type"]], *MOVE_OPTIONS] if key in config]
+    return config["type"] + (":" + ",".join(options) if options else "")
+
+
+# Create an agent from its config
+def make_agent(config):
+    arguments = {}
+    for key, (argument, convert, default) in AGENT_OPTIONS[config["type"]].items():
+        value = config.get(key, default)
+        arguments[argument] = convert(value) if value != None else None
+    # Only the agent type that's used is imported (the MCTS node pool needs NumPy)
+    if(config["type"] == "minimax"):
+        from connect4.minimax import Minimax_Agent
+        return Minimax_Agent(**arguments)
+    from connect4.mcts import MCTS_Agent
+    return MCTS_Agent(**arguments)
+
+
+# Arguments of get_move for an agent config (see MOVE_OPTIONS)
+def move_arguments(config):
+    return {argument: convert(config[key]) for key, (argument, convert) in MOVE_OPTIONS.items() if key in config}
+
+
+# Play one game with new agents. Agent 1 is player -1 and agent 2 is player 1
+# (like battle_agents). The game starts after the opening moves (a string of
+# columns, the game must not be over). Returns the game's record: the
+# winner (1 or 2, None for a tie), the moves, and how long each agent took
+# for each move.
+def play_game(config1, config2, starting_player, seed, backend="bitboard", shape=STANDARD_SHAPE, opening=""):
+    random.seed(seed)
+    arguments = {-1: move_arguments(config1), 1: move_arguments(config2)}
+    move_times = {-1: [], 1: []}
+    moves = []
+    winner = None
+    board = make_board(starting_player, backend, *shape)
+    for move in opening:
+        board.move(int(move))
+    agents = {}
+    # The agents are closed however the game ends (pondering threads and
+    # process pools would be left running if a search raised)
+    try:
+        agents[-1] = make_agent(config1)
+        agents[1] = make_agent(config2)
+        while(1):
+            turn = board.get_turn()
+            start_time = perf_counter()
+            move = agents[turn].get_move(board, **arguments[turn])
+            move_times[turn].append(perf_counter() - start_time)
+            board.move(move)
+            moves.append(move)
+            if(board.check_win(turn)):
+                winner = 1 if turn == -1 else 2
+                break
+            if(board.check_full()):
+                break
+    finally:
+        for agent in agents.values():
+            agent.close()
+    record = {"agent1": agent_name(config1), "agent2": agent_name(config2),
+              "starting_agent": 1 if starting_player == -1 else 2, "seed": seed,
+              "shape": list(shape), "winner": winner, "moves": "".join(str(move) for move in moves),
+              "move_times_1": move_times[-1], "move_times_2": move_times[1]}
+    if(opening):
+        record["opening"] = opening
+    return record
+
+
+# Games of a round-robin: every pair of agents plays game_sets sets of two
+# games (one start per agent). Returns (agent 1 index, agent 2 index,
+# starting player, seed) for each game.
+def schedule_games(number_of_agents, game_sets, seed):
+    generator = random.Random(seed)
+    games = []
+    for i in range(number_of_agents):
+        for j in range(i + 1, number_of_agents):
+            for game_set in range(game_sets):
+                for starting_player in [-1, 1]:
+                    games.append((i, j, starting_player, generator.getrandbits(32)))
+    return games
+
+
+# Play a round-robin between the agent configs over a pool of worker
+# processes and return the game records (in the order they finished).
+# Every record is written to output (a file or None) as soon as it's ready.
+def run_tournament(configs, game_sets, workers=None, seed=441, backend="bitboard", output=None,
+                   shape=STANDARD_SHAPE):
+    from concurrent.futures import ProcessPoolExecutor, as_completed # Imported here, only tournaments need it
+    games = schedule_games(len(configs), game_sets, seed)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(play_game, configs[i], configs[j], starting_player, game_seed, backend, shape)
+                   for i, j, starting_player, game_seed in games]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if(output != None):
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            print(f"[{len(records)}/{len(games)}] {record['agent1']} vs {record['agent2']}:",
+                  "tie" if record["winner"] == None else record["agent" + str(record["winner"])] + " wins")
+    return records
+
+
+# Wilson score interval for a score rate (wins + half the ties) over n games
+def confidence_interval(score, n, z=Z_95):
+    if(n == 0): return 0, 1
+    rate = score / n
+    center = (rate + z * z / (2 * n)) / (1 + z * z / n)
+    spread = z * sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0, center - spread), min(1, center + spread)
+
+
+# Score of each agent against each other agent: (score, games) by name pair
+def pairwise_scores(records):
+    scores = {}
+    for record in records:
+        names = (record["agent1"], record["agent2"])
+        points = 0.5 if record["winner"] == None else (1 if record["winner"] == 1 else 0)
+        for name, opponent, score in [(names[0], names[1], points), (names[1], names[0], 1 - points)]:
+            total, games = scores.get((name, opponent), (0, 0))
+            scores[(name, opponent)] = (total + score, games + 1)
+    return scores
+
+
+# Elo ratings (maximum likelihood, average rating 0). Every pair gets one
+# extra tie so an agent that won (or lost) every game has a finite rating.
+def elo_ratings(names, records, iterations=1000):
+    scores = pairwise_scores(records)
+    ratings = {name: 0.0 for name in names}
+    for iteration in range(iterations):
+        for name in names:
+            score = 0
+            expected = 0
+            for opponent in names:
+                if((name, opponent) not in scores): continue
+                total, games = scores[(name, opponent)]
+                score += total + 0.5
+                expected += (games + 1) / (1 + 10 ** ((ratings[opponent] - ratings[name]) / 400))
+            if(expected > 0):
+                # Minorization-maximization step (Bradley-Terry model)
+                ratings[name] += 400 * log10(score / expected)
+        average = sum(ratings.values()) / len(ratings)
+        ratings = {name: rating - average for name, rating in ratings.items()}
+    return ratings
+
+
+# Summary of the records for each agent: games, wins, losses, ties, score
+# rate with its confidence interval, Elo and move times (milliseconds).
+def summarize(names, records):
+    ratings = elo_ratings(names, records)
+    summary = {}
+    for name in names:
+        wins = losses = ties = 0
+        times = []
+        for record in records:
+            for side in (1, 2):
+                if(record["agent" + str(side)] != name): continue
+                times += record["move_times_" + str(side)]
+                if(record["winner"] == None): ties += 1
+                elif(record["winner"] == side): wins += 1
+                else: losses += 1
+        games = wins + losses + ties
+        low, high = confidence_interval(wins + ties / 2, games)
+        times.sort()
+        summary[name] = {"games": games, "wins": wins, "losses": losses, "ties": ties,
+            "score_rate": (wins + ties / 2) / games if games else 0, "ci_low": low, "ci_high": high,
+            "elo": ratings[name],
+            "mean_move_ms": sum(times) / len(times) * 1000 if times else 0,
+            "p90_move_ms": times[min(len(times) - 1, int(0.9 * len(times)))] * 1000 if times else 0}
+    return summary
+
+
+def print_summary(names, records):
+    summary = summarize(names, records)
+    print(f"\n{'agent':>32} {'games':>6} {'W-L-T':>12} {'score':>7} {'95% CI':>15} {'Elo':>6} {'ms/move':>8} {'p90 ms':>8}")
+    for name in sorted(names, key=lambda name: -summary[name]["elo"]):
+        row = summary[name]
+        record = f"{row['wins']}-{row['losses']}-{row['ties']}"
+        interval = f"{row['ci_low']:.1%}-{row['ci_high']:.1%}"
+        print(f"{name:>32} {row['games']:>6} {record:>12} {row['score_rate']:>7.1%} {interval:>15}",
+              f"{row['elo']:>6.0f} {row['mean_move_ms']:>8.1f} {row['p90_move_ms']:>8.1f}")
+    scores = pairwise_scores(records)
+    print("\nHead to head (score of the first agent):")
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            if((names[i], names[j]) not in scores): continue
+            total, games = scores[(names[i], names[j])]
+            low, high = confidence_interval(total, games)
+            print(f"    {names[i]} vs {names[j]}: {total:g}/{games} ({total / games:.1%}, 95% CI {low:.1%}-{high:.1%})")
+
+
+# The agents asked for by the original interactive version
+def prompt_agents():
+    print("Agent 1 is Minimax.")
+    depth = int(input("Search depth: "))
+    print("Agent 2 is Monte-Carlo TS.")
+    iterations = int(input("Number of iterations: "))
+    game_sets = int(input("Number of game sets (one start per agent): "))
+    return [{"type": "minimax", "depth": depth}, {"type": "mcts", "iterations": iterations}], game_sets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament between agents.")
+    parser.add_argument("--agent", action="append", default=[],
+                        help="Agent spec, e.g. minimax:depth=4,heuristic=1 or mcts:iterations=1000,exploration=1.41")
+    parser.add_argument("--config", help="JSON file with a list of agent configs")
+    parser.add_argument("--games", type=int, default=None, help="Game sets per pair (one start per agent)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=441)
+    parser.add_argument("--backend", choices=BACKENDS, default="bitboard")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--columns", type=int, default=COLUMNS)
+    parser.add_argument("--connect", type=int, default=CONNECT, help="Pieces in a row to win")
+    parser.add_argument("--output", help="Append the game records to this JSONL file")
+    arguments = parser.parse_args()
+
+    configs = [parse_agent(spec) for spec in arguments.agent]
+    if(arguments.config):
+        with open(arguments.config) as file:
+            configs += json.load(file)
+    game_sets = arguments.games
+    if(len(configs) == 0):
+        configs, game_sets = prompt_agents()
+    if(len(configs) < 2):
+        parser.error("need at least two agents")
+    names = [agent_name(config) for config in configs]
+    if(len(set(names)) != len(names)):
+        parser.error("agent names must be different (use name=...)")
+
+    output = open(arguments.output, "a") if arguments.output else None
+    try:
+        records = run_tournament(configs, game_sets or 1, arguments.workers, arguments.seed,
+                                 arguments.backend, output, (arguments.rows, arguments.columns, arguments.connect))
+    finally:
+        if(output != None):
+            output.close()
+    print_summary(names, records)
+
+
+if(__name__ == "__main__"):
+    main()
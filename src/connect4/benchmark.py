@@ -0,0 +1,222 @@
+from connect4.board.board import make_board, BACKENDS
+from connect4.minimax import Minimax_Agent
+from connect4.mcts import MCTS_Agent
+from time import perf_counter
+import argparse
+import json
+import random
+import sys
+import timeit
+import tracemalloc
+
+# Benchmark suite: times both agents on a fixed set of positions and the
+# board operations they depend on. Results can be saved as JSON and compared
+# with a saved baseline to catch performance regressions.
+#
+# Examples:
+#   python -m connect4.benchmark --output results.json
+#   python -m connect4.benchmark --baseline results.json
+
+
+# Positions given as the columns played from an empty board (player 1 moves
+# next, and neither player can win immediately).
+CORPUS = {
+    "opening": ["", "23", "2234", "124213"],
+    "midgame": ["04624240", "3100334025", "314533401416", "02223323326616"],
+    "endgame": ["60353205033255552611404434", "0131106410500120651654652342",
+                "610236530363345063025440601645", "05412205005545004651163166142664"],
+}
+
+MINIMAX_DEPTHS = [2, 4]
+MINIMAX_HEURISTICS = [0, 1, 2]
+MCTS_ITERATIONS = [200, 1000]
+
+# Results that got this much worse than the baseline are reported as regressions
+DEFAULT_TOLERANCE = 0.10
+
+
+# Create a board from a string of moves
+def board_from_moves(moves, backend):
+    board = make_board(1, backend)
+    for move in moves:
+        board.move(int(move))
+    return board
+
+
+# Get the p-th percentile (0-100) of a list of numbers (nearest rank)
+def percentile(values, p):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# Latency summary (in milliseconds) of a list of times (in seconds)
+def latency_summary(times):
+    return {"p50_ms": percentile(times, 50) * 1000, "p90_ms": percentile(times, 90) * 1000,
+            "p99_ms": percentile(times, 99) * 1000, "mean_ms": sum(times) / len(times) * 1000}
+
+
+# Run get_move on every corpus position. make_agent creates a new agent
+# (so nothing is remembered between positions) and count_work returns the
+# number of nodes/rollouts of the last search. Returns the time per move
+# and the total work.
+def time_agent(make_agent, count_work, backend, repeat):
+    times = []
+    work = 0
+    for phase in CORPUS:
+        for moves in CORPUS[phase]:
+            for i in range(repeat):
+                board = board_from_moves(moves, backend)
+                agent = make_agent()
+                start_time = perf_counter()
+                agent.get_move(board)
+                times.append(perf_counter() - start_time)
+                work += count_work(agent)
+    return times, work
+
+
+# Peak memory (bytes) used while running get_move on every corpus position
+def peak_memory(make_agent, backend):
+    peak = 0
+    for phase in CORPUS:
+        for moves in CORPUS[phase]:
+            board = board_from_moves(moves, backend)
+            tracemalloc.start()
+            make_agent().get_move(board)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return peak
+
+
+# solve_below=0: the endgame positions are timed with the depth-limited
+# search (not the exact solver), like before the solver was added
+def bench_minimax(depth, heuristic_number, backend, repeat, memory):
+    make_agent = lambda: Minimax_Agent(depth, heuristic_number, solve_below=0)
+    count_work = lambda agent: agent.get_last_search_info()["nodes"]
+    times, nodes = time_agent(make_agent, count_work, backend, repeat)
+    result = {"nodes": nodes, "nodes_per_sec": nodes / sum(times)}
+    result.update(latency_summary(times))
+    if(memory):
+        result["peak_memory_bytes"] = peak_memory(make_agent, backend)
+    return result
+
+
+def bench_mcts(iterations, backend, repeat, memory):
+    make_agent = lambda: MCTS_Agent(iterations)
+    count_work = lambda agent: agent.get_last_search_info()["rollouts"]
+    times, rollouts = time_agent(make_agent, count_work, backend, repeat)
+    result = {"rollouts": rollouts, "rollouts_per_sec": rollouts / sum(times)}
+    result.update(latency_summary(times))
+    if(memory):
+        result["peak_memory_bytes"] = peak_memory(make_agent, backend)
+    return result
+
+
+# Microbenchmarks of the board operations, in nanoseconds per call
+def bench_board(backend, number=2000):
+    board = board_from_moves(CORPUS["midgame"][1], backend)
+    column = board.get_legal_moves()[0]
+    def move_unmove():
+        board.move(column)
+        board.unmove()
+    operations = {
+        "move+unmove": move_unmove,
+        "check_win": lambda: board.check_win(1),
+        "check_full": board.check_full,
+        "get_legal_moves": board.get_legal_moves,
+        "heuristic": lambda: board.heuristic(1),
+    }
+    results = {}
+    for name in operations:
+        seconds = min(timeit.repeat(operations[name], number=number, repeat=3))
+        results[name + "_ns"] = seconds / number * 1e9
+    return results
+
+
+def run_benchmarks(backend, repeat=1, memory=True, quick=False):
+    random.seed(441) # MCTS plays the same games every run
+    depths = MINIMAX_DEPTHS[:1] if quick else MINIMAX_DEPTHS
+    iterations = MCTS_ITERATIONS[:1] if quick else MCTS_ITERATIONS
+    results = {"backend": backend, "board": bench_board(backend)}
+    for depth in depths:
+        for heuristic_number in MINIMAX_HEURISTICS:
+            name = f"minimax_depth{depth}_h{heuristic_number}"
+            print("Running", name)
+            results[name] = bench_minimax(depth, heuristic_number, backend, repeat, memory)
+    for number_of_iterations in iterations:
+        name = f"mcts_{number_of_iterations}"
+        print("Running", name)
+        results[name] = bench_mcts(number_of_iterations, backend, repeat, memory)
+    return results
+
+
+# Which direction is better for a result
+def higher_is_better(name):
+    return name.endswith("_per_sec")
+
+
+# Compare results with a baseline. Returns a list of
+# (benchmark, measure, baseline value, new value, change, regression).
+# Counts (nodes, rollouts) are skipped: they change with the search, not speed.
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    rows = []
+    for benchmark in results:
+        if(not isinstance(results[benchmark], dict) or benchmark not in baseline):
+            continue
+        for measure in results[benchmark]:
+            if(measure not in baseline[benchmark] or measure in ("nodes", "rollouts")):
+                continue
+            old = baseline[benchmark][measure]
+            new = results[benchmark][measure]
+            if(old == 0): continue
+            change = (new - old) / old
+            if(higher_is_better(measure)):
+                regression = change < -tolerance
+            else:
+                regression = change > tolerance
+            rows.append((benchmark, measure, old, new, change, regression))
+    return rows
+
+
+def print_results(results):
+    for benchmark in results:
+        if(not isinstance(results[benchmark], dict)): continue
+        print(benchmark)
+        for measure in results[benchmark]:
+            print(f"    {measure:>20}: {results[benchmark][measure]:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Connect-4 agents.")
+    parser.add_argument("--backend", choices=BACKENDS, default="bitboard")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to run each position")
+    parser.add_argument("--quick", action="store_true", help="Only the smallest searches")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory runs")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before reporting a regression (0.1 = 10%%)")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.backend, arguments.repeat, not arguments.no_memory, arguments.quick)
+    print_results(results)
+    if(arguments.output):
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if(arguments.baseline):
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        rows = compare(results, baseline, arguments.tolerance)
+        regressions = 0
+        print("\nCompared with", arguments.baseline)
+        for benchmark, measure, old, new, change, regression in rows:
+            flag = "REGRESSION" if regression else ""
+            print(f"{benchmark:>24} {measure:>20}: {old:12.1f} -> {new:12.1f} ({change:+.1%}) {flag}")
+            regressions += regression
+        print(regressions, "regressions")
+        if(regressions > 0):
+            sys.exit(1)
+
+
+if(__name__ == "__main__"):
+    main()
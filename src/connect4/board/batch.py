@@ -0,0 +1,68 @@
+import numpy as np
+from connect4.board.board import get_shape, check_heuristic
+from connect4.board.bitboard import get_layout
+
+# Heuristic evaluation of many boards at once with NumPy. Gives exactly the
+# same values as Board.heuristic, but all the boards are scored together.
+# All the boards have the same shape (a BoardShape, the standard board if
+# it's None).
+
+
+# Turn a stack of bitboards into cells. bitboards has shape (N, 2): the
+# first column is player 1's pieces and the second is player -1's pieces.
+# Returns an (N, rows * columns) array like Board.get_board.
+# Only for shapes whose bitboards fit in 64 bits.
+def cells_from_bitboards(bitboards, shape=None):
+    layout = get_layout(shape or get_shape())
+    if(layout.bytes > 8):
+        raise ValueError(f"{layout.shape} bitboards don't fit in 64 bits")
+    cell_bits = layout.cell_bits.astype(np.uint64)
+    bitboards = np.asarray(bitboards, dtype=np.uint64).reshape(-1, 2)
+    agent_pieces = (bitboards[:, 0:1] >> cell_bits) & np.uint64(1)
+    opponent_pieces = (bitboards[:, 1:2] >> cell_bits) & np.uint64(1)
+    return agent_pieces.astype(int) - opponent_pieces.astype(int)
+
+
+# Score N boards at once. boards has shape (N, rows, columns) or
+# (N, rows * columns), with the first row being the bottom row (like
+# Board.get_board). Returns an array of N scores.
+def heuristic_batch(boards, heuristic_number, shape=None):
+    check_heuristic(heuristic_number)
+    shape = shape or get_shape()
+    rows, columns = shape.rows, shape.columns
+    three = shape.connect - 1
+    cells = np.asarray(boards, dtype=int).reshape(-1, rows * columns)
+    grid = cells.reshape(-1, rows, columns)
+    number_of_boards = cells.shape[0]
+
+    # Vertical: the top connect - 1 pieces of a column belong to one player
+    # (impossible if the columns are shorter than that)
+    score = np.zeros(number_of_boards, dtype=int)
+    if(rows >= three):
+        heights = np.count_nonzero(grid, axis=1) # (N, columns)
+        tall = heights >= three
+        top_rows = np.minimum(np.maximum(heights - 1, three - 1), rows - 1) # (Only used if tall)
+        column_sums = np.zeros((number_of_boards, columns), dtype=int)
+        for below in range(three):
+            column_sums += np.take_along_axis(grid, (top_rows - below)[:, None, :], axis=1)[:, 0, :]
+        score += np.sum((column_sums == three) & tall, axis=1) - np.sum((column_sums == -three) & tall, axis=1)
+
+    # Horizontal and diagonal: connect - 1 pieces of one player and one empty cell
+    window_sums = cells[:, shape.window_indices].sum(axis=2) # (N, windows)
+    score += np.sum(window_sums == three, axis=1) - np.sum(window_sums == -three, axis=1)
+
+    # Finally, give points for pieces in the middle column. Added one row at
+    # a time, in the same order as Board, so the floating point results match.
+    if(heuristic_number == 0):
+        return score
+    score = score.astype(float)
+    weight = 1
+    for row in range(shape.middle_rows[heuristic_number]):
+        score += grid[:, row, shape.middle_column] * weight
+        weight -= 0.1
+    return score
+
+
+# Same as heuristic_batch, for a stack of bitboards (see cells_from_bitboards)
+def heuristic_batch_bitboards(bitboards, heuristic_number, shape=None):
+    return heuristic_batch(cells_from_bitboards(bitboards, shape), heuristic_number, shape)
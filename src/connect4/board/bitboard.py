@@ -0,0 +1,451 @@
+import random
+from connect4.board.board import ROWS, COLUMNS, CONNECT, get_shape, check_heuristic
+
+
+# Bitboard layout: each column uses rows + 1 bits (the extra bit is a
+# sentinel that keeps shifted patterns from wrapping into the next column).
+# Bit index of (row, column) is column * height + row, bottom row is row 0.
+# A BitLayout has the masks and keys of one board shape (see get_layout).
+class BitLayout:
+
+
+    def __init__(self, shape):
+        rows, columns = shape.rows, shape.columns
+        self.shape = shape
+        self.connect = shape.connect
+        self.height = height = rows + 1
+
+        # Shift amounts for the four win directions
+        self.vertical = 1
+        self.horizontal = height
+        self.diagonal_up = height + 1 # (/)
+        self.diagonal_down = height - 1 # (\)
+
+        # Single bit at the bottom/top cell of each column, and the full column mask
+        self.bottom_masks = [1 << (column * height) for column in range(columns)]
+        self.bottom_row = sum(self.bottom_masks)
+        self.top_masks = [1 << (column * height + rows - 1) for column in range(columns)]
+        self.top_row = sum(self.top_masks)
+        self.column_masks = [((1 << rows) - 1) << (column * height) for column in range(columns)]
+        self.full_mask = sum(self.column_masks)
+
+        self.__cell_bits = None # See cell_bits
+        self.bytes = (columns * height + 7) // 8
+
+        # Zobrist keys (shared with Board) indexed by player and bit index, so
+        # both backends give a position the same hash. zobrist_mirror_bits
+        # has the key of the mirrored cell (for the mirrored hash).
+        self.zobrist_turn = shape.zobrist_turn
+        self.zobrist_bits = {player: [0] * (columns * height) for player in (1, -1)}
+        self.zobrist_mirror_bits = {player: [0] * (columns * height) for player in (1, -1)}
+        for player in (1, -1):
+            for row in range(rows):
+                for column in range(columns):
+                    self.zobrist_bits[player][column * height + row] = shape.zobrist_pieces[player][row][column]
+                    self.zobrist_mirror_bits[player][column * height + row] =\
+                        shape.zobrist_pieces[player][row][columns - 1 - column]
+
+        # Shifts that turn a bitboard into its runs of connect pieces, for
+        # each direction: shifting by 1, 2, 4... cells doubles the run length
+        # each time, and a last shift makes up the rest.
+        self.line_shifts = []
+        for shift in (self.vertical, self.horizontal, self.diagonal_up, self.diagonal_down):
+            shifts = []
+            length = 1
+            while(length * 2 <= self.connect):
+                shifts.append(length * shift)
+                length *= 2
+            if(length < self.connect):
+                shifts.append((self.connect - length) * shift)
+            self.line_shifts.append(tuple(shifts))
+
+        if(self.connect == 4):
+            self.has_line = self.__has_four
+            self.winning_cells = self.__winning_cells_4
+            self.count_threes = self.__count_threes_4
+            self.threes_score = self.__threes_score_4
+
+        # Middle column weights of heuristic versions 1 and 2
+        self.middle_weights = {version: _middle_weights(shape.middle_rows[version]) for version in (1, 2)}
+        self.__middle_scores = {} # See add_middle_score
+
+
+    # Bit index of each cell in Board.get_board order (row * columns +
+    # column), as a NumPy array (made the first time it's needed, like
+    # BoardShape.line_indices)
+    @property
+    def cell_bits(self):
+        if(self.__cell_bits is None):
+            import numpy as np
+            rows, columns, height = self.shape.rows, self.shape.columns, self.height
+            self.__cell_bits = np.array([column * height + row for row in range(rows) for column in range(columns)],
+                                        dtype=np.intp)
+        return self.__cell_bits
+
+
+    # Pickled as its shape (see BoardShape)
+    def __reduce__(self):
+        return get_layout, (self.shape,)
+
+
+    # Cell of (row, column) as a bitboard
+    def cell_bit(self, row, column):
+        return 1 << (column * self.height + row)
+
+
+    # Does this bitboard contain connect pieces in a row?
+    def has_line(self, bits):
+        for shifts in self.line_shifts:
+            run = bits
+            for shift in shifts:
+                run &= run >> shift
+            if(run):
+                return 1
+        return 0
+
+
+    # Cells that would give the player connect in a row if the player had a
+    # piece there (whether or not the cell can be played yet).
+    def winning_cells(self, pieces):
+        connect = self.connect
+        full_mask = self.full_mask
+        # Vertical: only the connect - 1 pieces below can make the line
+        cells = full_mask
+        for below in range(1, connect):
+            cells &= pieces << below
+        for shift in (self.horizontal, self.diagonal_up, self.diagonal_down):
+            # before[i] / after[i]: cells with the i cells before / after them
+            # all taken by the player's pieces
+            before = [full_mask]
+            after = [full_mask]
+            for i in range(1, connect):
+                before.append(before[-1] & (pieces << (i * shift)))
+                after.append(after[-1] & (pieces >> (i * shift)))
+            # The cell is the i-th of the line (i pieces before it)
+            for i in range(connect):
+                cells |= before[i] & after[connect - 1 - i]
+        return cells & full_mask
+
+
+    # Count the windows (in one direction) where player has connect - 1
+    # pieces and the remaining cell is empty. All windows are checked at
+    # once: bit i of the result is set if the window starting at bit i
+    # matches. Cells outside of the board are in neither bitboard, so windows
+    # that leave the board never match.
+    def count_threes(self, pieces, empty, shift):
+        connect = self.connect
+        # first[i]: the first i cells of the window are pieces, last[i]: the
+        # last i cells are
+        first = [-1]
+        last = [-1]
+        for i in range(connect):
+            first.append(first[-1] & (pieces >> (i * shift)))
+            last.append(last[-1] & (pieces >> ((connect - 1 - i) * shift)))
+        matches = 0
+        for i in range(connect):
+            matches |= first[i] & (empty >> (i * shift)) & last[connect - 1 - i]
+        return matches.bit_count()
+
+
+    # The horizontal and diagonal part of the heuristic: the windows where
+    # the agent has connect - 1 pieces and an empty cell, minus the
+    # opponent's.
+    def threes_score(self, agent_pieces, opponent_pieces, empty):
+        score = 0
+        for shift in (self.horizontal, self.diagonal_up, self.diagonal_down):
+            score += self.count_threes(agent_pieces, empty, shift)
+            score -= self.count_threes(opponent_pieces, empty, shift)
+        return score
+
+
+    # Pieces that are the top of connect - 1 of the player's pieces in a
+    # column. The bits below a column's bottom row are the sentinel of the
+    # column before it, which never holds a piece, so runs don't cross columns.
+    def vertical_threes(self, pieces):
+        threes = pieces
+        for below in range(1, self.connect - 1):
+            threes &= pieces << below
+        return threes
+
+
+    # Add the points of heuristic version 1 or 2 for the pieces in the middle
+    # column to score (see Board.heuristic). The result is looked up by the
+    # score and the column's pieces, and worked out (one row at a time, in
+    # the same order as Board, so the floating point results match) the
+    # first time they're seen.
+    def add_middle_score(self, version, score, agent_pieces, opponent_pieces):
+        offset = self.shape.middle_column * self.height
+        column_mask = (1 << self.shape.rows) - 1
+        key = (version, score, (agent_pieces >> offset) & column_mask, (opponent_pieces >> offset) & column_mask)
+        value = self.__middle_scores.get(key)
+        if(value == None):
+            value = score
+            weights = self.middle_weights[version]
+            for row in range(len(weights)):
+                if(key[2] >> row & 1): piece = 1
+                elif(key[3] >> row & 1): piece = -1
+                else: piece = 0
+                value += piece * weights[row]
+            self.__middle_scores[key] = value
+        return value
+
+
+    # The same functions written out for connect 4 (the loops above
+    # cost more than the bit operations themselves)
+
+    def __has_four(self, bits):
+        for shift, double_shift in self.line_shifts:
+            pairs = bits & (bits >> shift)
+            if(pairs & (pairs >> double_shift)):
+                return 1
+        return 0
+
+
+    def __winning_cells_4(self, pieces):
+        # Vertical: only the 3 pieces below can make the line
+        cells = (pieces << 1) & (pieces << 2) & (pieces << 3)
+        for shift in (self.horizontal, self.diagonal_up, self.diagonal_down):
+            before1 = pieces << shift
+            before2 = pieces << (2 * shift)
+            after1 = pieces >> shift
+            after2 = pieces >> (2 * shift)
+            cells |= before1 & before2 & (pieces << (3 * shift))
+            cells |= before1 & before2 & after1
+            cells |= before1 & after1 & after2
+            cells |= after1 & after2 & (pieces >> (3 * shift))
+        return cells & self.full_mask
+
+
+    def __count_threes_4(self, pieces, empty, shift):
+        p1 = pieces >> shift
+        p2 = pieces >> (2 * shift)
+        p3 = pieces >> (3 * shift)
+        matches = (empty & p1 & p2 & p3) |\
+            (pieces & (empty >> shift) & p2 & p3) |\
+            (pieces & p1 & (empty >> (2 * shift)) & p3) |\
+            (pieces & p1 & p2 & (empty >> (3 * shift)))
+        return matches.bit_count()
+
+
+    def __threes_score_4(self, agent_pieces, opponent_pieces, empty):
+        score = 0
+        for shift in (self.horizontal, self.diagonal_up, self.diagonal_down):
+            e1 = empty >> shift
+            e2 = empty >> (2 * shift)
+            e3 = empty >> (3 * shift)
+            for pieces, sign in ((agent_pieces, 1), (opponent_pieces, -1)):
+                p1 = pieces >> shift
+                p2 = pieces >> (2 * shift)
+                p3 = pieces >> (3 * shift)
+                matches = (empty & p1 & p2 & p3) | (pieces & e1 & p2 & p3) |\
+                    (pieces & p1 & e2 & p3) | (pieces & p1 & p2 & e3)
+                score += sign * matches.bit_count()
+        return score
+
+
+# Layouts created so far, by shape
+_layouts = {}
+
+
+# Get the (shared) BitLayout of a BoardShape
+def get_layout(shape):
+    layout = _layouts.get(shape)
+    if(layout == None):
+        layout = _layouts[shape] = BitLayout(shape)
+    return layout
+
+
+# Middle column weights, built the same way Board builds them so the
+# floating point results are identical.
+def _middle_weights(rows):
+    weights = []
+    weight = 1
+    for row in range(rows):
+        weights.append(weight)
+        weight -= 0.1
+    return weights
+
+
+# A connect 4 board stored as two integers, with the same interface as Board.
+# position holds the pieces of the player whose turn it is, mask holds every
+# piece on the board. The other player's pieces are position ^ mask.
+class BitBoard:
+
+
+    def __init__(self, starting_player=None, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        self.__shape = get_shape(rows, columns, connect)
+        self.__layout = get_layout(self.__shape)
+        self.__position = 0
+        self.__mask = 0
+        self.__history = [] # Columns played, allows us to undo moves
+        if(starting_player == None):
+            self.__turn = random.choice([-1, 1])
+        else:
+            self.__turn = starting_player
+        self.__hash = self.__layout.zobrist_turn if self.__turn == 1 else 0
+        self.__mirrored_hash = self.__hash # Hash of the board flipped left-right
+
+
+    # Get the board's BoardShape (rows, columns, connect and their tables)
+    def get_shape(self):
+        return self.__shape
+
+
+    # Get the board's BitLayout (masks of its shape)
+    def get_layout(self):
+        return self.__layout
+
+
+    # Get the bitboard of one player's pieces
+    def get_pieces(self, player):
+        if(player == self.__turn):
+            return self.__position
+        return self.__position ^ self.__mask
+
+
+    # Return a board in the form of an array (same layout as Board.get_board)
+    def get_board(self):
+        import numpy as np # Only needed here (the bitboards themselves are ints)
+        layout = self.__layout
+        def cells(pieces):
+            bits = np.unpackbits(np.frombuffer(pieces.to_bytes(layout.bytes, "little"), dtype=np.uint8),
+                                 bitorder="little")
+            return bits[layout.cell_bits].astype(int)
+        return cells(self.get_pieces(1)) - cells(self.get_pieces(-1))
+
+
+    # Print the board in a way that's easy for humans to understand.
+    def print_board(self):
+        from colorama import Fore # Only printing needs it
+        def filter(number):
+            if(number == 1):
+                return Fore.RED + 'X' + Fore.RESET
+            if(number == -1):
+                return Fore.YELLOW + 'O' + Fore.RESET
+            if(number == 0):
+                return '.'
+        rows, columns = self.__shape.rows, self.__shape.columns
+        board = self.get_board()
+        for row in range(rows - 1, -1, -1):
+            for column in range(columns):
+                print(filter(board[row * columns + column]), end=" ")
+            print()
+        print("\n" + " ".join(str(column) for column in range(columns)))
+
+
+    # Get the current player's turn
+    def get_turn(self):
+        return self.__turn
+
+
+    # Get the Zobrist hash of the position (pieces and turn)
+    def get_hash(self):
+        return self.__hash
+
+
+    # Get the hash of the board flipped left-right
+    def get_mirrored_hash(self):
+        return self.__mirrored_hash
+
+
+    # Get a key shared by the board and its mirror image (see Board)
+    def canonical_key(self):
+        return min(self.__hash, self.__mirrored_hash)
+
+
+    # True if canonical_key is the mirror image's hash (see Board)
+    def is_mirrored(self):
+        return self.__mirrored_hash < self.__hash
+
+
+    # True if the board is the same as its mirror image
+    def is_symmetric(self):
+        return self.__mirrored_hash == self.__hash
+
+
+    # Get the columns played so far, in order
+    def get_moves(self):
+        return list(self.__history)
+
+
+    # Returns the legal moves (i.e., columns that are not full)
+    def get_legal_moves(self):
+        mask = self.__mask
+        top_masks = self.__layout.top_masks
+        return [column for column in range(self.__shape.columns) if not (mask & top_masks[column])]
+
+
+    # Returns the legal moves that would win immediately for player
+    def get_winning_moves(self, player):
+        layout = self.__layout
+        playable = (self.__mask + layout.bottom_row) & layout.full_mask
+        wins = layout.winning_cells(self.get_pieces(player)) & playable
+        if(wins == 0): return []
+        column_masks = layout.column_masks
+        return [column for column in range(self.__shape.columns) if wins & column_masks[column]]
+
+
+    # Make a move (assume the move is legal)
+    def move(self, column):
+        layout = self.__layout
+        new_piece = (self.__mask + layout.bottom_masks[column]) & layout.column_masks[column]
+        bit = new_piece.bit_length() - 1
+        self.__hash ^= layout.zobrist_bits[self.__turn][bit] ^ layout.zobrist_turn
+        self.__mirrored_hash ^= layout.zobrist_mirror_bits[self.__turn][bit] ^ layout.zobrist_turn
+        self.__position ^= self.__mask
+        self.__mask |= new_piece
+        self.__history.append(column)
+        self.__turn = -self.__turn
+
+
+    # Undo one move (the most recent one)
+    def unmove(self):
+        if(len(self.__history) == 0): return # Nothing to undo
+        layout = self.__layout
+        column = self.__history.pop()
+        # The highest piece in the column is the one that was played last
+        top_piece = ((self.__mask & layout.column_masks[column]) + layout.bottom_masks[column]) >> 1
+        self.__mask ^= top_piece
+        self.__position ^= self.__mask
+        self.__turn = -self.__turn
+        bit = top_piece.bit_length() - 1
+        self.__hash ^= layout.zobrist_bits[self.__turn][bit] ^ layout.zobrist_turn
+        self.__mirrored_hash ^= layout.zobrist_mirror_bits[self.__turn][bit] ^ layout.zobrist_turn
+
+
+    # Determine if the board is full
+    def check_full(self):
+        return 1 if self.__mask == self.__layout.full_mask else 0
+
+
+    # Determine if a player won
+    def check_win(self, player):
+        return self.__layout.has_line(self.get_pieces(player))
+
+
+    # Apply the heuristic. Gives the same values as Board.heuristic.
+    def heuristic(self, heuristic_number):
+        if(heuristic_number == 0): return self.__heuristic0_1_2(version=0)
+        if(heuristic_number == 1): return self.__heuristic0_1_2(version=1)
+        if(heuristic_number == 2): return self.__heuristic0_1_2(version=2)
+        check_heuristic(heuristic_number)
+
+
+    # See Board.__heuristic0_1_2 for a description of the heuristic. Every
+    # term is computed for all the columns at once with bit operations.
+    def __heuristic0_1_2(self, version):
+        layout = self.__layout
+        mask = self.__mask
+        agent_pieces = self.get_pieces(1)
+        opponent_pieces = agent_pieces ^ mask
+        # Vertical: the top connect - 1 pieces of a column belong to one player
+        # (tops has the top piece of each column that isn't empty)
+        tops = ((mask + layout.bottom_row) >> 1) & mask
+        score = (layout.vertical_threes(agent_pieces) & tops).bit_count() -\
+            (layout.vertical_threes(opponent_pieces) & tops).bit_count()
+        # Horizontal and diagonal: connect - 1 pieces of one player and one empty cell
+        score += layout.threes_score(agent_pieces, opponent_pieces, layout.full_mask ^ mask)
+        # Finally, give points for having pieces in the middle column
+        if(version != 1 and version != 2):
+            return score
+        return layout.add_middle_score(version, score, agent_pieces, opponent_pieces)
@@ -0,0 +1,457 @@
+import random
+
+
+ROWS = 6 # Default shape
+COLUMNS = 7
+CONNECT = 4 # Pieces in a row needed to win
+MAX_ROWS = 10 # Heuristic may become bad above (middle column weights go below 0)
+MAX_COLUMNS = 10 # So games can be written one digit per move
+
+# Mirror a column (columns are flipped left-right). The board is symmetric,
+# so a move in a position is as good as the mirrored move in the mirrored
+# position.
+def mirror_move(column, columns=COLUMNS):
+    return columns - 1 - column
+
+
+# Everything that only depends on the board's shape (rows, columns and
+# pieces in a row to win), computed once per shape and shared by all the
+# boards of that shape (see get_shape).
+class BoardShape:
+
+
+    def __init__(self, rows, columns, connect):
+        if(rows < 1 or rows > MAX_ROWS or columns < 1 or columns > MAX_COLUMNS):
+            raise ValueError(f"Unsupported board size {rows}x{columns} "
+                             f"(at most {MAX_ROWS} rows and {MAX_COLUMNS} columns)")
+        if(connect < 2 or connect > max(rows, columns)):
+            raise ValueError(f"Can't connect {connect} on a {rows}x{columns} board")
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.cells = rows * columns
+
+        # Zobrist keys: one random 64-bit number per (player, row, column),
+        # plus one for the turn. A board's hash is the XOR of the keys of its
+        # pieces (and the turn key if it's player 1's turn), so it can be
+        # updated one move at a time. Fixed seed so hashes are the same from
+        # run to run (and different for every shape).
+        if((rows, columns, connect) == (ROWS, COLUMNS, CONNECT)):
+            generator = random.Random(441)
+        else:
+            generator = random.Random(f"441-{rows}x{columns}-{connect}")
+        self.zobrist_pieces = {player: [[generator.getrandbits(64) for column in range(columns)]
+                                        for row in range(rows)] for player in (1, -1)}
+        self.zobrist_turn = generator.getrandbits(64)
+
+        # Windows of connect cells (lists of (row, column)): the horizontal
+        # and diagonal ones first, in the order __heuristic0_1_2 checks them,
+        # then the vertical ones (only used to find wins). cell_windows has
+        # the windows through each cell (see line_indices for NumPy).
+        self.windows = self.__windows()
+        self.heuristic_windows = len(self.windows)
+        for column in range(columns):
+            for bottom_piece_row in range(0, rows - connect + 1):
+                self.windows.append([(bottom_piece_row + i, column) for i in range(connect)])
+        self.__line_indices = None
+        self.cell_windows = [[[] for column in range(columns)] for row in range(rows)]
+        for index, window in enumerate(self.windows):
+            for row, column in window:
+                self.cell_windows[row][column].append(index)
+
+        # Columns from the middle out (middle moves are generally better)
+        self.center_order = sorted(range(columns), key=lambda column: abs(column - (columns - 1) / 2))
+
+        self.middle_column = int(columns / 2)
+        # Rows of the middle column that get points in each heuristic version
+        self.middle_rows = {1: rows, 2: min(4, rows)}
+        # The middle column is kept as a base 3 number (digit = piece + 1 per row)
+        self.powers_of_3 = [3 ** row for row in range(rows)]
+        self.empty_middle_key = sum(self.powers_of_3)
+        # (version, score without the middle column, middle column key) ->
+        # heuristic value, so the floating point middle column points are
+        # only added up once (in the same order as __heuristic0_1_2, which
+        # gives the same result).
+        self.middle_scores = {}
+
+
+    # Flat cell indices (row * columns + column) of every window, as a
+    # NumPy array (windows, connect). Made the first time it's needed, so
+    # the boards themselves don't import NumPy.
+    @property
+    def line_indices(self):
+        if(self.__line_indices is None):
+            import numpy as np
+            self.__line_indices = np.array([[row * self.columns + column for row, column in window]
+                                            for window in self.windows], dtype=np.intp).reshape(-1, self.connect)
+        return self.__line_indices
+
+
+    # Same as line_indices, for the horizontal and diagonal windows (the
+    # ones the heuristic counts)
+    @property
+    def window_indices(self):
+        return self.line_indices[:self.heuristic_windows]
+
+
+    def __windows(self):
+        rows, columns, connect = self.rows, self.columns, self.connect
+        windows = []
+        for row in range(rows):
+            for leftmost_piece_column in range(0, columns - connect + 1):
+                windows.append([(row, leftmost_piece_column + i) for i in range(connect)])
+        for bottom_piece_row in range(0, rows - connect + 1):
+            for leftmost_piece_column in range(0, columns - connect + 1):
+                windows.append([(bottom_piece_row + i, leftmost_piece_column + i) for i in range(connect)])
+        for bottom_piece_row in range(0, rows - connect + 1):
+            for rightmost_piece_column in range(connect - 1, columns):
+                windows.append([(bottom_piece_row + i, rightmost_piece_column - i) for i in range(connect)])
+        return windows
+
+
+    def __repr__(self):
+        return f"BoardShape({self.rows}x{self.columns}, connect {self.connect})"
+
+
+    # Pickled as its shape, so boards sent to other processes use that
+    # process's shared tables
+    def __reduce__(self):
+        return get_shape, (self.rows, self.columns, self.connect)
+
+
+# Shapes created so far, by (rows, columns, connect)
+_shapes = {}
+
+
+# Get the (shared) BoardShape of a shape
+def get_shape(rows=ROWS, columns=COLUMNS, connect=CONNECT):
+    key = (rows, columns, connect)
+    shape = _shapes.get(key)
+    if(shape == None):
+        shape = _shapes[key] = BoardShape(rows, columns, connect)
+    return shape
+
+
+# Zobrist keys of the standard board
+ZOBRIST_PIECES = get_shape().zobrist_pieces
+ZOBRIST_TURN = get_shape().zobrist_turn
+
+
+# Heuristic versions of the boards (see Board.heuristic)
+HEURISTICS = [0, 1, 2]
+
+
+# Raise a ValueError if the heuristic version doesn't exist (checked when
+# agents are created, so a bad version fails before any search)
+def check_heuristic(heuristic_number):
+    if(heuristic_number not in HEURISTICS):
+        raise ValueError(f"Unknown heuristic {heuristic_number} (choose from {', '.join(map(str, HEURISTICS))})")
+
+
+# Available board implementations (see make_board)
+BACKENDS = ["numpy", "bitboard"]
+
+
+# Create a board using the chosen backend. Both backends have the same
+# interface. Minimax searches about as fast on both (Board keeps its
+# heuristic and wins up to date in move/unmove, BitBoard works them out with
+# bit operations), "bitboard" is about twice as fast for MCTS (moves and
+# random games), so the scripts use it by default.
+def make_board(starting_player=None, backend="numpy", rows=ROWS, columns=COLUMNS, connect=CONNECT):
+    if(backend == "numpy"):
+        return Board(starting_player, rows, columns, connect)
+    if(backend == "bitboard"):
+        from connect4.board.bitboard import BitBoard # Imported here (bitboard imports this module)
+        return BitBoard(starting_player, rows, columns, connect)
+    raise ValueError("Unknown board backend: " + str(backend))
+
+# A connect 4 board (or connect N, on any shape up to MAX_ROWS x MAX_COLUMNS).
+# Filling the board: -1 is opponent, 0 is empty, 1 is the agent
+class Board:
+
+
+    def __init__(self, starting_player=None, rows=ROWS, columns=COLUMNS, connect=CONNECT):
+        import numpy as np # Imported here, so the bitboard backend doesn't need it
+        self.__shape = get_shape(rows, columns, connect)
+        self.__board = np.zeros((rows,columns), dtype=int) # (First row is bottom row)
+        self.__top = np.zeros(columns, dtype=int) # Lowest empty row of this column (i.e., where a piece would fall)
+        self.__history = [] # Allows us to simulate and undo moves
+        if(starting_player == None):
+            self.__turn = random.choice([-1, 1])
+        else:
+            self.__turn = starting_player
+        self.__hash = self.__shape.zobrist_turn if self.__turn == 1 else 0
+        self.__mirrored_hash = self.__hash # Hash of the board flipped left-right
+        # Kept up to date by move/unmove (see heuristic and check_win):
+        self.__window_sums = [0] * len(self.__shape.windows) # Sum of the pieces in each window
+        self.__lines = {1: 0, -1: 0} # Windows full of one player's pieces
+        self.__vertical_threes = [0] * columns # 1/-1 if the top connect - 1 pieces of a column are a player's
+        self.__threes = 0 # Score of heuristic version 0
+        self.__middle_key = self.__shape.empty_middle_key
+    
+    
+    # Get the board's BoardShape (rows, columns, connect and their tables)
+    def get_shape(self):
+        return self.__shape
+    
+    # Return a board in the form of an array
+    def get_board(self):
+        return self.__board.flatten()
+    
+    # Print the board in a way that's easy for humans to understand.
+    def print_board(self):
+        from colorama import Fore # Only needed here (imported late so the boards load faster)
+        def filter(number):
+            if(number == 1):
+                return Fore.RED + 'X' + Fore.RESET
+            if(number == -1):
+                return Fore.YELLOW + 'O' + Fore.RESET
+            if(number == 0):
+                return '.'
+        for row in range(self.__shape.rows - 1, -1, -1):
+            for column in range(self.__shape.columns):
+                print(filter(self.__board[row][column]), end=" ")
+            print()
+        print("\n" + " ".join(str(column) for column in range(self.__shape.columns)))
+    
+    
+    # Swap turn: -1 -> 1, 1 -> -1
+    def __swap_turn(self):
+        if(self.__turn == 1): self.__turn = -1
+        else: self.__turn = 1
+        
+    
+    # Get the current player's turn
+    def get_turn(self):
+        return self.__turn
+    
+    # Get the Zobrist hash of the position (pieces and turn)
+    def get_hash(self):
+        return self.__hash
+    
+    # Get the hash of the board flipped left-right
+    def get_mirrored_hash(self):
+        return self.__mirrored_hash
+    
+    # Get a key shared by the board and its mirror image: the smaller of the
+    # two hashes
+    def canonical_key(self):
+        return min(self.__hash, self.__mirrored_hash)
+    
+    # True if canonical_key is the mirror image's hash, so moves have to be
+    # mirrored (mirror_move) to go between the board and the canonical form
+    def is_mirrored(self):
+        return self.__mirrored_hash < self.__hash
+    
+    # True if the board is the same as its mirror image
+    def is_symmetric(self):
+        return self.__mirrored_hash == self.__hash
+    
+    # Get the columns played so far, in order
+    def get_moves(self):
+        return [column for [row, column] in self.__history]
+        
+    # Returns the legal moves (i.e., columns that are not full)
+    def get_legal_moves(self):
+        legal_moves = []
+        rows = self.__shape.rows
+        # For each column
+        for column in range(self.__shape.columns):
+            # Examine the piece in the top row of this column
+            if(self.__board[rows - 1, column] == 0):
+                legal_moves.append(column)
+        return legal_moves
+    
+    
+    # Returns the legal moves that would win immediately for player
+    # (player doesn't have to be the one whose turn it is).
+    def get_winning_moves(self, player):
+        winning_moves = []
+        cell_windows = self.__shape.cell_windows
+        window_sums = self.__window_sums
+        # A window through the empty cell whose other pieces are all player's
+        target = (self.__shape.connect - 1) * player
+        for column in self.get_legal_moves():
+            for window in cell_windows[self.__top[column]][column]:
+                if(window_sums[window] == target):
+                    winning_moves.append(column)
+                    break
+        return winning_moves
+    
+    
+    # Make a move (assume the move is legal, otherwise a crash may occur)
+    def move(self, column):
+        shape = self.__shape
+        row = self.__top[column]
+        self.__board[row, column] = self.__turn # Make the move
+        self.__hash ^= shape.zobrist_pieces[self.__turn][row][column] ^ shape.zobrist_turn
+        self.__mirrored_hash ^= shape.zobrist_pieces[self.__turn][row][shape.columns - 1 - column] ^ shape.zobrist_turn
+        self.__history.append([row, column]) # Store move to history
+        self.__top[column] += 1 # New drop location will be one row higher
+        self.__update_heuristic(row, column, self.__turn)
+        self.__swap_turn()
+        
+    
+    # Undo one move (the most recent one)
+    def unmove(self):
+        if(len(self.__history) == 0): return # Nothing to undo
+        shape = self.__shape
+        [row, column] = self.__history.pop() # Remove move from history
+        self.__board[row, column] = 0 # Clear move
+        self.__top[column] -= 1 # Update new drop location
+        self.__swap_turn()
+        self.__update_heuristic(row, column, -self.__turn)
+        self.__hash ^= shape.zobrist_pieces[self.__turn][row][column] ^ shape.zobrist_turn
+        self.__mirrored_hash ^= shape.zobrist_pieces[self.__turn][row][shape.columns - 1 - column] ^ shape.zobrist_turn
+        
+    
+    # Update the heuristic and the lines after piece was added to (or, if
+    # it's negative, removed from) the cell. Only the windows through the
+    # cell change.
+    def __update_heuristic(self, row, column, piece):
+        shape = self.__shape
+        window_sums = self.__window_sums
+        threes = self.__threes
+        # A window counts for the heuristic if one player has all but one
+        # of its cells and the last one is empty (sum connect - 1)
+        three = shape.connect - 1
+        heuristic_windows = shape.heuristic_windows
+        # Lines (a player's pieces in every cell) for check_win
+        line = piece * shape.connect
+        lines = self.__lines
+        for window in shape.cell_windows[row][column]:
+            old_sum = window_sums[window]
+            new_sum = old_sum + piece
+            window_sums[window] = new_sum
+            if(window < heuristic_windows):
+                if(old_sum == three or old_sum == -three): threes -= old_sum // three
+                if(new_sum == three or new_sum == -three): threes += new_sum // three
+            if(new_sum == line): lines[piece] += 1
+            elif(old_sum == -line): lines[-piece] -= 1
+        # Vertical: the top connect - 1 pieces of the column
+        top = self.__top[column]
+        vertical = 0
+        if(top >= three):
+            eval = 0
+            for below in range(1, three + 1):
+                eval += self.__board[top - below, column]
+            if(eval == three): vertical = 1
+            elif(eval == -three): vertical = -1
+        threes += vertical - self.__vertical_threes[column]
+        self.__vertical_threes[column] = vertical
+        self.__threes = threes
+        if(column == shape.middle_column):
+            self.__middle_key += piece * shape.powers_of_3[row]
+    
+    
+    # Determine if the board is full
+    def check_full(self):
+        return 1 if len(self.__history) == self.__shape.cells else 0
+    
+    
+    # Determine if a player won (kept up to date by move/unmove)
+    def check_win(self, player):
+        return 1 if self.__lines[player] > 0 else 0
+    
+    
+    # Determine if a player won by checking every window (same result as
+    # check_win)
+    def full_check_win(self, player):
+        board = self.__board
+        for window in self.__shape.windows:
+            win = 1
+            for row, column in window:
+                if(board[row, column] != player):
+                    win = 0
+                    break
+            if(win == 1): return 1
+        # If no win
+        return 0
+    
+    
+    # Apply the heuristic. Specify which heuristic (there are a few
+    # different heuristic functions).
+    # The score is kept up to date by move/unmove, so this is just a lookup.
+    # Gives the same values as full_heuristic.
+    def heuristic(self, heuristic_number):
+        if(heuristic_number == 0): return self.__threes
+        shape = self.__shape
+        key = (heuristic_number, self.__threes, self.__middle_key)
+        value = shape.middle_scores.get(key)
+        if(value == None):
+            check_heuristic(heuristic_number)
+            score = self.__threes
+            weight = 1
+            for row in range(shape.middle_rows[heuristic_number]):
+                score += ((self.__middle_key // shape.powers_of_3[row]) % 3 - 1) * weight
+                weight -= 0.1
+            value = shape.middle_scores[key] = score
+        return value
+    
+    
+    # Compute the heuristic from scratch (same values as heuristic)
+    def full_heuristic(self, heuristic_number):
+        if(heuristic_number == 0): return self.__heuristic0_1_2(version=0)
+        if(heuristic_number == 1): return self.__heuristic0_1_2(version=1)
+        if(heuristic_number == 2): return self.__heuristic0_1_2(version=2)
+        check_heuristic(heuristic_number)
+    
+        
+    
+    # Heuristic 1:
+    # Gives a point for each connect-in-a-row minus one piece (must be empty).
+    # In version 0, it gives no additiona points for pieces in the middle column.
+    # In version 1, it gives points for each piece in the middle column.
+    # In version 2, it gives points only for the bottom 4 piece in the middle
+    # column since top middle pieces might not mean much.
+    def __heuristic0_1_2(self, version):
+        rows, columns, connect = self.__shape.rows, self.__shape.columns, self.__shape.connect
+        three = connect - 1
+        score = 0
+        # Look for connect-in-a-row patterns where either player has
+        # connect - 1 of their pieces and the last one is empty.
+        #
+        # Check vertical in each column:
+        for column in range(columns):
+            # If fewer than connect - 1 pieces in this column, it's not possible:
+            if(self.__top[column] < three):
+                continue
+            eval = 0
+            for below in range(1, connect):
+                eval += self.__board[self.__top[column] - below, column]
+            if(eval == three): score += 1
+            elif(eval == -three): score -= 1
+        # Check horizontals in each row:
+        for row in range(rows):
+            for leftmost_piece_column in range(0, columns - three):
+                # Pieces must add up to connect - 1
+                eval = 0
+                for i in range(connect):
+                    eval += self.__board[row, leftmost_piece_column + i]
+                if(eval == three): score += 1
+                elif(eval == -three): score -= 1
+        # Check diagonal (/) wins:
+        for bottom_piece_row in range(0, rows - three):
+            for leftmost_piece_column in range(0, columns - three):
+                eval = 0
+                for i in range(connect):
+                    eval += self.__board[bottom_piece_row + i, leftmost_piece_column + i]
+                if(eval == three): score += 1
+                elif(eval == -three): score -= 1
+        # Check diagonal (\) wins:
+        for bottom_piece_row in range(0, rows - three):
+            for rightmost_piece_column in range(three, columns):
+                eval = 0
+                for i in range(connect):
+                    eval += self.__board[bottom_piece_row + i, rightmost_piece_column - i]
+                if(eval == three): score += 1
+                elif(eval == -three): score -= 1
+        #
+        # Finally, give points for having pieces in the middle column,
+        # giving more points to lower rows:
+        if(version == 1 or version == 2):
+            weight = 1
+            for row in range(self.__shape.middle_rows[version]):
+                score += self.__board[row, self.__shape.middle_column] * weight
+                weight -= 0.1
+        return score
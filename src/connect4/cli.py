@@ -0,0 +1,294 @@
+from time import perf_counter
+START_TIME = perf_counter() # When the CLI was loaded (the times it reports start here)
+from contextlib import redirect_stdout
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# The connect4 command: non-interactive commands for scripts and short-lived
+# worker processes. Positions are move strings (the columns played from the
+# empty board, e.g. "3342") and every command prints one JSON object to
+# stdout (progress goes to stderr). Errors are printed as {"error": "..."}
+# with exit status 1.
+#
+# Commands:
+#   bestmove: the agent's move for a position, with the search info and
+#       how long loading and searching took
+#   play: play the game out from a position (one agent for both sides, or
+#       the first agent for the player to move and the second for the other)
+#   battle: round-robin tournament (see battle_agents.py)
+#   bench: cold start (new process to first move) time of bestmove, and
+#       with --suite the benchmark suite (see benchmark.py)
+#   book: build the opening book in the cache directory
+#
+# Agents are specs as in battle_agents.py ("minimax:depth=4",
+# "mcts:iterations=1000,solver=true").
+#
+# Start-up: this module only imports the standard library. The agents are
+# imported when a command needs them, and NumPy, colorama, the process pools,
+# the solver and the statistics only when they're used (a plain Minimax
+# bestmove on the bitboard doesn't import NumPy, see tests/test_cli.py). The opening book is the only
+# table that takes long to compute (the shape tables take about a
+# millisecond): "connect4 book" builds it once in the cache directory, and
+# with --book the agents memory-map it, so loading it costs almost nothing.
+#
+# Examples:
+#   connect4 bestmove 3342 --agent minimax:depth=6
+#   connect4 bestmove 33 --agent mcts:iterations=5000 --time 200
+#   connect4 play 33 --agent minimax:depth=4 --agent mcts:iterations=1000
+#   connect4 battle --agent minimax:depth=4 --agent mcts:iterations=1000 --games 10
+#   connect4 bench --runs 10
+#   connect4 book --plies 4 --depth 8
+# (or python -m connect4 ... from the src directory)
+
+DEFAULT_AGENT = "minimax"
+
+ROWS, COLUMNS, CONNECT = 6, 7, 4 # Default board shape (same as board.board)
+
+
+# Directory of the precomputed tables: $CONNECT4_CACHE, or connect4 in the
+# user's cache directory
+def cache_directory():
+    if(os.environ.get("CONNECT4_CACHE")):
+        return os.environ["CONNECT4_CACHE"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "connect4")
+
+
+def default_book_path():
+    return os.path.join(cache_directory(), "opening_book.bin")
+
+
+# Milliseconds since the CLI was loaded
+def elapsed_ms(start_time=START_TIME):
+    return (perf_counter() - start_time) * 1000
+
+
+# Board shape of the arguments: (rows, columns, connect)
+def shape_of(arguments):
+    return (arguments.rows, arguments.columns, arguments.connect)
+
+
+# Create the board of a position (raises ValueError for an illegal move or
+# a game that's already over)
+def make_position(moves, starting_player, shape):
+    from connect4.board.board import make_board
+    board = make_board(starting_player, "bitboard", *shape)
+    for move in moves:
+        if(not move.isdigit() or int(move) not in board.get_legal_moves()):
+            raise ValueError(f"Illegal move {move}")
+        turn = board.get_turn()
+        board.move(int(move))
+        if(board.check_win(turn)):
+            raise ValueError("The game is already over")
+    if(board.check_full()):
+        raise ValueError("The game is already over")
+    return board
+
+
+# Agent config of a spec, with the opening book of --book (None is no
+# book, "" the one in the cache directory)
+def agent_config(spec, book, shape):
+    from connect4.battle_agents import parse_agent
+    config = parse_agent(spec)
+    if(book != None):
+        if(shape != (ROWS, COLUMNS, CONNECT)):
+            raise ValueError(f"Opening books are only for the {ROWS}x{COLUMNS} board (connect {CONNECT})")
+        path = book or default_book_path()
+        if(not os.path.exists(path)):
+            raise ValueError(f"No opening book at {path} (build it with: connect4 book)")
+        config["book"] = path
+    return config
+
+
+def bestmove(arguments):
+    shape = shape_of(arguments)
+    import_start = perf_counter()
+    from connect4.battle_agents import make_agent, move_arguments
+    import_ms = elapsed_ms(import_start)
+    board = make_position(arguments.moves, arguments.starting_player, shape)
+    config = agent_config(arguments.agent, arguments.book, shape)
+    if(arguments.time != None):
+        config["time"] = arguments.time
+    agent = make_agent(config)
+    search_start = perf_counter()
+    try:
+        move = agent.get_move(board, **move_arguments(config))
+    finally:
+        agent.close()
+    search_ms = elapsed_ms(search_start)
+    return {"move": move, "info": agent.get_last_search_info(),
+            "time_ms": {"import": import_ms, "search": search_ms, "total": elapsed_ms()}}
+
+
+def play(arguments):
+    from connect4.battle_agents import play_game
+    import random
+    shape = shape_of(arguments)
+    board = make_position(arguments.moves, arguments.starting_player, shape)
+    configs = [agent_config(spec, arguments.book, shape) for spec in arguments.agent or [DEFAULT_AGENT]]
+    if(len(configs) > 2):
+        raise ValueError("play takes one or two agents")
+    # Agent 1 of play_game is player -1
+    first, second = configs[0], configs[-1]
+    config1, config2 = (first, second) if board.get_turn() == -1 else (second, first)
+    seed = arguments.seed if arguments.seed != None else random.getrandbits(32)
+    return play_game(config1, config2, arguments.starting_player, seed, "bitboard", shape, arguments.moves)
+
+
+def battle(arguments):
+    from connect4.battle_agents import parse_agent, agent_name, run_tournament, summarize
+    configs = [parse_agent(spec) for spec in arguments.agent]
+    if(arguments.config):
+        with open(arguments.config) as file:
+            configs += json.load(file)
+    if(len(configs) < 2):
+        raise ValueError("battle needs at least two agents")
+    names = [agent_name(config) for config in configs]
+    if(len(set(names)) != len(names)):
+        raise ValueError("agent names must be different (use name=...)")
+    output = open(arguments.output, "a") if arguments.output else None
+    try:
+        # run_tournament prints its progress, which isn't part of the answer
+        with redirect_stdout(sys.stderr):
+            records = run_tournament(configs, arguments.games, arguments.workers, arguments.seed, "bitboard",
+                                     output, shape_of(arguments))
+    finally:
+        if(output != None):
+            output.close()
+    return {"agents": names, "games": len(records), "summary": summarize(names, records)}
+
+
+# Run a command in a new process and return how long it took (seconds) and
+# its output
+def run_process(command, environment):
+    start_time = perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, env=environment)
+    seconds = perf_counter() - start_time
+    if(process.returncode != 0):
+        raise ValueError(f"{' '.join(command)} failed: {process.stdout.strip() or process.stderr.strip()}")
+    return seconds, process.stdout
+
+
+def bench(arguments):
+    from connect4.benchmark import latency_summary, run_benchmarks
+    # The new processes import the CLI from where this one did
+    environment = dict(os.environ)
+    source = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [source, environment.get("PYTHONPATH")]))
+    command = [sys.executable, "-m", "connect4", "bestmove", arguments.moves, "--agent", arguments.agent]
+    run_process(command, environment) # Warm the file cache and compile the modules
+    python_times, cold_times, reported = [], [], []
+    for run in range(arguments.runs):
+        python_times.append(run_process([sys.executable, "-c", "pass"], environment)[0])
+        seconds, output = run_process(command, environment)
+        cold_times.append(seconds)
+        reported.append(json.loads(output)["time_ms"])
+    result = {"command": command[1:], "runs": arguments.runs,
+              "python_startup": latency_summary(python_times), "cold_start": latency_summary(cold_times)}
+    for name in ("import", "search"):
+        result[name] = latency_summary([times[name] / 1000 for times in reported])
+    if(arguments.suite):
+        with redirect_stdout(sys.stderr):
+            result["suite"] = run_benchmarks("bitboard", memory=False, quick=not arguments.full)
+    return result
+
+
+def book(arguments):
+    from connect4.opening_book import generate_book
+    path = arguments.output or default_book_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Written next to the book and renamed, so other processes never see
+    # half a book
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with redirect_stdout(sys.stderr):
+            count = generate_book(temporary_path, arguments.plies, arguments.depth, arguments.heuristic,
+                                  arguments.time_limit_ms, arguments.workers)
+        os.replace(temporary_path, path)
+    finally:
+        if(os.path.exists(temporary_path)):
+            os.remove(temporary_path)
+    return {"path": path, "positions": count, "time_ms": elapsed_ms()}
+
+
+# Arguments shared by the commands that take a position
+def add_position_arguments(parser):
+    parser.add_argument("moves", nargs="?", default="", help="Columns played so far, e.g. 3342")
+    parser.add_argument("--starting-player", type=int, choices=[1, -1], default=1)
+    add_shape_arguments(parser)
+    parser.add_argument("--book", nargs="?", const="", default=None,
+                        help="Play book moves (from this file, or the cache directory's book)")
+
+
+def add_shape_arguments(parser):
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--columns", type=int, default=COLUMNS)
+    parser.add_argument("--connect", type=int, default=CONNECT, help="Pieces in a row to win")
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="connect4", description="Connect 4 agents (JSON output).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("bestmove", help="Find the agent's move for a position")
+    add_position_arguments(command)
+    command.add_argument("--agent", default=DEFAULT_AGENT, help="Agent spec, e.g. minimax:depth=4")
+    command.add_argument("--time", type=float, default=None, help="Time limit for the search (milliseconds)")
+    command.set_defaults(function=bestmove)
+
+    command = commands.add_parser("play", help="Play the game out from a position")
+    add_position_arguments(command)
+    command.add_argument("--agent", action="append", default=[],
+                         help="Agent spec (once for both sides, or first for the player to move)")
+    command.add_argument("--seed", type=int, default=None)
+    command.set_defaults(function=play)
+
+    command = commands.add_parser("battle", help="Round-robin tournament between agents")
+    command.add_argument("--agent", action="append", default=[], help="Agent spec (at least two)")
+    command.add_argument("--config", help="JSON file with a list of agent configs")
+    command.add_argument("--games", type=int, default=1, help="Game sets per pair (one start per agent)")
+    command.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    command.add_argument("--seed", type=int, default=441)
+    command.add_argument("--output", help="Append the game records to this JSONL file")
+    add_shape_arguments(command)
+    command.set_defaults(function=battle)
+
+    command = commands.add_parser("bench", help="Measure the cold start time of bestmove")
+    command.add_argument("--runs", type=int, default=10)
+    command.add_argument("--moves", default="", help="Position of the bestmove runs")
+    command.add_argument("--agent", default=DEFAULT_AGENT, help="Agent of the bestmove runs")
+    command.add_argument("--suite", action="store_true", help="Also run the benchmark suite (quick)")
+    command.add_argument("--full", action="store_true", help="Run the whole suite, not the quick one")
+    command.set_defaults(function=bench)
+
+    command = commands.add_parser("book", help="Build the opening book in the cache directory")
+    command.add_argument("--plies", type=int, default=4, help="Book every position up to this many moves")
+    command.add_argument("--depth", type=int, default=8, help="Search depth for each position")
+    command.add_argument("--heuristic", type=int, default=1)
+    command.add_argument("--time-limit-ms", type=int, default=None,
+                         help="Search each position with iterative deepening for this long instead")
+    command.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    command.add_argument("--output", help="Book file (default: opening_book.bin in the cache directory)")
+    command.set_defaults(function=book)
+    return parser
+
+
+# JSON for the values json doesn't know (NumPy numbers)
+def json_default(value):
+    if(hasattr(value, "item")):
+        return value.item()
+    return str(value)
+
+
+def main(argv=None):
+    arguments = make_parser().parse_args(argv)
+    try:
+        result = arguments.function(arguments)
+    except (ValueError, OSError) as error:
+        print(json.dumps({"error": str(error)}))
+        return 1
+    print(json.dumps(result, default=json_default))
+    return 0
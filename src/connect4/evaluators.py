@@ -0,0 +1,222 @@
+from connect4.board.board import check_heuristic
+from connect4.board.batch import heuristic_batch
+import json
+import numpy as np
+
+# Evaluators: the heuristics as objects that are given to the agents, so a
+# new evaluation can be tried without changing the board. An evaluator has:
+#   evaluate(board): score of a board from player 1's view (like
+#       Board.heuristic, higher is better for player 1)
+#   evaluate_batch(cells, shape): scores of many boards of a BoardShape,
+#       given as cells (like Board.get_board), as a NumPy array
+# Evaluators are created by name with make_evaluator (see EVALUATORS and
+# register_evaluator), or loaded from a JSON file saved by save_evaluator.
+
+
+# The built-in heuristics of Board (heuristic_number 0, 1 or 2)
+class HeuristicEvaluator:
+
+
+    def __init__(self, heuristic_number=1):
+        check_heuristic(heuristic_number)
+        self.heuristic_number = heuristic_number
+        self.name = "heuristic" + str(heuristic_number)
+
+
+    def evaluate(self, board):
+        return board.heuristic(self.heuristic_number)
+
+
+    def evaluate_batch(self, cells, shape):
+        return heuristic_batch(cells, self.heuristic_number, shape)
+
+
+    def to_dict(self):
+        return {"evaluator": self.name}
+
+
+# Connect length -> class of every window content (base 3 code, digit =
+# piece + 1): 0 if both players (or no one) have pieces in it, k if player 1
+# has k pieces and the rest is empty, connect - 1 + k for player -1.
+_window_classes = {}
+
+
+def window_classes(connect):
+    if(connect not in _window_classes):
+        pieces = np.array([[(code // 3 ** i) % 3 - 1 for i in range(connect)] for code in range(3 ** connect)])
+        mine = np.sum(pieces == 1, axis=1)
+        theirs = np.sum(pieces == -1, axis=1)
+        classes = np.where((theirs == 0) & (mine < connect), mine, 0)
+        classes = np.where((mine == 0) & (theirs > 0) & (theirs < connect), connect - 1 + theirs, classes)
+        _window_classes[connect] = classes
+    return _window_classes[connect]
+
+
+# Linear pattern-weight evaluator: the score is a weighted sum of features
+# (player 1's count minus player -1's count):
+#   "open_k": windows of the shape (every direction, see BoardShape) where
+#       the player has k pieces and the other cells are empty
+#   "middle_row_r": piece in row r of the middle column
+#   "column_d": pieces in the columns d columns away from the middle column
+# The default weights are close to heuristic 1 (open lines of connect - 1
+# pieces, and the middle column weights 1, 0.9, 0.8, ...).
+#
+# A window is scored by a table lookup: its cells are read as a base 3
+# number (digit = piece + 1) and the table has the value of every possible
+# window, so a whole batch is scored with a few NumPy operations.
+class LinearEvaluator:
+
+
+    # weights is a dictionary feature name -> weight (missing features keep
+    # their default weight)
+    def __init__(self, weights=None):
+        self.name = "linear"
+        self.__weights = dict(weights or {})
+        self.__tables = {} # BoardShape -> (window values, cell weights, powers of 3)
+
+
+    # Names of the features of a BoardShape
+    @staticmethod
+    def feature_names(shape):
+        names = [f"open_{k}" for k in range(1, shape.connect)]
+        names += [f"middle_row_{row}" for row in range(shape.rows)]
+        names += [f"column_{distance}" for distance in range(1, max(shape.middle_column,
+                                                                    shape.columns - 1 - shape.middle_column) + 1)]
+        return names
+
+
+    # Default weight of a feature
+    @staticmethod
+    def default_weight(name, shape):
+        if(name == f"open_{shape.connect - 1}"):
+            return 1.0
+        if(name.startswith("middle_row_")):
+            return round(1 - 0.1 * int(name[len("middle_row_"):]), 10)
+        return 0.0
+
+
+    # Weights of a shape's features as an array (in feature_names order)
+    def get_weights(self, shape):
+        return np.array([self.__weights.get(name, self.default_weight(name, shape))
+                         for name in self.feature_names(shape)], dtype=float)
+
+
+    # Set the weights from an array (in feature_names order)
+    def set_weights(self, shape, weights):
+        for name, weight in zip(self.feature_names(shape), weights):
+            self.__weights[name] = float(weight)
+        self.__tables = {}
+
+
+    # Positional features (middle_row_r and column_d) as a (cells, features)
+    # matrix: cells @ matrix gives the features
+    @staticmethod
+    def __cell_features(shape):
+        names = LinearEvaluator.feature_names(shape)[shape.connect - 1:]
+        matrix = np.zeros((shape.cells, len(names)))
+        for row in range(shape.rows):
+            for column in range(shape.columns):
+                cell = row * shape.columns + column
+                distance = abs(column - shape.middle_column)
+                if(distance == 0):
+                    matrix[cell, names.index(f"middle_row_{row}")] = 1
+                else:
+                    matrix[cell, names.index(f"column_{distance}")] = 1
+        return matrix
+
+
+    # Window values and cell weights of a shape for the current weights
+    def __get_tables(self, shape):
+        tables = self.__tables.get(shape)
+        if(tables == None):
+            connect = shape.connect
+            weights = self.get_weights(shape)
+            open_weights = np.concatenate([[0], weights[:connect - 1], -weights[:connect - 1]])
+            window_values = open_weights[window_classes(connect)]
+            cell_weights = self.__cell_features(shape) @ weights[connect - 1:]
+            tables = self.__tables[shape] = (window_values, cell_weights, 3 ** np.arange(connect))
+        return tables
+
+
+    def evaluate(self, board):
+        shape = board.get_shape()
+        window_values, cell_weights, powers = self.__get_tables(shape)
+        cells = board.get_board()
+        codes = (cells[shape.line_indices] + 1) @ powers
+        return float(window_values[codes].sum() + cells @ cell_weights)
+
+
+    def evaluate_batch(self, cells, shape):
+        window_values, cell_weights, powers = self.__get_tables(shape)
+        cells = np.asarray(cells, dtype=int).reshape(-1, shape.cells)
+        codes = (cells[:, shape.line_indices] + 1) @ powers
+        return window_values[codes].sum(axis=1) + cells @ cell_weights
+
+
+    # Features of many boards (cells like Board.get_board) as an
+    # (N, features) array, so that evaluate_batch is features @ get_weights
+    def features(self, cells, shape):
+        connect = shape.connect
+        cells = np.asarray(cells, dtype=int).reshape(-1, shape.cells)
+        codes = (cells[:, shape.line_indices] + 1) @ (3 ** np.arange(connect))
+        classes = window_classes(connect)[codes]
+        features = np.empty((len(cells), len(self.feature_names(shape))))
+        for k in range(1, connect):
+            features[:, k - 1] = np.sum(classes == k, axis=1) - np.sum(classes == connect - 1 + k, axis=1)
+        features[:, connect - 1:] = cells @ self.__cell_features(shape)
+        return features
+
+
+    def to_dict(self):
+        return {"evaluator": self.name, "weights": self.__weights}
+
+
+# Name -> function that creates the evaluator (with no arguments)
+EVALUATORS = {
+    "heuristic0": lambda: HeuristicEvaluator(0),
+    "heuristic1": lambda: HeuristicEvaluator(1),
+    "heuristic2": lambda: HeuristicEvaluator(2),
+    "linear": LinearEvaluator,
+}
+
+# Name -> function that creates the evaluator from the dictionary saved by
+# save_evaluator
+LOADERS = {
+    "linear": lambda data: LinearEvaluator(data.get("weights")),
+}
+
+
+# Add an evaluator to the registry. factory creates it with no arguments,
+# loader (optional) creates it from a saved dictionary.
+def register_evaluator(name, factory, loader=None):
+    EVALUATORS[name] = factory
+    if(loader != None):
+        LOADERS[name] = loader
+
+
+# Get an evaluator: evaluator objects are returned as they are, strings are
+# a registered name or the path of a JSON file saved by save_evaluator.
+def make_evaluator(evaluator):
+    if(not isinstance(evaluator, str)):
+        return evaluator
+    if(evaluator in EVALUATORS):
+        return EVALUATORS[evaluator]()
+    if(evaluator.endswith(".json")):
+        return load_evaluator(evaluator)
+    raise ValueError(f"Unknown evaluator '{evaluator}' (choose from {', '.join(EVALUATORS)} or a .json file)")
+
+
+# Save an evaluator (its to_dict) to a JSON file
+def save_evaluator(evaluator, path):
+    with open(path, "w") as file:
+        json.dump(evaluator.to_dict(), file, indent=4)
+
+
+# Load an evaluator saved by save_evaluator
+def load_evaluator(path):
+    with open(path) as file:
+        data = json.load(file)
+    name = data["evaluator"]
+    if(name in LOADERS):
+        return LOADERS[name](data)
+    return make_evaluator(name)
@@ -0,0 +1,830 @@
+
+from connect4.board.board import Board, mirror_move
+from math import sqrt, log, inf
+from time import perf_counter
+import random
+from connect4.node_pool import NodePool, NO_RESULT, WIN, TIE, LOSS
+from connect4.rollout import rollout
+from connect4.ponder import Ponderer, copy_board
+# The opening book, the evaluators (progressive bias) and the statistics and
+# profiling are imported when an agent uses them (see Minimax_Agent).
+
+# Pondering stops by itself after this many times the agent's number of
+# simulations (so the tree doesn't grow without limit)
+PONDER_LIMIT = 8
+
+# With a time limit, the clock and the early stopping rule (see
+# choice_decided) are checked every CHECK_INTERVAL iterations
+CHECK_INTERVAL = 16
+
+# Games each worker simulates for a leaf with leaf parallelization. A task
+# sent to a worker process costs about as much as a few random games, so
+# each one plays several.
+LEAF_GAMES = 8
+
+
+# MCTS builds a tree; these nodes will be used for the tree.
+# score/possible is the favorability of this node.
+# children is a list of child nodes. The index is the action, the
+# element is the child node pointer.
+# (__slots__ keeps each node small; NodePool is smaller still.)
+class TreeNode: 
+    __slots__ = ("game_result", "score", "games", "children")
+    
+    def __init__(self, current_board):
+        self.game_result = None # If game didn't end
+        # If game ended, can't have children:
+        # Check win for previous move's player (notice '-' sign)
+        if(current_board.check_win(-current_board.get_turn())):
+            self.game_result = 1
+        elif(current_board.check_full()):
+            self.game_result = 0.5
+        
+        self.score = 0 # Keep track of number of wins
+        self.games = 0 # Keep track of number of games played
+        # Create a dictionary of children.
+        # Key is action, value is child TreeNode pointer
+        self.children = None
+            
+    
+    # Given the parent's (this node's) board, find out what the children are.
+    # With symmetry, a symmetric board only gets one child for each pair of
+    # mirrored moves (they lead to mirror images of the same position).
+    def create_children(self, current_board, symmetry=False):
+        legal_actions = current_board.get_legal_moves()
+        if(symmetry and current_board.is_symmetric()):
+            legal_actions = [action for action in legal_actions
+                             if action <= mirror_move(action, current_board.get_shape().columns)]
+        self.children = {}
+        for action in legal_actions:
+            current_board.move(action)
+            self.children[action] = TreeNode(current_board)
+            current_board.unmove()
+            
+            
+    # Calcualte how favorable it is to expand this node:
+    # wi/ni + c * sqrt(lnNi / ni)
+    # N is the total number of simulations through parent node.
+    # c is the exploration paremter.
+    def expansion_favorability(self, N, c):
+        # If this is a winning board, "expand" this way all the time:
+        if(self.game_result == 1):
+            return 1
+        # If tie, this would be the only move available. Return anything (0):
+        elif(self.game_result == 0.5):
+            return 0.5
+        # If no games through this node have been played (divide by 0),
+        # return out a decent number to encourage to expand this way at least
+        # once:
+        if(self.games == 0): return inf
+        return self.score/self.games + c * sqrt(log(N) / self.games)
+    
+    
+    # Get the action node we should expand next
+    def choose_expansion(self, c):
+        # Now find and return the child with the maximum expansion favorability
+        max_child = None
+        max_child_favorability = -inf
+        for child in self.children:
+            child_favorability = self.children[child].expansion_favorability(self.games, c)
+            if(child_favorability > max_child_favorability):
+                max_child = child
+                max_child_favorability = child_favorability
+        return max_child
+    
+    
+    # Get the favorability of choosing this action in a test-game
+    def calculate_favorability(self):
+        if(self.game_result == 1): return inf
+        if(self.game_result == 0.5): return 0.5
+        if(self.games == 0): return 0
+        else: return self.score / self.games
+        
+        
+# Get the favorability of choosing an action in a test-game from its
+# statistics (see TreeNode.calculate_favorability, game_result 0 is a loss
+# proven by the MCTS-Solver)
+def statistics_favorability(score, games, game_result):
+    if(game_result == 1): return inf
+    if(game_result == 0.5): return 0.5
+    if(game_result == 0): return -1
+    if(games == 0): return 0
+    return score / games
+
+
+# Lowest and highest favorability (statistics_favorability) a root child
+# can reach after remaining_games more games through the root. A finished or
+# proven result doesn't change. With solver, any other child could still be
+# proven won or lost.
+def favorability_range(score, games, game_result, remaining_games, solver=False):
+    if(game_result != None):
+        favorability = statistics_favorability(score, games, game_result)
+        return favorability, favorability
+    if(solver):
+        return -1, inf
+    if(games + remaining_games == 0):
+        return 0, 0
+    return score / (games + remaining_games), (score + remaining_games) / (games + remaining_games)
+
+
+# True if remaining_games more games can't change the move get_move plays
+# (statistics as in MCTS_Agent.root_statistics): the child with the best
+# favorability (the first one, on a tie) stays ahead even if it loses every
+# game left and any other child wins them all.
+def choice_decided(statistics, remaining_games, solver=False):
+    actions = list(statistics)
+    if(len(actions) == 0): return False
+    favorabilities = [statistics_favorability(*statistics[action]) for action in actions]
+    leader = favorabilities.index(max(favorabilities))
+    lowest = favorability_range(*statistics[actions[leader]], remaining_games, solver)[0]
+    for index in range(len(actions)):
+        if(index == leader): continue
+        highest = favorability_range(*statistics[actions[index]], remaining_games, solver)[1]
+        # A child before the leader would be played on a tie
+        if(highest > lowest or (highest == lowest and index < leader)):
+            return False
+    return True
+
+
+# Number of nodes in a TreeNode tree
+def count_nodes(treenode):
+    count = 0
+    to_visit = [treenode]
+    while(len(to_visit) > 0):
+        node = to_visit.pop()
+        count += 1
+        if(node.children != None):
+            to_visit += node.children.values()
+    return count
+
+
+# Run in a worker process (root parallelization): build a separate tree for
+# the board and return the statistics of the root's children as a dictionary
+# action -> (score, games, game_result), and the search info.
+# options are more MCTS_Agent arguments (solver, rave, ...). Workers don't
+# stop early: the move is chosen from the merged statistics, which one
+# worker's can't decide.
+def root_search_worker(board, number_of_simulations, exploration_parameter, tree, rollout_policy, symmetry, seed,
+                       options={}, time_limit_ms=None, max_iterations=None):
+    random.seed(seed) # Otherwise every worker would play the same games
+    agent = MCTS_Agent(number_of_simulations, exploration_parameter, tree=tree, rollout_policy=rollout_policy,
+                       symmetry=symmetry, **options)
+    statistics = agent.root_statistics(agent.search(board, time_limit_ms, max_iterations, stop_early=False))
+    return statistics, agent.get_last_search_info()
+
+
+# Agents of the worker processes, by rollout policy (see rollout_worker)
+_rollout_agents = {}
+
+
+# Run in a worker process (leaf parallelization): simulate games from the
+# board and return the total result for caller.
+def rollout_worker(board, caller, number_of_games, rollout_policy, seed):
+    random.seed(seed)
+    agent = _rollout_agents.get(rollout_policy)
+    if(agent == None):
+        agent = _rollout_agents[rollout_policy] = MCTS_Agent(0, rollout_policy=rollout_policy)
+    total = 0
+    for i in range(number_of_games):
+        total += agent.play_out(board, caller)
+    return total
+
+
+class MCTS_Agent:
+    
+    # workers is the number of processes used for the search. With more than
+    # one worker, parallel chooses how the work is split:
+    #   "root": each worker builds its own tree with its share of the
+    #           simulations, and the root children's statistics are merged.
+    #   "leaf": one tree, but every leaf gets leaf_games simulations per
+    #           worker (run at the same time) instead of just one. The
+    #           number of simulations stays the same, so the tree gets
+    #           workers * leaf_games times fewer leaves.
+    # tree chooses how the tree is stored: "pool" (compact arrays, see
+    # NodePool, 15 bytes per node against about 115 for a TreeNode, and
+    # just as fast) or "objects" (one TreeNode per node).
+    # With reuse_tree, the agent keeps its tree between moves: the next search
+    # starts from the part of the tree under the moves that were played.
+    # rollout_policy chooses how leaf games are simulated: "board" (simulate,
+    # on the board itself), or a policy of the fast rollout engine: "random"
+    # (same games as "board") or "light" (see rollout.py).
+    # opening_book is an OpeningBook (or the path of one) whose moves are
+    # played without searching.
+    # With symmetry, mirrored moves on a symmetric board share one node
+    # (see TreeNode.create_children), so their statistics are merged.
+    # stats, stats_memory and profile_path are the same as for Minimax_Agent
+    # (rollout lengths are only known for games simulated in this process).
+    # With ponder, get_move starts pondering on the position after its move
+    # (see start_pondering).
+    # These need the "pool" tree (see NodePool):
+    #   solver: MCTS-Solver, wins and losses are proven and backed up the
+    #       tree (a node is lost for the player who moved into it if the
+    #       player to move can win, won if every move loses). Proven nodes
+    #       aren't searched again, and the search stops once the root is proven.
+    #   rave: RAVE equivalence parameter (e.g., 300, 0 is off): the score of
+    #       a move is mixed with its all-moves-as-first score (how the games
+    #       went where the player played that column later on).
+    #   progressive_bias: weight of the heuristic (the evaluator, Board's
+    #       heuristic 1 by default) in the choice of the child to expand,
+    #       fading as the child gets games (0 is off).
+    def __init__(self, number_of_simulations, exploration_paremeter=sqrt(2), workers=1, parallel="root",
+                 tree="pool", reuse_tree=True, rollout_policy="random", opening_book=None, symmetry=False,
+                 stats=False, stats_memory=False, profile_path=None, ponder=False, solver=False, rave=0,
+                 progressive_bias=0, evaluator=None, leaf_games=LEAF_GAMES):
+        if(tree != "pool" and (solver or rave or progressive_bias)):
+            raise ValueError("solver, rave and progressive_bias need tree=\"pool\"")
+        if(rave and workers > 1 and parallel == "leaf"):
+            raise ValueError("rave doesn't work with leaf parallelization")
+        self.__solver = solver
+        self.__rave = rave
+        self.__progressive_bias = progressive_bias
+        self.__evaluator = None
+        if(progressive_bias):
+            from connect4.evaluators import make_evaluator
+            self.__evaluator = make_evaluator(evaluator or "heuristic1")
+        self.__played = None # Columns played by each player below the current node (RAVE)
+        self.__ponder = ponder
+        self.__ponderer = Ponderer()
+        self.__book = None
+        if(opening_book != None):
+            from connect4.opening_book import open_book
+            self.__book = open_book(opening_book)
+        self.__collect_stats = stats
+        self.__stats_memory = stats_memory
+        self.__stats = None # SearchStats of the current get_move (None if not collected)
+        self.__last_stats = None
+        self.__profiler = None
+        if(profile_path != None):
+            from connect4.search_stats import MoveProfiler
+            self.__profiler = MoveProfiler(profile_path)
+        self.__symmetry = symmetry
+        self.__exploration_parameter = exploration_paremeter
+        self.__number_of_simulations = number_of_simulations
+        self.__workers = workers
+        self.__parallel = parallel
+        self.__leaf_games = leaf_games
+        self.__pool = None
+        self.__tree_type = tree
+        self.__tree = None # NodePool when tree is "pool"
+        self.__reuse_tree = reuse_tree
+        self.__rollout_policy = rollout_policy
+        self.__rollouts = 0 # Number of games simulated in the current search
+        self.__last_search_info = None
+        self.__root = None # Root of the last search (kept for reuse)
+        self.__root_moves = None # Moves played on the board at the root
+        self.__root_hash = None # Hash of the board at the root
+    
+    
+    # Get the process pool (created the first time it's needed)
+    def __get_pool(self):
+        if(self.__pool == None):
+            from concurrent.futures import ProcessPoolExecutor # Imported here, only parallel searches need it
+            self.__pool = ProcessPoolExecutor(max_workers=self.__workers)
+        return self.__pool
+    
+    
+    # Stop pondering and shut down the worker processes (if any)
+    def close(self):
+        self.__ponderer.stop()
+        if(self.__pool != None):
+            self.__pool.shutdown()
+            self.__pool = None
+    
+    
+    # Return the score from the opponent's perspective (score is the total
+    # over the given number of games)
+    def opponent_score(self, score, games=1):
+        return games - score
+
+    
+    # Simulate a game given a board.
+    # Must provide the caller, i.e., the player that called this simulation
+    # function. We need this to assign the correct result value.
+    # If stats (a SearchStats) is given, the game is counted in it, and
+    # played is filled like in rollout.
+    def simulate(self, current_board, caller, stats=None, played=None):
+        depth = 0
+        result = None
+        # Loop until the game is over (win or tie).
+        while(1):
+            turn = current_board.get_turn()
+            legal_moves = current_board.get_legal_moves()
+            action = random.choice(legal_moves) # Make random move
+            current_board.move(action)
+            depth += 1
+            # Check for win
+            if(current_board.check_win(turn)):
+                if(turn == caller): result = 1
+                else: result = 0
+                break
+            # Check for tie
+            if(current_board.check_full()):
+                result = 0.5
+                break
+        # Undo the moves:
+        if(played != None):
+            played[1] = played[-1] = 0
+            player = current_board.get_turn() * (-1) ** depth # Player of the first move
+            for move in current_board.get_moves()[-depth:]:
+                played[player] |= 1 << move
+                player = -player
+        for i in range(depth):
+            current_board.unmove()
+        if(stats != None): stats.add_rollout(depth)
+        return result
+    
+    
+    # Simulate a game with the agent's rollout policy (see simulate)
+    def play_out(self, current_board, caller, played=None):
+        if(self.__rollout_policy == "board"):
+            return self.simulate(current_board, caller, self.__stats, played)
+        return rollout(current_board, caller, self.__rollout_policy, self.__stats, played)
+    
+    
+    # Simulate from a leaf's board for the player whose turn it is.
+    # Returns the total result and the number of games it's for (played is
+    # filled like in rollout, without leaf parallelization).
+    def __rollout(self, board, played=None):
+        if(self.__workers > 1 and self.__parallel == "leaf"):
+            # leaf_games simulations per worker, all at the same time
+            pool = self.__get_pool()
+            futures = [pool.submit(rollout_worker, board, board.get_turn(), self.__leaf_games,
+                                   self.__rollout_policy, random.getrandbits(32)) for i in range(self.__workers)]
+            games = len(futures) * self.__leaf_games
+            self.__rollouts += games
+            return sum(future.result() for future in futures), games
+        self.__rollouts += 1
+        return self.play_out(board, board.get_turn(), played), 1
+
+
+    # Called on a leaf treenode. If this leaf is a finished game, return the
+    # result. Otherwise, simulate the game and update the treenode.
+    # Returns the total result and the number of games it's for.
+    def simulate_and_update_leaf(self, board, treenode):
+        # If it's a win or tie, return result
+        if(treenode.game_result == 1):
+            return 1, 1
+        elif(treenode.game_result == 0.5):
+            return 0.5, 1
+        # Otherwise, simulate and update the score and games played
+        result, games = self.__rollout(board)
+        result = self.opponent_score(result, games)
+        treenode.score += result
+        treenode.games += games
+        # Return the result as it would appear to the opponent:
+        return result, games
+        
+        
+    # Go down the tree, find a leaf, expand it and run a simulation on it.
+    # Returns the total result and the number of games it's for.
+    def expand(self, current_board, treenode, c):
+        # If this is a leaf, expand this leaf and run simulation. Exception: if
+        # this is the end of a game, return the game result.
+        if(treenode.children == None):
+            if(treenode.game_result == 1): return 1, 1
+            if(treenode.game_result == 0.5): return 0.5, 1
+            # Otherwise, expand children
+            treenode.create_children(current_board, self.__symmetry)
+            # Choose random child to expand
+            child = random.choice(list(treenode.children))
+            current_board.move(child)
+            # Run simulation on child
+            result, games = self.simulate_and_update_leaf(current_board, treenode.children[child])
+            result = self.opponent_score(result, games)
+            treenode.score += result
+            treenode.games += games
+            # Undo the move and return the result
+            current_board.unmove()
+            return result, games
+        # Otherwise, this is not a leaf. We need to keep going until we find a leaf.
+        # Choose an action and traverse in that direction:
+        child = treenode.choose_expansion(c)
+        current_board.move(child)
+        result, games = self.expand(current_board, treenode.children[child], c)
+        result = self.opponent_score(result, games)
+        # Update this treenode's info, undo move, and return result to parent
+        treenode.score += result
+        treenode.games += games
+        current_board.unmove()
+        return result, games
+    
+    
+    # Same as expand, for a tree stored in a NodePool (node is an index)
+    def expand_pool(self, current_board, node, c):
+        tree = self.__tree
+        if(tree.rave):
+            self.__played = {1: 0, -1: 0}
+        # Won or lost games (finished, or proven by the solver) aren't searched
+        if(tree.result[node] == WIN): return 1, 1
+        if(tree.result[node] == LOSS): return 0, 1
+        # If this is a leaf, expand this leaf and run simulation. Exception: if
+        # this is the end of a game, return the game result.
+        if(tree.first_child[node] < 0):
+            if(tree.result[node] == TIE): return 0.5, 1
+            # Otherwise, expand children
+            tree.create_children(node, current_board, self.__symmetry,
+                                 self.__bias_value if tree.progressive_bias else None)
+            children = tree.children(node)
+            child = None
+            if(tree.solver):
+                # A winning move proves the node lost for the player who moved into it
+                winning_children = (tree.result[children.start:children.stop] == WIN).nonzero()[0]
+                if(len(winning_children) > 0):
+                    tree.result[node] = LOSS
+                    child = children[int(winning_children[0])]
+            if(child == None):
+                # Choose random child to expand
+                child = children.start + random.randrange(len(children))
+            turn = current_board.get_turn()
+            current_board.move(int(tree.action[child]))
+            # Run simulation on child (see simulate_and_update_leaf)
+            if(tree.result[child] == WIN):
+                result, games = 1, 1
+            elif(tree.result[child] == TIE):
+                result, games = 0.5, 1
+            else:
+                result, games = self.__rollout(current_board, self.__played)
+                result = self.opponent_score(result, games)
+                tree.score[child] += result
+                tree.games[child] += games
+            if(tree.rave):
+                self.__update_amaf(node, turn, int(tree.action[child]), result)
+            result = self.opponent_score(result, games)
+            tree.score[node] += result
+            tree.games[node] += games
+            # Undo the move and return the result
+            current_board.unmove()
+            return result, games
+        # Otherwise, this is not a leaf. Choose an action and traverse in that direction:
+        child = tree.choose_expansion(node, c)
+        current_board.move(int(tree.action[child]))
+        result, games = self.expand_pool(current_board, child, c)
+        current_board.unmove()
+        if(tree.solver):
+            self.__prove(node, child)
+        if(tree.rave):
+            self.__update_amaf(node, current_board.get_turn(), int(tree.action[child]), result)
+        result = self.opponent_score(result, games)
+        # Update this node's info and return result to parent
+        tree.score[node] += result
+        tree.games[node] += games
+        return result, games
+    
+    
+    # MCTS-Solver: after searching a child of the node, prove the node if
+    # the child was proven. The player to move wins if the child is won,
+    # and loses if every child is lost.
+    def __prove(self, node, child):
+        tree = self.__tree
+        if(tree.result[child] == WIN):
+            tree.result[node] = LOSS
+        elif(tree.result[child] == LOSS):
+            children = tree.children(node)
+            if((tree.result[children.start:children.stop] == LOSS).all()):
+                tree.result[node] = WIN
+    
+    
+    # RAVE: the player to move at the node (turn) played action, and the
+    # columns in self.__played[turn] later in the game. Every child of the
+    # node for one of those columns gets the game (result is for turn) in
+    # its AMAF statistics.
+    def __update_amaf(self, node, turn, action, result):
+        tree = self.__tree
+        self.__played[turn] |= 1 << action
+        children = tree.children(node)
+        first, end = children.start, children.stop
+        played = (self.__played[turn] >> tree.action[first:end].astype("int64")) & 1
+        tree.amaf_games[first:end] += played
+        tree.amaf_score[first:end] += played * result
+    
+    
+    # Heuristic value of a board for the player who just moved (progressive bias)
+    def __bias_value(self, board):
+        return -board.get_turn() * self.__evaluator.evaluate(board)
+        
+            
+    # Forget the tree kept from the last move (e.g., for a new game)
+    def new_game(self):
+        self.__ponderer.stop()
+        self.__root = None
+        self.__tree = None
+        self.__root_moves = None
+        self.__root_hash = None
+    
+    
+    # Find the node of the last search's tree for this board by following
+    # the moves played since then. Returns None (and the tree has to be
+    # rebuilt) if the board isn't a continuation of the last searched board,
+    # or if a move leads outside of the tree.
+    def __reuse_root(self, board):
+        if(self.__root == None): return None
+        moves = board.get_moves()
+        old_moves = self.__root_moves
+        if(len(moves) < len(old_moves) or moves[:len(old_moves)] != old_moves):
+            return None
+        new_moves = moves[len(old_moves):]
+        # Make sure it's really the same game (e.g., same starting player)
+        for move in new_moves:
+            board.unmove()
+        same_game = board.get_hash() == self.__root_hash
+        for move in new_moves:
+            board.move(move)
+        if(not same_game): return None
+        # Walk down the tree
+        node = self.__root
+        for move in new_moves:
+            if(self.__tree_type == "pool"):
+                node = self.__tree.child(node, move)
+            elif(node.children != None and move in node.children):
+                node = node.children[move]
+            else:
+                node = None
+            if(node == None): return None
+        # Keep only the subtree (the rest of the pool is freed)
+        if(self.__tree_type == "pool"):
+            self.__tree = self.__tree.extract_subtree(node)
+            node = 0
+        return node
+    
+    
+    # Build a tree for the board with the agent's number of simulations and
+    # return its root (a TreeNode, or the root's index in the NodePool).
+    # With time_limit_ms, search until the time is up instead (or after
+    # max_iterations, if given), or, with stop_early, until more games can't
+    # change the move (see choice_decided, the number of games left is
+    # estimated from the games per second so far).
+    def search(self, board, time_limit_ms=None, max_iterations=None, stop_early=True):
+        start_time = perf_counter()
+        self.__rollouts = 0
+        # Make a tree (root node) and create the children, or continue
+        # with the part of the last tree that's still useful.
+        root = None
+        if(self.__reuse_tree):
+            root = self.__reuse_root(board)
+        if(root == None):
+            if(self.__tree_type == "pool"):
+                self.__tree = NodePool(rave=self.__rave, progressive_bias=self.__progressive_bias,
+                                       solver=self.__solver)
+                root = self.__tree.new_root(board)
+            else:
+                root = TreeNode(board)
+        if(self.__tree_type == "pool"):
+            expand = self.expand_pool
+        else:
+            expand = self.expand
+        
+        # Run expansion/simulation algorithm for specific number of moves.
+        # (In leaf parallel mode each expansion plays leaf_games games per worker.)
+        games_per_iteration = 1
+        if(self.__workers > 1 and self.__parallel == "leaf"):
+            games_per_iteration = self.__workers * self.__leaf_games
+        iterations = self.__number_of_simulations if time_limit_ms == None else max_iterations
+        if(iterations != None and games_per_iteration > 1):
+            iterations = max(1, iterations // games_per_iteration)
+        deadline = start_time + time_limit_ms / 1000 if time_limit_ms != None else None
+        done = 0
+        stop = "iterations"
+        while(iterations == None or done < iterations):
+            # Nothing left to search once the solver proved the root
+            if(self.__is_solved(root)):
+                stop = "solved"
+                break
+            # Always expand the root at least once, so there's a move
+            if(deadline != None and done > 0 and done % CHECK_INTERVAL == 0):
+                now = perf_counter()
+                if(now >= deadline):
+                    stop = "time"
+                    break
+                remaining_games = done * games_per_iteration * (deadline - now) / (now - start_time)
+                if(iterations != None):
+                    remaining_games = min(remaining_games, (iterations - done) * games_per_iteration)
+                if(stop_early and choice_decided(self.root_statistics(root), remaining_games, self.__solver)):
+                    stop = "decided"
+                    break
+            expand(board, root, self.__exploration_parameter)
+            done += 1
+        self.__last_search_info = {"iterations": done, "rollouts": self.__rollouts,
+            "nodes": self.__tree.size if self.__tree_type == "pool" else None,
+            "time": perf_counter() - start_time, "solved": self.__is_solved(root), "stop": stop}
+        if(self.__reuse_tree):
+            self.__root = root
+            self.__root_moves = board.get_moves()
+            self.__root_hash = board.get_hash()
+        return root
+    
+    
+    # True if the solver proved the game won or lost at the root
+    def __is_solved(self, root):
+        return self.__solver and self.__tree.result[root] in (WIN, LOSS)
+    
+    
+    # Pondering: search on the opponent's time. Starts growing the tree in
+    # the background from the position after the agent's move (board after
+    # the move, or board and the move to play on it), until get_move or
+    # stop_pondering stops it (or after PONDER_LIMIT times the number of
+    # simulations). The next get_move continues from the part of the tree
+    # under the opponent's reply. Only with reuse_tree, and not with root
+    # parallelization (whose trees aren't kept).
+    def start_pondering(self, board, move=None):
+        self.__ponderer.stop()
+        if(not self.__reuse_tree or (self.__workers > 1 and self.__parallel == "root")):
+            return
+        board = copy_board(board)
+        if(move != None):
+            turn = board.get_turn()
+            board.move(move)
+            if(board.check_win(turn) or board.check_full()):
+                return
+        self.__ponderer.start(self.__ponder_tree, board)
+    
+    
+    # Stop pondering (waits until the background search stopped)
+    def stop_pondering(self):
+        self.__ponderer.stop()
+    
+    
+    # True while the background search is running
+    def is_pondering(self):
+        return self.__ponderer.is_running()
+    
+    
+    # The background search of start_pondering
+    def __ponder_tree(self, board):
+        root = self.__reuse_root(board)
+        if(root == None):
+            if(self.__tree_type == "pool"):
+                self.__tree = NodePool(rave=self.__rave, progressive_bias=self.__progressive_bias,
+                                       solver=self.__solver)
+                root = self.__tree.new_root(board)
+            else:
+                root = TreeNode(board)
+        self.__root = root
+        self.__root_moves = board.get_moves()
+        self.__root_hash = board.get_hash()
+        expand = self.expand_pool if self.__tree_type == "pool" else self.expand
+        for i in range(PONDER_LIMIT * self.__number_of_simulations):
+            if(self.__ponderer.stop_requested() or self.__is_solved(root)): break
+            expand(board, root, self.__exploration_parameter)
+    
+    
+    # Get the statistics of the root's children as a dictionary
+    # action -> (score, games, game_result), game_result as in TreeNode.
+    def root_statistics(self, root):
+        statistics = {}
+        if(self.__tree_type == "pool"):
+            tree = self.__tree
+            game_results = {NO_RESULT: None, WIN: 1, TIE: 0.5, LOSS: 0}
+            for child in tree.children(root):
+                statistics[int(tree.action[child])] = (float(tree.score[child]), float(tree.games[child]),
+                                                       game_results[int(tree.result[child])])
+        else:
+            for action in root.children:
+                child = root.children[action]
+                statistics[action] = (child.score, child.games, child.game_result)
+        return statistics
+    
+    
+    # Root parallelization: split the simulations between the workers, each
+    # building its own tree, and add up the statistics of the root children.
+    # With time_limit_ms, every worker searches for that long (see search),
+    # and max_iterations is split between them.
+    def __search_root_parallel(self, board, time_limit_ms=None, max_iterations=None):
+        start_time = perf_counter()
+        pool = self.__get_pool()
+        options = {"solver": self.__solver, "rave": self.__rave, "progressive_bias": self.__progressive_bias,
+                   "evaluator": self.__evaluator}
+        simulations = self.__number_of_simulations if max_iterations == None else max_iterations
+        futures = []
+        for worker in range(self.__workers):
+            # Share the simulations as evenly as possible
+            iterations = simulations // self.__workers
+            if(worker < simulations % self.__workers):
+                iterations += 1
+            futures.append(pool.submit(root_search_worker, board, max(1, iterations),
+                                       self.__exploration_parameter, self.__tree_type,
+                                       self.__rollout_policy, self.__symmetry, random.getrandbits(32), options,
+                                       time_limit_ms, max(1, iterations) if max_iterations != None else None))
+        statistics = {}
+        self.__last_search_info = {"iterations": 0, "rollouts": 0, "nodes": 0}
+        solved = False
+        stops = set()
+        for future in futures:
+            worker_statistics, worker_info = future.result()
+            for name in self.__last_search_info:
+                if(worker_info[name] == None or self.__last_search_info[name] == None):
+                    self.__last_search_info[name] = None
+                else:
+                    self.__last_search_info[name] += worker_info[name]
+            solved = solved or worker_info["solved"]
+            stops.add(worker_info["stop"])
+            for action in worker_statistics:
+                score, games, game_result = worker_statistics[action]
+                if(action in statistics):
+                    score += statistics[action][0]
+                    games += statistics[action][1]
+                    # A result proven by any worker holds for all of them
+                    if(game_result == None):
+                        game_result = statistics[action][2]
+                statistics[action] = (score, games, game_result)
+        self.__last_search_info["time"] = perf_counter() - start_time
+        self.__last_search_info["solved"] = solved
+        self.__last_search_info["stop"] = stops.pop() if len(stops) == 1 else "mixed"
+        return statistics
+    
+    
+    # Information about the last search: iterations completed, games
+    # simulated (rollouts), games through the root's children (added up
+    # over the workers with root parallelization), nodes in the tree (None
+    # for the "objects" tree),
+    # time taken (seconds), whether the move came from the opening book, the
+    # value of the move (its score rate between 0 and 1, None for a book
+    # move), whether the solver proved the result at the root and why the
+    # search stopped ("iterations", "time", "decided", "solved", "single
+    # move", "mixed" for root parallel workers that stopped for different
+    # reasons, None for a book move).
+    def get_last_search_info(self):
+        return self.__last_search_info
+    
+    
+    # SearchStats of the last get_move call (None unless created with stats)
+    def get_last_search_stats(self):
+        return self.__last_stats
+    
+    
+    # Given a board, make the best move.
+    # Choose how many trials/simulations to play out.
+    # Assumes the current board is not already a winning or tying board.
+    # With time_limit_ms (anytime mode), search for at most that long
+    # instead, and stop early when the move can't change any more (see
+    # search), or when there's only one legal move. The move is chosen the
+    # same way in both modes.
+    # max_iterations (with time_limit_ms) also stops it after that many
+    # iterations.
+    def get_move(self, board, time_limit_ms=None, max_iterations=None):
+        self.__ponderer.stop()
+        if(not self.__collect_stats and self.__profiler == None):
+            move = self.__get_move(board, time_limit_ms, max_iterations)
+        else:
+            move = self.__get_move_with_stats(board, time_limit_ms, max_iterations)
+        if(self.__ponder):
+            self.start_pondering(board, move)
+        return move
+    
+    
+    def __get_move_with_stats(self, board, time_limit_ms, max_iterations):
+        from connect4.search_stats import SearchStats, start_memory_tracking, stop_memory_tracking
+        if(self.__collect_stats):
+            self.__stats = SearchStats()
+            if(self.__stats_memory):
+                tracking = start_memory_tracking()
+        if(self.__profiler != None):
+            self.__profiler.start()
+        try:
+            move = self.__get_move(board, time_limit_ms, max_iterations)
+        finally:
+            if(self.__profiler != None):
+                self.__profiler.stop()
+            stats = self.__stats
+            self.__stats = None
+            if(stats != None and self.__stats_memory):
+                stats.peak_memory = stop_memory_tracking(tracking)
+        if(stats != None):
+            stats.time = self.__last_search_info["time"]
+            stats.tree_size = self.__last_search_info["nodes"]
+            if(stats.tree_size == None and self.__root != None):
+                stats.tree_size = count_nodes(self.__root)
+            self.__last_stats = stats
+        return move
+    
+    
+    def __get_move(self, board, time_limit_ms, max_iterations=None):
+        # Positions in the opening book don't need a search
+        if(self.__book != None):
+            entry = self.__book.lookup(board)
+            if(entry != None):
+                self.__last_search_info = {"iterations": 0, "rollouts": 0, "games": 0, "nodes": 0, "time": 0,
+                                           "book": True, "value": None, "solved": False, "stop": None}
+                return entry[0]
+        if(time_limit_ms != None):
+            legal_moves = board.get_legal_moves()
+            if(len(legal_moves) == 1):
+                self.__last_search_info = {"iterations": 0, "rollouts": 0, "games": 0, "nodes": 0, "time": 0,
+                                           "book": False, "value": None, "solved": False, "stop": "single move"}
+                return legal_moves[0]
+        if(self.__workers > 1 and self.__parallel == "root"):
+            statistics = self.__search_root_parallel(board, time_limit_ms, max_iterations)
+        else:
+            statistics = self.root_statistics(self.search(board, time_limit_ms, max_iterations))
+        self.__last_search_info["book"] = False
+        self.__last_search_info["games"] = sum(statistics[action][1] for action in statistics)
+            
+        max_child = None
+        max_child_favorability = -inf    
+        for child in statistics:
+            favorability = statistics_favorability(*statistics[child])
+            if(favorability > max_child_favorability):
+                max_child = child
+                max_child_favorability = favorability
+        self.__last_search_info["value"] = min(1, max(0, max_child_favorability))
+
+        return max_child
@@ -0,0 +1,884 @@
+
+from connect4.board.board import Board, get_shape, mirror_move, make_board, check_heuristic
+from math import inf
+from time import perf_counter
+from connect4.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from connect4.ponder import Ponderer, copy_board
+# The rest (NumPy with the batched heuristic and the evaluators, the opening
+# book, the solver, the statistics and profiling) is imported when an agent
+# uses it, so a plain search starts fast.
+
+# Instead of inf, use big value so that decreasing it has an impact.
+# Useful for choosing paths that lead to shortest win or longest loss.
+big_value = 10000000
+# Decrease big value by 100 per turn until we reach 100000
+decrease_above = 100000
+
+# Move ordering options (see Minimax_Agent):
+#   "center": search middle columns first
+#   "threats": check for immediate wins and forced blocks before searching
+#   "killers": search moves that caused a cutoff at the same depth first
+#   "history": search moves that caused many cutoffs first
+ALL_MOVE_ORDERING = ("center", "threats", "killers", "history")
+
+
+# A bound can be passed further down the tree only if it's not a win/loss
+# value, since those are changed by 100 per turn on the way up.
+def is_passable(value):
+    return value >= -decrease_above and value <= decrease_above
+
+# Return the bound if it can be passed down, otherwise the neutral value
+def passable_bound(value, neutral):
+    if(is_passable(value)):
+        return value
+    return neutral
+
+class Minimax_Agent:
+    
+    
+    # transposition_table_size is the number of positions remembered between
+    # searches (0 turns the transposition table off).
+    # move_ordering is a collection of move ordering options (see
+    # ALL_MOVE_ORDERING), pvs turns on principal variation search.
+    # batch_leaves scores all the children of a depth 0 node with one
+    # batched heuristic call (faster with Board, the BitBoard heuristic is
+    # already cheaper than a NumPy call).
+    # opening_book is an OpeningBook (or the path of one) whose moves are
+    # played without searching.
+    # Once fewer than solve_below cells are empty, the game is solved
+    # exactly instead (see solver.py, solve_mode is "strong" or "weak").
+    # The default, solve_below=0, never solves, so the agent always plays
+    # its depth-limited search (e.g., solve_below=14 solves the positions
+    # with at most 13 empty cells).
+    # With symmetry, a position and its mirror image share transposition
+    # table entries, and on a symmetric board only one of each pair of
+    # mirrored moves is searched.
+    # With stats, every get_move collects a SearchStats (see
+    # get_last_search_stats), including peak memory with stats_memory.
+    # With profile_path, get_move calls are profiled with cProfile and the
+    # profile is written to that file.
+    # evaluator (an evaluator, or its name or file, see evaluators.py) scores
+    # the positions instead of the board's heuristic_number heuristic.
+    # With workers > 1, workers - 1 helper processes search the same position
+    # (Lazy SMP, see __start_helpers) and share the transposition table in
+    # shared memory. The move is still the one this process's search finds,
+    # so a single worker gives the same results as before.
+    # transposition_table replaces the agent's own table (e.g., a
+    # SharedTranspositionTable, as the helpers use).
+    # With ponder, get_move starts pondering on the position after its move
+    # (see start_pondering).
+    def __init__(self, search_depth, heuristic_number=1, transposition_table_size=1 << 18,
+                 move_ordering=ALL_MOVE_ORDERING, pvs=False, batch_leaves=False, opening_book=None,
+                 solve_below=0, solve_mode="strong", symmetry=False, stats=False, stats_memory=False,
+                 profile_path=None, evaluator=None, workers=1, transposition_table=None, ponder=False):
+        check_heuristic(heuristic_number)
+        self.__search_depth = search_depth
+        self.__ponder = ponder
+        self.__ponderer = Ponderer()
+        self.__pondered = {} # Hash -> (move, search info) of the positions searched while pondering
+        self.__evaluator = None
+        if(evaluator != None):
+            from connect4.evaluators import make_evaluator
+            self.__evaluator = make_evaluator(evaluator)
+        self.__collect_stats = stats
+        self.__stats_memory = stats_memory
+        self.__stats = None # SearchStats of the current get_move (None if not collected)
+        self.__last_stats = None
+        self.__root_depth = 0 # Search depth of the current root search (for plies in stats)
+        self.__profiler = None
+        if(profile_path != None):
+            from connect4.search_stats import MoveProfiler
+            self.__profiler = MoveProfiler(profile_path)
+        self.__symmetry = symmetry
+        self.__book = None
+        if(opening_book != None):
+            from connect4.opening_book import open_book
+            self.__book = open_book(opening_book)
+        self.__solve_below = solve_below
+        self.__solve_mode = solve_mode
+        self.__solver = None # Created the first time it's needed
+        self.__batch_leaves = batch_leaves
+        self.__heuristic_number = heuristic_number
+        self.__move_ordering = move_ordering
+        self.__pvs = pvs
+        self.__killers = {} # depth_left -> moves that caused a cutoff
+        self.__shape = get_shape() # Shape of the board being searched
+        # turn -> cutoff score per column
+        self.__history = {1: [0] * self.__shape.columns, -1: [0] * self.__shape.columns}
+        self.__workers = workers
+        self.__helpers = None # Pool of helper processes (created the first time they're needed)
+        self.__table = transposition_table
+        if(workers > 1):
+            # Imported here, so agents with one process start faster
+            from connect4.shared_table import SharedTranspositionTable
+            if(self.__table == None):
+                # The helpers need a table to share their work
+                self.__table = SharedTranspositionTable(transposition_table_size or 1 << 18)
+            if(not isinstance(self.__table, SharedTranspositionTable)):
+                raise ValueError("A parallel search (workers > 1) needs a SharedTranspositionTable")
+        elif(self.__table == None and transposition_table_size):
+            self.__table = TranspositionTable(transposition_table_size)
+        # Arguments of the helpers' agents (the table is attached by name)
+        self.__helper_settings = {"heuristic_number": heuristic_number, "move_ordering": move_ordering, "pvs": pvs,
+                                  "batch_leaves": batch_leaves, "symmetry": symmetry, "evaluator": self.__evaluator,
+                                  "table_name": self.__table.get_name() if workers > 1 else None}
+        self.__nodes = 0 # Number of positions searched
+        self.__deadline = None # Time (perf_counter) when a timed search must stop
+        self.__stop_requested = None # Function that tells if the search must stop (checked like the deadline)
+        self.__stopped = False # Set when the deadline passed during a search
+        self.__last_search_info = None
+        self.__player = 1 # Player the agent searches for (the heuristic is from player 1's view)
+        
+    
+    # Look up the board in the transposition table. Returns (key, flip,
+    # entry): with symmetry the key is the canonical key and flip tells if
+    # moves have to be mirrored between the board and the table (the entry's
+    # move is already mirrored back).
+    def __probe(self, board):
+        if(not self.__symmetry):
+            hash = board.get_hash()
+            return hash, False, self.__table.probe(hash)
+        key = board.canonical_key()
+        flip = board.is_mirrored()
+        entry = self.__table.probe(key)
+        if(flip and entry != None and entry[4] != None):
+            entry = entry[:4] + (mirror_move(entry[4], self.__shape.columns),) + entry[5:]
+        return key, flip, entry
+    
+    
+    # Store a search result (move for the board, see __probe)
+    def __store(self, key, flip, depth_left, bound, value, best_move):
+        if(flip and best_move != None):
+            best_move = mirror_move(best_move, self.__shape.columns)
+        self.__table.store(key, depth_left, bound, value, best_move)
+    
+    
+    # Order the moves so the ones most likely to cause a cutoff are searched
+    # first: the transposition table's best move, then killer moves, then by
+    # history score (ties keep the center-first order).
+    def __order_moves(self, legal_moves, entry, depth_left, turn):
+        ordering = self.__move_ordering
+        if("center" in ordering):
+            legal_moves = [move for move in self.__shape.center_order if move in legal_moves]
+        if("history" in ordering):
+            history = self.__history[turn]
+            legal_moves = sorted(legal_moves, key=lambda move: -history[move])
+        first_moves = []
+        if(entry != None and entry[4] != None):
+            first_moves.append(entry[4])
+        if("killers" in ordering and depth_left in self.__killers):
+            first_moves += self.__killers[depth_left]
+        if(len(first_moves) == 0):
+            return legal_moves
+        ordered_moves = []
+        for move in first_moves:
+            if(move in legal_moves and move not in ordered_moves):
+                ordered_moves.append(move)
+        return ordered_moves + [move for move in legal_moves if move not in ordered_moves]
+    
+    
+    # Remember a move that caused a cutoff (killer and history heuristics)
+    def __record_cutoff(self, move, depth_left, turn):
+        if("killers" in self.__move_ordering):
+            killers = self.__killers.setdefault(depth_left, [])
+            if(move not in killers):
+                killers.insert(0, move)
+                del killers[2:] # Keep the 2 most recent
+        if("history" in self.__move_ordering):
+            self.__history[turn][move] += (depth_left + 1) * (depth_left + 1)
+    
+    
+    # Check for immediate wins and forced blocks before searching.
+    # Returns (value, moves): if value isn't None the player to move wins
+    # right away. Otherwise moves are the moves worth searching (only the
+    # blocking moves if the opponent threatens to win, since anything else
+    # loses right away and can't be better).
+    def __check_threats(self, board, legal_moves, depth_left, win_value):
+        turn = board.get_turn()
+        winning_moves = board.get_winning_moves(turn)
+        if(len(winning_moves) > 0):
+            return win_value, winning_moves
+        # At depth 0 the other moves are scored by the heuristic (the
+        # opponent's win isn't seen), so keep them all to give the same values.
+        if(depth_left > 0):
+            blocking_moves = board.get_winning_moves(-turn)
+            if(len(blocking_moves) > 0):
+                return None, [move for move in legal_moves if move in blocking_moves]
+        return None, legal_moves
+    
+        
+    # Heuristic value of the board for the agent's player
+    def __evaluate(self, board, heuristic_number):
+        if(self.__stats != None):
+            start_time = perf_counter()
+            value = self.__heuristic(board, heuristic_number) * self.__player
+            self.__stats.heuristic_time += perf_counter() - start_time
+            self.__stats.heuristic_calls += 1
+            return value
+        if(self.__player == 1):
+            return self.__heuristic(board, heuristic_number)
+        return -self.__heuristic(board, heuristic_number)
+    
+    
+    # Heuristic value of the board from player 1's view (the evaluator's if
+    # the agent has one)
+    def __heuristic(self, board, heuristic_number):
+        if(self.__evaluator != None):
+            return self.__evaluator.evaluate(board)
+        return board.heuristic(heuristic_number)
+    
+    
+    # Heuristic values of many boards (cells) from player 1's view
+    def __heuristic_batch(self, cells, heuristic_number):
+        if(self.__evaluator != None):
+            return self.__evaluator.evaluate_batch(cells, self.__shape)
+        from connect4.board.batch import heuristic_batch
+        return heuristic_batch(cells, heuristic_number, self.__shape)
+    
+    
+    # Score every child of a depth 0 node at once.
+    # Returns (move, value) if a move ends the game (win_value for a win, 0
+    # for a tie), otherwise (None, scores) with one heuristic score per move.
+    def __score_children(self, board, legal_moves, turn, heuristic_number, win_value):
+        children = []
+        for move in legal_moves:
+            board.move(move)
+            if(board.check_win(turn)):
+                board.unmove()
+                return move, win_value
+            elif(board.check_full()):
+                board.unmove()
+                return move, 0
+            children.append(board.get_board())
+            board.unmove()
+        if(self.__stats != None):
+            start_time = perf_counter()
+            scores = self.__heuristic_batch(children, heuristic_number) * self.__player
+            self.__stats.heuristic_time += perf_counter() - start_time
+            self.__stats.heuristic_calls += len(children)
+            return None, scores
+        return None, self.__heuristic_batch(children, heuristic_number) * self.__player
+    
+    
+    # Count a searched position and check if we ran out of time or were told
+    # to stop (only every 256 positions since it's slow compared to a node).
+    def __out_of_time(self):
+        self.__nodes += 1
+        if((self.__nodes & 255) == 0):
+            if(self.__deadline != None and perf_counter() > self.__deadline):
+                self.__stopped = True
+            elif(self.__stop_requested != None and self.__stop_requested()):
+                self.__stopped = True
+        return self.__stopped
+    
+    
+    # Return value of the agent's best move.
+    # If we find a value >= the kickout value, stop immidiately
+    # and return that value (alpha-beta pruning).
+    # floor_value is the value the min player can already get higher up in
+    # the tree, so moves worse than it don't need an exact value.
+    # Depth_left tells us how much farther down the tree we will
+    # search before applying the heuristic.
+    def max_move(self, board, kickout_value, depth_left, heuristic_number, floor_value=-big_value):
+        if(self.__out_of_time()): return 0
+        if(self.__stats != None): self.__stats.add_node(self.__root_depth - depth_left)
+        max_value = -big_value
+        best_move = None
+        legal_moves = board.get_legal_moves()
+        turn = board.get_turn()
+        # Bounds from higher up can only be passed down if they aren't win/loss
+        # values (those get changed by 100 per turn on the way up).
+        floor_value = passable_bound(floor_value, -big_value)
+        ceiling_value = passable_bound(kickout_value, big_value)
+        
+        # Check if this position was already searched at least this deep
+        table = self.__table
+        entry = None
+        if(table != None):
+            hash, flip, entry = self.__probe(board)
+            if(entry != None and entry[1] >= depth_left):
+                if(entry[2] == EXACT): return entry[3]
+                if(entry[2] == LOWER and entry[3] > kickout_value): return entry[3]
+                if(entry[2] == UPPER and entry[3] < floor_value): return entry[3]
+        if("threats" in self.__move_ordering):
+            win_value, legal_moves = self.__check_threats(board, legal_moves, depth_left, big_value)
+            if(win_value != None):
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, big_value, legal_moves[0])
+                return big_value
+        legal_moves = self.__order_moves(legal_moves, entry, depth_left, turn)
+        
+        # At depth 0, every child gets the heuristic so score them together
+        if(depth_left == 0 and self.__batch_leaves):
+            best_move, result = self.__score_children(board, legal_moves, turn, heuristic_number, big_value)
+            if(best_move == None):
+                best_index = int(result.argmax())
+                best_move = legal_moves[best_index]
+                result = result[best_index]
+            if(table != None): self.__store(hash, flip, depth_left, EXACT, result, best_move)
+            return result
+        
+        # Try each move:
+        for move in legal_moves:
+            board.move(move) # Make the move
+            # If this was a winning move, just return (guaranteed best value).
+            if(board.check_win(turn)):
+                board.unmove()
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, big_value, move)
+                return big_value
+            # If tie, return 0
+            elif(board.check_full()):
+                board.unmove()
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, 0, move)
+                return 0
+            # Otherwise we need to play-out or estimate.
+            # If we reached max search depth, apply heuristic:
+            if(depth_left == 0):
+                estimate = self.__evaluate(board, heuristic_number)
+            # Otherwise play out:
+            else:
+                child_kickout = max(max_value, floor_value)
+                # Principal variation search: after the first move, only check
+                # if the move beats the best so far (null window), and search
+                # again with the full window if it does.
+                if(self.__pvs and best_move != None and is_passable(child_kickout)):
+                    estimate = self.min_move(board, child_kickout, depth_left - 1, heuristic_number, child_kickout)
+                    if(not self.__stopped and estimate > child_kickout and estimate <= ceiling_value):
+                        estimate = self.min_move(board, child_kickout, depth_left - 1, heuristic_number, ceiling_value)
+                else:
+                    estimate = self.min_move(board, child_kickout, depth_left - 1, heuristic_number, ceiling_value)
+                if(self.__stopped):
+                    board.unmove()
+                    return 0
+                if(estimate > decrease_above):
+                    estimate -= 100
+            if(estimate > max_value or best_move == None):
+                max_value = max(max_value, estimate)
+                best_move = move
+            board.unmove() # Undo the simulation move
+            # If we can prune:
+            if(max_value > kickout_value):
+                self.__record_cutoff(move, depth_left, turn)
+                if(self.__stats != None): self.__stats.add_cutoff(move == legal_moves[0])
+                # Pruned, so the real value might be even higher
+                if(table != None): self.__store(hash, flip, depth_left, LOWER, max_value, best_move)
+                return max_value
+        if(table != None):
+            # If every move was worse than the floor, the moves were cut
+            # short and the real value might be even lower
+            bound = UPPER if max_value < floor_value else EXACT
+            self.__store(hash, flip, depth_left, bound, max_value, best_move)
+        return max_value
+
+        
+    # Same as max_move but for the opponent (the agent's value is minimized).
+    # ceiling_value is the value the max player can already get higher up in
+    # the tree.
+    def min_move(self, board, kickout_value, depth_left, heuristic_number, ceiling_value=big_value):
+        if(self.__out_of_time()): return 0
+        if(self.__stats != None): self.__stats.add_node(self.__root_depth - depth_left)
+        min_value = big_value
+        best_move = None
+        legal_moves = board.get_legal_moves()
+        turn = board.get_turn()
+        ceiling_value = passable_bound(ceiling_value, big_value)
+        floor_value = passable_bound(kickout_value, -big_value)
+        
+        # Check if this position was already searched at least this deep
+        table = self.__table
+        entry = None
+        if(table != None):
+            hash, flip, entry = self.__probe(board)
+            if(entry != None and entry[1] >= depth_left):
+                if(entry[2] == EXACT): return entry[3]
+                if(entry[2] == UPPER and entry[3] < kickout_value): return entry[3]
+                if(entry[2] == LOWER and entry[3] > ceiling_value): return entry[3]
+        if("threats" in self.__move_ordering):
+            win_value, legal_moves = self.__check_threats(board, legal_moves, depth_left, -big_value)
+            if(win_value != None):
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, -big_value, legal_moves[0])
+                return -big_value
+        legal_moves = self.__order_moves(legal_moves, entry, depth_left, turn)
+        
+        # At depth 0, every child gets the heuristic so score them together
+        if(depth_left == 0 and self.__batch_leaves):
+            best_move, result = self.__score_children(board, legal_moves, turn, heuristic_number, -big_value)
+            if(best_move == None):
+                best_index = int(result.argmin())
+                best_move = legal_moves[best_index]
+                result = result[best_index]
+            if(table != None): self.__store(hash, flip, depth_left, EXACT, result, best_move)
+            return result
+        
+        # Try each move:
+        for move in legal_moves:
+            board.move(move) # Make the move
+            # If this was a winning move (losing for agent), just
+            # return (guaranteed worst value).
+            if(board.check_win(turn)):
+                board.unmove()
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, -big_value, move)
+                return -big_value
+            # If tie, return 0
+            elif(board.check_full()):
+                board.unmove()
+                if(table != None): self.__store(hash, flip, depth_left, EXACT, 0, move)
+                return 0
+            # Otherwise we need to play-out or estimate.
+            # If we reached max search depth, apply heuristic:
+            if(depth_left == 0):
+                estimate = self.__evaluate(board, heuristic_number)
+            # Otherwise play out:
+            else:
+                child_kickout = min(min_value, ceiling_value)
+                # Principal variation search (see max_move)
+                if(self.__pvs and best_move != None and is_passable(child_kickout)):
+                    estimate = self.max_move(board, child_kickout, depth_left - 1, heuristic_number, child_kickout)
+                    if(not self.__stopped and estimate < child_kickout and estimate >= floor_value):
+                        estimate = self.max_move(board, child_kickout, depth_left - 1, heuristic_number, floor_value)
+                else:
+                    estimate = self.max_move(board, child_kickout, depth_left - 1, heuristic_number, floor_value)
+                if(self.__stopped):
+                    board.unmove()
+                    return 0
+                if(estimate < -decrease_above):
+                    estimate += 100
+            if(estimate < min_value or best_move == None):
+                min_value = min(min_value, estimate)
+                best_move = move
+            board.unmove() # Undo the simulation move
+            # If we can prune:
+            if(min_value < kickout_value):
+                self.__record_cutoff(move, depth_left, turn)
+                if(self.__stats != None): self.__stats.add_cutoff(move == legal_moves[0])
+                # Pruned, so the real value might be even lower
+                if(table != None): self.__store(hash, flip, depth_left, UPPER, min_value, best_move)
+                return min_value
+        if(table != None):
+            # If every move was better than the ceiling, the moves were cut
+            # short and the real value might be even higher
+            bound = LOWER if min_value > ceiling_value else EXACT
+            self.__store(hash, flip, depth_left, bound, min_value, best_move)
+        return min_value
+
+
+
+    # Search every root move to the given depth and return the best move and
+    # its value. root_order is the order to try the moves in (e.g., the best
+    # move of the previous iteration first). Returns (None, None) if the time
+    # ran out before the search finished.
+    def __search_root(self, board, search_depth, root_order):
+        # Return the move that's closer to the middle. This will help
+        # settle ties, since middle moves are generally prefered.
+        def better_move(move1, move2):
+            if(move1 == None): return move2
+            for move in self.__shape.center_order:
+                if(move1 == move): return move1
+                if(move2 == move): return move2
+            return move1
+
+        max_value = -big_value
+        best_move = None # Ties will be settled by choosing middle-most column.
+        self.__root_depth = search_depth
+        if(self.__stats != None): self.__stats.add_node(0)
+        
+        # Try each move:
+        for move in root_order:
+            turn = board.get_turn()
+            board.move(move) # Make the move
+            # If this was a winning move, just return (guaranteed best value).
+            # If full, this must be the only move, so also okay to return.
+            if(board.check_win(turn)):
+                board.unmove()
+                return move, big_value
+            if(board.check_full()):
+                board.unmove()
+                return move, 0
+            # Otherwise we need to play-out or estimate.
+            # If we reached max search depth, apply heuristic:
+            if(search_depth == 0):
+                estimate = self.__evaluate(board, self.__heuristic_number)
+                # If new best move found
+                if(estimate > max_value):
+                    max_value = estimate
+                    best_move = move
+                # If equally good best move found, favor middle move
+                elif(estimate == max_value):
+                    max_value = estimate
+                    best_move = better_move(best_move, move)
+            # Otherwise play out:
+            else:
+                estimate = self.min_move(board, max_value, search_depth - 1, self.__heuristic_number)
+                if(self.__stopped):
+                    board.unmove()
+                    return None, None
+                if(estimate > decrease_above):
+                    estimate -= 100
+                # If new best move found
+                if(estimate > max_value):
+                    max_value = estimate
+                    best_move = move
+                # If equally good best move found, favor middle move
+                elif(estimate == max_value):
+                    max_value = estimate
+                    best_move = better_move(best_move, move)
+            board.unmove() # Undo the simulation move
+        return best_move, max_value
+    
+    
+    # Follow the best moves stored in the transposition table from this
+    # board to get the line the search expects to be played.
+    def __principal_variation(self, board, max_length):
+        variation = []
+        if(self.__table == None): return variation
+        while(len(variation) < max_length):
+            entry = self.__probe(board)[2]
+            if(entry == None or entry[4] == None or entry[4] not in board.get_legal_moves()):
+                break
+            turn = board.get_turn()
+            board.move(entry[4])
+            variation.append(entry[4])
+            if(board.check_win(turn) or board.check_full()):
+                break
+        for move in variation:
+            board.unmove()
+        return variation
+
+
+    # Get the best move for player given a board.
+    # If time_limit_ms is given, search depth 0, 1, 2, ... (iterative
+    # deepening) until the time runs out and return the best move of the
+    # deepest search that finished (not deeper than max_depth, if given).
+    # Otherwise search to the agent's depth.
+    def get_move(self, board, time_limit_ms=None, max_depth=None):
+        pondered = self.__stop_pondering(board, time_limit_ms)
+        if(pondered != None):
+            move, self.__last_search_info = pondered
+        elif(not self.__collect_stats and self.__profiler == None):
+            move, self.__last_search_info = self.__get_move(board, time_limit_ms, max_depth)
+        else:
+            move = self.__get_move_with_stats(board, time_limit_ms, max_depth)
+        if(self.__ponder):
+            self.start_pondering(board, move)
+        return move
+    
+    
+    def __get_move_with_stats(self, board, time_limit_ms, max_depth):
+        from connect4.search_stats import SearchStats, start_memory_tracking, stop_memory_tracking
+        if(self.__collect_stats):
+            self.__stats = SearchStats()
+            if(self.__stats_memory):
+                tracking = start_memory_tracking()
+        if(self.__profiler != None):
+            self.__profiler.start()
+        try:
+            move, self.__last_search_info = self.__get_move(board, time_limit_ms, max_depth)
+        finally:
+            if(self.__profiler != None):
+                self.__profiler.stop()
+            stats = self.__stats
+            self.__stats = None
+            if(stats != None and self.__stats_memory):
+                stats.peak_memory = stop_memory_tracking(tracking)
+        if(stats != None):
+            stats.time = self.__last_search_info["time"]
+            if(self.__table != None):
+                stats.tree_size = self.__table.count()
+            self.__last_stats = stats
+        return move
+    
+    
+    # Search the board, returns the move and the search info (see
+    # get_last_search_info)
+    def __get_move(self, board, time_limit_ms, max_depth=None):
+        start_time = perf_counter()
+        self.__shape = board.get_shape()
+        # Positions in the opening book don't need a search
+        if(self.__book != None):
+            entry = self.__book.lookup(board)
+            if(entry != None):
+                move, value, depth = entry
+                return move, {"depth": depth, "nodes": 0, "time": perf_counter() - start_time,
+                    "value": value, "principal_variation": [move], "book": True, "solved": False}
+        # Few empty cells left: solve the game exactly
+        empty_cells = self.__shape.cells - len(board.get_moves())
+        if(empty_cells < self.__solve_below):
+            return self.__solve(board, empty_cells, start_time)
+        self.__nodes = 0
+        self.__stopped = False
+        self.__deadline = None
+        self.__killers = {}
+        self.__history = {1: [0] * self.__shape.columns, -1: [0] * self.__shape.columns}
+        if(self.__table != None):
+            # Stored values are for the agent's player, so they can't be
+            # reused after switching sides
+            if(board.get_turn() != self.__player):
+                self.__table.clear()
+            self.__table.new_search()
+        self.__player = board.get_turn()
+        legal_moves = self.__root_moves(board)
+        # Deepest iterative deepening search (with a time limit)
+        max_depth = empty_cells - 1 if max_depth == None else min(max_depth, empty_cells - 1)
+        if(self.__workers == 1):
+            return self.__search(board, legal_moves, time_limit_ms, start_time, max_depth)
+        helpers = self.__start_helpers(board, self.__search_depth if time_limit_ms == None else max_depth,
+                                       time_limit_ms != None)
+        try:
+            move, info = self.__search(board, legal_moves, time_limit_ms, start_time, max_depth)
+        finally:
+            helper_nodes = self.__stop_helpers(helpers)
+        info["nodes"] += helper_nodes
+        return move, info
+    
+    
+    # The root moves to search, in order
+    def __root_moves(self, board):
+        legal_moves = board.get_legal_moves()
+        if("center" in self.__move_ordering):
+            legal_moves = [move for move in self.__shape.center_order if move in legal_moves]
+        # On a symmetric board, a move and its mirror are just as good
+        if(self.__symmetry and board.is_symmetric()):
+            legal_moves = [move for move in legal_moves if move <= mirror_move(move, self.__shape.columns)]
+        return legal_moves
+    
+    
+    # Search the root moves to the agent's depth, or with iterative
+    # deepening if there is a time limit, and return the best move and the
+    # search info
+    def __search(self, board, legal_moves, time_limit_ms, start_time, max_depth):
+        # Fixed depth search
+        if(time_limit_ms == None):
+            best_move, value = self.__search_root(board, self.__search_depth, legal_moves)
+            return best_move, {"depth": self.__search_depth, "nodes": self.__nodes,
+                "time": perf_counter() - start_time, "value": value,
+                "principal_variation": [best_move] + self.__after_move(board, best_move), "book": False,
+                "solved": False}
+
+        # Iterative deepening. The first iteration always finishes so there is
+        # always a move to return.
+        best_move = None
+        value = None
+        completed_depth = None
+        variation = []
+        depth = 0
+        while(depth <= max_depth):
+            # Try the previous iteration's best move first. Deeper in the
+            # tree, the rest of its principal variation is tried first through
+            # the best moves stored in the transposition table.
+            root_order = legal_moves
+            if(best_move != None):
+                root_order = [best_move] + [move for move in legal_moves if move != best_move]
+            new_best_move, new_value = self.__search_root(board, depth, root_order)
+            if(new_best_move == None):
+                break # Out of time, keep the last completed depth's move
+            best_move, value = new_best_move, new_value
+            completed_depth = depth
+            variation = [best_move] + self.__after_move(board, best_move)
+            # A forced win or loss was found, searching deeper won't change it
+            if(value > decrease_above or value < -decrease_above):
+                break
+            depth += 1
+            self.__deadline = start_time + time_limit_ms / 1000
+            if(perf_counter() > self.__deadline):
+                break
+        return best_move, {"depth": completed_depth, "nodes": self.__nodes,
+            "time": perf_counter() - start_time, "value": value,
+            "principal_variation": variation, "book": False, "solved": False}
+    
+    
+    # Lazy SMP: start the helpers on the board. Every helper searches it with
+    # iterative deepening up to max_depth, with the root moves rotated so
+    # each one starts in a different part of the tree. They only fill the
+    # shared table, which this process's search then reads. With deeper,
+    # every other helper goes one deeper (for the next iteration of a timed
+    # search). Fixed depth searches don't: the deeper entries would change
+    # the values this process finds. Returns the helpers' futures.
+    def __start_helpers(self, board, max_depth, deeper):
+        if(self.__helpers == None):
+            from concurrent.futures import ProcessPoolExecutor
+            self.__helpers = ProcessPoolExecutor(max_workers=self.__workers - 1, initializer=_start_helper,
+                                                 initargs=(self.__helper_settings,))
+        moves = list(board.get_moves())
+        starting_player = board.get_turn() * (-1) ** len(moves)
+        shape = (self.__shape.rows, self.__shape.columns, self.__shape.connect)
+        self.__table.set_stop(False)
+        return [self.__helpers.submit(_help_search, starting_player, moves, shape,
+                                      max_depth + (helper % 2 if deeper else 0), helper + 1)
+                for helper in range(self.__workers - 1)]
+    
+    
+    # Stop the helpers and return the number of positions they searched
+    def __stop_helpers(self, futures):
+        self.__table.set_stop(True)
+        return sum(future.result() for future in futures)
+    
+    
+    # Search the board as a helper of a parallel search (see
+    # __start_helpers) until max_depth is done or the search is stopped.
+    # Returns the number of positions searched.
+    def help_search(self, board, max_depth, rotation):
+        self.__shape = board.get_shape()
+        self.__player = board.get_turn()
+        self.__nodes = 0
+        self.__stopped = False
+        self.__deadline = None
+        self.__stop_requested = self.__table.stop_requested
+        self.__killers = {}
+        self.__history = {1: [0] * self.__shape.columns, -1: [0] * self.__shape.columns}
+        self.__table.sync()
+        legal_moves = self.__root_moves(board)
+        rotation %= len(legal_moves)
+        legal_moves = legal_moves[rotation:] + legal_moves[:rotation]
+        best_move = None
+        for depth in range(1, max_depth + 1):
+            root_order = legal_moves
+            if(best_move != None):
+                root_order = [best_move] + [move for move in legal_moves if move != best_move]
+            best_move, value = self.__search_root(board, depth, root_order)
+            if(best_move == None or value > decrease_above or value < -decrease_above):
+                break
+        return self.__nodes
+    
+    
+    # Pondering: search on the opponent's time. Starts a background search
+    # of the position after the agent's move (board after the move, or board
+    # and the move to play on it): the positions after each of the
+    # opponent's replies are searched like get_move would, the reply the
+    # search expects (its principal variation) first. If get_move is then
+    # called on one of them, the result is returned right away (the search
+    # info has "ponder": True), otherwise the search starts over but the
+    # transposition table keeps what was found. get_move and stop_pondering
+    # stop the background search. Positions that get_move would solve or
+    # find in the opening book are skipped.
+    def start_pondering(self, board, move=None):
+        self.__ponderer.stop()
+        self.__pondered = {}
+        board = copy_board(board)
+        expected_reply = None
+        if(move != None):
+            turn = board.get_turn()
+            board.move(move)
+            if(board.check_win(turn) or board.check_full()):
+                return
+            variation = self.__last_search_info["principal_variation"] if self.__last_search_info else []
+            if(len(variation) > 1 and variation[0] == move):
+                expected_reply = variation[1]
+        self.__ponderer.start(self.__ponder_replies, board, expected_reply)
+    
+    
+    # Stop pondering (waits until the background search stopped)
+    def stop_pondering(self):
+        self.__ponderer.stop()
+    
+    
+    # True while the background search is running
+    def is_pondering(self):
+        return self.__ponderer.is_running()
+    
+    
+    # Stop pondering before searching the board. Returns the pondering
+    # result for the board, or None if there is none.
+    def __stop_pondering(self, board, time_limit_ms):
+        self.__ponderer.stop()
+        pondered = self.__pondered.get(board.get_hash()) if time_limit_ms == None else None
+        self.__pondered = {}
+        if(pondered == None):
+            return None
+        move, info = pondered
+        return move, dict(info, ponder=True)
+    
+    
+    # The background search of start_pondering (board is the opponent's turn)
+    def __ponder_replies(self, board, expected_reply):
+        self.__stop_requested = self.__ponderer.stop_requested
+        self.__shape = board.get_shape()
+        try:
+            replies = self.__root_moves(board)
+            if(expected_reply in replies):
+                replies = [expected_reply] + [reply for reply in replies if reply != expected_reply]
+            for reply in replies:
+                if(self.__ponderer.stop_requested()): break
+                turn = board.get_turn()
+                board.move(reply)
+                empty_cells = board.get_shape().cells - len(board.get_moves())
+                if(not board.check_win(turn) and not board.check_full() and empty_cells >= self.__solve_below
+                   and (self.__book == None or self.__book.lookup(board) == None)):
+                    result = self.__get_move(board, None)
+                    if(self.__stopped):
+                        board.unmove()
+                        break
+                    self.__pondered[board.get_hash()] = result
+                board.unmove()
+        finally:
+            self.__stop_requested = None
+    
+    
+    # Stop pondering and shut down the helper processes (with workers > 1,
+    # they're started again by the next get_move)
+    def close(self):
+        self.__ponderer.stop()
+        if(self.__helpers != None):
+            self.__helpers.shutdown()
+            self.__helpers = None
+    
+    
+    # Solve the board exactly and return the best move and the search info. The solver's result
+    # is turned into a value like the search's: a win (loss) loses 100 for
+    # each of the agent's moves before it (in weak mode the distance isn't
+    # known, so it's big_value).
+    def __solve(self, board, empty_cells, start_time):
+        if(self.__solver == None):
+            from connect4.solver import Solver
+            self.__solver = Solver(self.__solve_mode, symmetry=self.__symmetry)
+        move, score, plies = self.__solver.solve(board)
+        value = 0
+        if(score > 0):
+            value = big_value - (100 * ((plies - 1) // 2) if plies != None else 0)
+        elif(score < 0):
+            value = -big_value + (100 * ((plies - 2) // 2) if plies != None else 0)
+        return move, {"depth": empty_cells, "nodes": self.__solver.get_last_solve_info()["nodes"],
+            "time": perf_counter() - start_time, "value": value, "principal_variation": [move],
+            "book": False, "solved": True, "plies_to_end": plies}
+    
+    
+    # The principal variation after making a root move
+    def __after_move(self, board, move):
+        if(move == None): return []
+        turn = board.get_turn()
+        board.move(move)
+        variation = []
+        if(not board.check_win(turn) and not board.check_full()):
+            variation = self.__principal_variation(board, self.__shape.cells)
+        board.unmove()
+        return variation
+    
+    
+    # Information about the last get_move call: depth reached, nodes
+    # searched, time taken (seconds), value, principal variation, whether
+    # the move came from the opening book and whether the game was solved
+    # (then also plies_to_end, None in weak mode).
+    def get_last_search_info(self):
+        return self.__last_search_info
+    
+    
+    # SearchStats of the last get_move call (None unless created with stats)
+    def get_last_search_stats(self):
+        return self.__last_stats
+
+
+# The agent of a helper process (see Minimax_Agent's workers)
+_helper = None
+
+
+def _start_helper(settings):
+    global _helper
+    from connect4.shared_table import SharedTranspositionTable
+    settings = dict(settings)
+    table = SharedTranspositionTable(name=settings.pop("table_name"))
+    _helper = Minimax_Agent(0, solve_below=0, transposition_table=table, **settings)
+
+
+def _help_search(starting_player, moves, shape, max_depth, rotation):
+    board = make_board(starting_player, "bitboard", *shape)
+    for move in moves:
+        board.move(move)
+    return _helper.help_search(board, max_depth, rotation)
@@ -0,0 +1,53 @@
+from connect4.board.board import make_board
+from connect4.minimax import Minimax_Agent, ALL_MOVE_ORDERING
+
+# Compare how many positions Minimax searches with different move ordering
+# options on a fixed set of positions (fewer positions = better pruning).
+
+
+# Positions given as the columns played from an empty board (agent moves next)
+POSITIONS = [
+    "",
+    "23",
+    "2234",
+    "124213",
+    "04624240",
+    "3100334025",
+    "314533401416",
+    "02223323326616",
+    "4046640411114656",
+    "014212243663254251",
+    "41344336066342334466",
+    "344003402660560451362430",
+]
+
+# Name -> Minimax_Agent keyword arguments
+CONFIGS = {
+    "no ordering": {"move_ordering": ()},
+    "center": {"move_ordering": ("center",)},
+    "all ordering": {"move_ordering": ALL_MOVE_ORDERING},
+    "all ordering + pvs": {"move_ordering": ALL_MOVE_ORDERING, "pvs": True},
+    "all ordering + symmetry": {"move_ordering": ALL_MOVE_ORDERING, "symmetry": True},
+}
+
+
+# Count the positions searched for each position, using a new agent each
+# time so the transposition table starts empty.
+def count_nodes(depth, agent_arguments):
+    counts = []
+    for moves in POSITIONS:
+        board = make_board(1, "bitboard")
+        for move in moves:
+            board.move(int(move))
+        agent = Minimax_Agent(depth, **agent_arguments)
+        agent.get_move(board)
+        counts.append(agent.get_last_search_info()["nodes"])
+    return counts
+
+
+if(__name__ == "__main__"):
+    depth = 6
+    print("Depth:", depth)
+    for name in CONFIGS:
+        counts = count_nodes(depth, CONFIGS[name])
+        print(f"{name:>20}: total {sum(counts):>8}  {counts}")
@@ -0,0 +1,253 @@
+from connect4.board.board import mirror_move
+from math import log, sqrt, inf
+
+np = None # NumPy, imported when the first pool is built (see NodePool.__init__)
+
+# Compact MCTS tree: instead of one TreeNode object per node, every node is
+# an index into a set of preallocated NumPy arrays. The children of a node
+# are stored next to each other, so a node only needs the index of its first
+# child and the number of children.
+
+# Game result codes (same meaning as TreeNode.game_result)
+NO_RESULT = 0 # Game didn't end (TreeNode: None)
+WIN = 1 # The player who just moved won (TreeNode: 1)
+TIE = 2 # Board is full (TreeNode: 0.5)
+# With the MCTS-Solver (see MCTS_Agent), nodes whose game isn't over can be
+# proven: WIN if every reply loses, LOSS if the player to move can win.
+LOSS = 3 # The player who just moved loses (with best play)
+
+# Array name -> dtype (and value of a new node) of the arrays every pool has
+# (15 bytes per node). Results are multiples of 0.5, so the scores are exact
+# in float32 up to 2^23 games through a node.
+ARRAYS = {"score": ("float32", 0), # Total result of the games through the node
+          "games": ("int32", 0), # Number of games through the node
+          "result": ("int8", NO_RESULT), # NO_RESULT, WIN, TIE or LOSS
+          "first_child": ("int32", -1), # -1 if not expanded
+          "child_count": ("int8", 0),
+          "action": ("int8", 0)} # Move that leads to the node
+# Arrays only kept with RAVE (all-moves-as-first statistics: the games
+# through the parent where the node's move was played later by the same
+# player, and their total result)
+RAVE_ARRAYS = {"amaf_score": ("float32", 0), "amaf_games": ("float32", 0)}
+# With progressive bias, unplayed children get this favorability plus their
+# bias (instead of inf), so the best one by heuristic is tried first
+UNPLAYED = 1e9
+
+# Array only kept with progressive bias (heuristic value of the node for the
+# player who just moved)
+BIAS_ARRAYS = {"bias": ("float32", 0)}
+
+
+class NodePool:
+
+
+    # rave is the RAVE equivalence parameter (0 turns RAVE off: the number of
+    # games after which the node's own statistics and the AMAF statistics
+    # count the same), progressive_bias the weight of the heuristic in
+    # choose_expansion (0 turns it off), and with solver proven wins and
+    # losses (see LOSS) are always chosen or avoided.
+    def __init__(self, capacity=1024, rave=0, progressive_bias=0, solver=False):
+        global np
+        import numpy as np # Imported here, so MCTS with the objects tree doesn't need it
+        self.size = 0 # Number of nodes in use
+        self.rave = rave
+        self.progressive_bias = progressive_bias
+        self.solver = solver
+        self.__arrays = dict(ARRAYS)
+        if(rave):
+            self.__arrays.update(RAVE_ARRAYS)
+        if(progressive_bias):
+            self.__arrays.update(BIAS_ARRAYS)
+        self.__allocate(capacity)
+
+
+    # (Re)create the arrays with the given capacity, keeping the nodes in use
+    def __allocate(self, capacity):
+        self.capacity = capacity
+        for name, (dtype, value) in self.__arrays.items():
+            array = np.full(capacity, value, dtype=dtype)
+            if(self.size > 0):
+                array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+
+
+    # Reserve count nodes in a row and return the index of the first one
+    def __reserve(self, count):
+        if(self.size + count > self.capacity):
+            self.__allocate(max(2 * self.capacity, self.size + count))
+        first = self.size
+        self.size += count
+        return first
+
+
+    # Remove every node
+    def clear(self):
+        self.size = 0
+        for name, (dtype, value) in self.__arrays.items():
+            getattr(self, name)[:] = value
+
+
+    # Create the root node for a board and return its index
+    def new_root(self, board):
+        root = self.__reserve(1)
+        self.result[root] = NO_RESULT
+        # Check win for previous move's player (notice '-' sign)
+        if(board.check_win(-board.get_turn())):
+            self.result[root] = WIN
+        elif(board.check_full()):
+            self.result[root] = TIE
+        return root
+
+
+    # Given the node's board, create its children (see
+    # TreeNode.create_children for symmetry). With progressive bias,
+    # evaluate(board) gives the heuristic value of a child for the player
+    # who just moved.
+    def create_children(self, node, board, symmetry=False, evaluate=None):
+        legal_actions = board.get_legal_moves()
+        if(symmetry and board.is_symmetric()):
+            legal_actions = [action for action in legal_actions
+                             if action <= mirror_move(action, board.get_shape().columns)]
+        first = self.__reserve(len(legal_actions))
+        self.first_child[node] = first
+        self.child_count[node] = len(legal_actions)
+        # One call finds the children that are wins (no need to play each move)
+        winning_actions = board.get_winning_moves(board.get_turn())
+        for i in range(len(legal_actions)):
+            child = first + i
+            self.action[child] = legal_actions[i]
+            self.result[child] = NO_RESULT
+            if(legal_actions[i] in winning_actions):
+                self.result[child] = WIN
+        # Only the last empty cell can fill the board
+        if(len(legal_actions) == 1 and self.result[first] == NO_RESULT and board.get_legal_moves() == legal_actions):
+            board.move(legal_actions[0])
+            if(board.check_full()):
+                self.result[first] = TIE
+            board.unmove()
+        if(evaluate != None):
+            for i in range(len(legal_actions)):
+                board.move(legal_actions[i])
+                self.bias[first + i] = evaluate(board)
+                board.unmove()
+
+
+    # Copy the subtree under node into a new NodePool (node becomes index 0)
+    # and return it. Everything outside of the subtree is left behind.
+    def extract_subtree(self, node):
+        subtree = NodePool(max(1024, self.size), self.rave, self.progressive_bias, self.solver)
+        arrays = list(self.__arrays)
+        root = subtree.__reserve(1)
+        for name in arrays:
+            getattr(subtree, name)[root] = getattr(self, name)[node]
+        # Copy one block of children at a time (old index, new index)
+        to_copy = [(node, root)]
+        while(len(to_copy) > 0):
+            old_node, new_node = to_copy.pop()
+            old_first = int(self.first_child[old_node])
+            if(old_first < 0): continue
+            count = int(self.child_count[old_node])
+            new_first = subtree.__reserve(count)
+            for name in arrays:
+                getattr(subtree, name)[new_first:new_first + count] = getattr(self, name)[old_first:old_first + count]
+            subtree.first_child[new_node] = new_first
+            for i in range(count):
+                to_copy.append((old_first + i, new_first + i))
+        return subtree
+
+
+    # Get the child index for an action (None if there is no such child)
+    def child(self, node, action):
+        first = self.first_child[node]
+        for child in range(first, first + self.child_count[node]):
+            if(self.action[child] == action):
+                return child
+        return None
+
+
+    # Get the indices of a node's children
+    def children(self, node):
+        first = int(self.first_child[node])
+        if(first < 0): return range(0)
+        return range(first, first + int(self.child_count[node]))
+
+
+    # Get the child we should expand next: the child with the highest
+    # wi/ni + c * sqrt(lnNi / ni) (see TreeNode.expansion_favorability),
+    # computed for all children at once.
+    # With RAVE, wi/ni is mixed with the AMAF score rate (the AMAF rate
+    # counts less as the child gets more games of its own), and with
+    # progressive bias, progressive_bias * heuristic / (ni + 1) is added (and
+    # the unplayed children are tried in heuristic order).
+    def choose_expansion(self, node, c):
+        first = int(self.first_child[node])
+        end = first + int(self.child_count[node])
+        if(not self.rave and not self.progressive_bias):
+            return self.__choose_expansion_plain(node, first, end, c)
+        games = self.games[first:end]
+        played_games = np.maximum(games, 1) # Unplayed children are set to inf below
+        score_rate = self.score[first:end] / played_games
+        if(self.rave):
+            amaf_games = self.amaf_games[first:end]
+            amaf_rate = np.where(amaf_games > 0, self.amaf_score[first:end] / np.maximum(amaf_games, 1), score_rate)
+            beta = np.sqrt(self.rave / (3 * games + self.rave))
+            score_rate = (1 - beta) * score_rate + beta * amaf_rate
+        favorability = score_rate + c * np.sqrt(log(self.games[node]) / played_games)
+        if(self.progressive_bias):
+            bias = self.progressive_bias * self.bias[first:end]
+            favorability += bias / (games + 1)
+            # Unplayed children first, the best heuristic first
+            favorability[games == 0] = UNPLAYED + bias[games == 0]
+        else:
+            favorability[games == 0] = inf
+        results = self.result[first:end]
+        if(results.any()):
+            if(self.solver):
+                favorability[results == WIN] = inf
+                favorability[results == LOSS] = -inf
+            else:
+                favorability[results == WIN] = 1
+            favorability[results == TIE] = 0.5
+        return first + int(favorability.argmax())
+
+
+    # choose_expansion without RAVE and progressive bias (the common case).
+    # With only a few children, a Python loop over the values is faster than
+    # the NumPy version, and it picks the same child.
+    def __choose_expansion_plain(self, node, first, end, c):
+        log_games = log(self.games[node])
+        best_child = first
+        best_favorability = -inf
+        child = first
+        for score, games, result in zip(self.score[first:end].tolist(), self.games[first:end].tolist(),
+                                        self.result[first:end].tolist()):
+            if(result == WIN):
+                favorability = inf if self.solver else 1
+            elif(result == TIE):
+                favorability = 0.5
+            elif(result == LOSS and self.solver):
+                favorability = -inf
+            elif(games == 0):
+                favorability = inf
+            else:
+                favorability = score / games + c * sqrt(log_games / games)
+            if(favorability > best_favorability):
+                best_child = child
+                best_favorability = favorability
+            child += 1
+        return best_child
+
+
+    # Get the favorability of choosing this node's action in a test-game
+    # (see TreeNode.calculate_favorability)
+    def calculate_favorability(self, node):
+        if(self.result[node] == WIN): return inf
+        if(self.result[node] == LOSS): return -1
+        if(self.result[node] == TIE): return 0.5
+        if(self.games[node] == 0): return 0
+        return self.score[node] / self.games[node]
+
+
+    # Bytes used per node
+    def bytes_per_node(self):
+        return sum(getattr(self, name).itemsize for name in self.__arrays)
@@ -0,0 +1,159 @@
+from connect4.board.board import make_board, mirror_move, get_shape
+import argparse
+import numpy as np
+import os
+
+# Opening book: the best move for every position up to a number of plies,
+# searched ahead of time (offline) with Minimax_Agent and saved in a file.
+#
+# File format: an 8 byte magic string, the number of entries (uint64), then
+# the entries sorted by key. Each entry is 18 bytes (ENTRY_DTYPE). The key
+# of a position is the smaller of its Zobrist hash and the hash of its mirror
+# image (columns flipped left-right), so a position and its mirror share one
+# entry. The stored move is for whichever of the two has the smaller hash.
+#
+# The file is memory-mapped, so loading a book doesn't read it, and a lookup
+# is a binary search that only touches a few pages of it.
+#
+# Example:
+#   python -m connect4.opening_book --plies 6 --depth 8 --output opening_book.bin
+
+BOOK_MAGIC = b"C4BOOK1\0"
+HEADER_SIZE = len(BOOK_MAGIC) + 8
+ENTRY_DTYPE = np.dtype([("key", "<u8"), ("move", "i1"), ("depth", "i1"), ("value", "<f8")])
+
+
+# Get the book key of the board (its canonical key) and whether the key is
+# the mirror image's hash
+def position_key(board):
+    return board.canonical_key(), board.is_mirrored()
+
+
+# Write a book. entries is a list of (key, move, depth, value), with move for
+# the position whose hash is the key.
+def write_book(path, entries):
+    table = np.array(sorted(entries), dtype=ENTRY_DTYPE)
+    with open(path, "wb") as file:
+        file.write(BOOK_MAGIC)
+        file.write(np.uint64(len(table)).tobytes())
+        file.write(table.tobytes())
+
+
+class OpeningBook:
+
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if(len(header) != HEADER_SIZE or header[:len(BOOK_MAGIC)] != BOOK_MAGIC):
+            raise ValueError(f"{path} is not an opening book")
+        count = int(np.frombuffer(header[len(BOOK_MAGIC):], dtype="<u8")[0])
+        if(count == 0):
+            self.__entries = np.zeros(0, dtype=ENTRY_DTYPE)
+        else:
+            self.__entries = np.memmap(path, dtype=ENTRY_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        self.__keys = self.__entries["key"]
+
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+    # Find the board's position in the book.
+    # Returns (move, value, depth) or None if the position isn't in the book.
+    # The value is for the player to move (as in Minimax_Agent).
+    def lookup(self, board):
+        key, mirrored = position_key(board)
+        index = int(np.searchsorted(self.__keys, np.uint64(key)))
+        if(index == len(self.__keys) or int(self.__keys[index]) != key):
+            return None
+        entry = self.__entries[index]
+        move = int(entry["move"])
+        if(mirrored):
+            move = mirror_move(move, board.get_shape().columns)
+        if(move not in board.get_legal_moves()):
+            return None
+        return move, float(entry["value"]), int(entry["depth"])
+
+
+# Get an OpeningBook from a path (None and books are returned as they are)
+def open_book(book):
+    if(book == None or isinstance(book, OpeningBook)):
+        return book
+    return OpeningBook(book)
+
+
+# Every position reachable in at most plies moves, for both starting
+# players, with mirror images counted once. Returns (starting player, moves)
+# for each position that isn't already over.
+def book_positions(plies):
+    positions = {}
+    for starting_player in [1, -1]:
+        board = make_board(starting_player, "bitboard")
+        layer = [""]
+        for ply in range(plies + 1):
+            next_layer = []
+            for moves in layer:
+                for move in moves:
+                    board.move(int(move))
+                key = position_key(board)[0]
+                if(key not in positions and not board.check_win(-board.get_turn()) and not board.check_full()):
+                    positions[key] = (starting_player, moves)
+                    next_layer += [moves + str(move) for move in board.get_legal_moves()]
+                for move in moves:
+                    board.unmove()
+            layer = next_layer
+    return list(positions.values())
+
+
+# Search one position (runs in a worker process) and return its book entry
+def search_position(starting_player, moves, depth, heuristic_number, time_limit_ms):
+    from connect4.minimax import Minimax_Agent
+    board = make_board(starting_player, "bitboard")
+    for move in moves:
+        board.move(int(move))
+    agent = Minimax_Agent(depth, heuristic_number)
+    move = agent.get_move(board, time_limit_ms)
+    info = agent.get_last_search_info()
+    key, mirrored = position_key(board)
+    if(mirrored):
+        move = mirror_move(move, board.get_shape().columns)
+    return key, move, info["depth"], info["value"]
+
+
+# Search every position up to plies moves and write the book to path.
+# Positions are searched to depth (or, with time_limit_ms, as deep as
+# iterative deepening gets in that time).
+def generate_book(path, plies, depth, heuristic_number=1, time_limit_ms=None, workers=None):
+    from concurrent.futures import ProcessPoolExecutor # Imported here, only generating a book needs it
+    positions = book_positions(plies)
+    print(len(positions), "positions")
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(search_position, starting_player, moves, depth, heuristic_number,
+                                   time_limit_ms) for starting_player, moves in positions]
+        for future in futures:
+            entries.append(future.result())
+            if(len(entries) % 100 == 0):
+                print(len(entries), "/", len(positions))
+    write_book(path, entries)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate an opening book with the Minimax agent.")
+    parser.add_argument("--plies", type=int, default=4, help="Book every position up to this many moves")
+    parser.add_argument("--depth", type=int, default=8, help="Search depth for each position")
+    parser.add_argument("--heuristic", type=int, default=1)
+    parser.add_argument("--time-limit-ms", type=int, default=None,
+                        help="Search each position with iterative deepening for this long instead")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", default="opening_book.bin")
+    arguments = parser.parse_args()
+    count = generate_book(arguments.output, min(arguments.plies, get_shape().cells - 1), arguments.depth,
+                          arguments.heuristic, arguments.time_limit_ms, arguments.workers)
+    print("Wrote", count, "positions to", arguments.output)
+
+
+if(__name__ == "__main__"):
+    main()
@@ -0,0 +1,68 @@
+import threading
+
+# Pondering: an agent keeps searching in a background thread while the
+# opponent thinks about its move (see start_pondering in Minimax_Agent and
+# MCTS_Agent). The thread gets its own copy of the board and checks
+# stop_requested often, so stopping it only takes a moment. The next
+# get_move stops it and uses what it found.
+#
+# The thread shares the GIL with the rest of the process, so pondering
+# gives free search time when the process is waiting (for a user, a socket
+# or another process), not when the opponent searches in the same process.
+
+
+# Copy a board (same backend, shape and moves) for a background search
+def copy_board(board):
+    moves = board.get_moves()
+    shape = board.get_shape()
+    copy = type(board)(board.get_turn() * (-1) ** len(moves), shape.rows, shape.columns, shape.connect)
+    for move in moves:
+        copy.move(move)
+    return copy
+
+
+# Runs one background search at a time and stops it on request
+class Ponderer:
+
+
+    def __init__(self):
+        self.__thread = None
+        self.__stop = threading.Event()
+        self.__error = None
+
+
+    # Stop the current search (if any) and run function(*arguments) in the
+    # background. function should return soon after stop_requested is True.
+    def start(self, function, *arguments):
+        self.stop()
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, args=(function, arguments), daemon=True)
+        self.__thread.start()
+
+
+    def __run(self, function, arguments):
+        try:
+            function(*arguments)
+        except BaseException as error:
+            self.__error = error
+
+
+    # Stop the background search and wait for it. Errors raised by the
+    # search are raised here.
+    def stop(self):
+        if(self.__thread != None):
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+        error, self.__error = self.__error, None
+        if(error != None):
+            raise error
+
+
+    def stop_requested(self):
+        return self.__stop.is_set()
+
+
+    # True while the background search is running
+    def is_running(self):
+        return self.__thread != None and self.__thread.is_alive()
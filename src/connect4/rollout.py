@@ -0,0 +1,118 @@
+import random
+from connect4.board.bitboard import BitBoard, get_layout
+
+# Fast random games (rollouts) for MCTS. Instead of playing on the real
+# board and undoing every move afterwards, a rollout plays on a copy of the
+# board kept in a few integers (a bitboard, see bitboard.py), which is thrown
+# away when the game ends.
+
+# Policies:
+#   "random": every move is random (same games as MCTS_Agent.simulate)
+#   "light": win if you can, block if you must, otherwise random
+POLICIES = ["random", "light"]
+
+# Number of columns -> the columns that can be played for each mask of
+# open columns (bit i set if column i isn't full)
+_legal_columns = {}
+
+
+def legal_columns(columns):
+    if(columns not in _legal_columns):
+        _legal_columns[columns] = [tuple(column for column in range(columns) if open_columns & (1 << column))
+                                   for open_columns in range(1 << columns)]
+    return _legal_columns[columns]
+
+
+# Get the pieces of the player to move and all the pieces as bitboards
+def board_state(board, layout):
+    turn = board.get_turn()
+    if(isinstance(board, BitBoard)):
+        return board.get_pieces(turn), board.get_pieces(turn) | board.get_pieces(-turn)
+    cells = board.get_board()
+    rows, columns = layout.shape.rows, layout.shape.columns
+    pieces = 0
+    mask = 0
+    for row in range(rows):
+        for column in range(columns):
+            cell = cells[row * columns + column]
+            if(cell != 0):
+                mask |= layout.cell_bit(row, column)
+                if(cell == turn):
+                    pieces |= layout.cell_bit(row, column)
+    return pieces, mask
+
+
+# Fill played (see rollout) at the end of a game: turn's pieces are
+# position and the other player's are the rest of mask
+def record_played(played, layout, turn, position, mask, start_mask):
+    for player, pieces in ((turn, position), (-turn, position ^ mask)):
+        new_pieces = pieces & ~start_mask
+        columns = 0
+        for column in range(layout.shape.columns):
+            if(new_pieces & layout.column_masks[column]):
+                columns |= 1 << column
+        played[player] = columns
+
+
+# Play a game to the end from the board (the board isn't changed).
+# Returns 1 if caller wins, 0 if caller loses and 0.5 for a tie.
+# If stats (a SearchStats) is given, the game is counted in it.
+# If played (a dictionary) is given, played[player] is set to the columns
+# (bit i for column i) the player played in during the game, for each player.
+def rollout(board, caller, policy="random", stats=None, played=None):
+    layout = get_layout(board.get_shape())
+    position, mask = board_state(board, layout)
+    start_mask = mask
+    turn = board.get_turn()
+    # Everything from the layout is kept in local variables (faster)
+    height = layout.height
+    bottom_row, top_row, full_mask = layout.bottom_row, layout.top_row, layout.full_mask
+    bottom_masks, column_masks = layout.bottom_masks, layout.column_masks
+    has_line, winning_cells = layout.has_line, layout.winning_cells
+    legal = legal_columns(layout.shape.columns)
+    open_columns = 0
+    for column in range(layout.shape.columns):
+        if(not mask & layout.top_masks[column]):
+            open_columns |= 1 << column
+    light = policy == "light"
+    if(light):
+        # Cells that would win for the player to move. A player's pieces
+        # don't change during the other player's move, so the opponent's
+        # cells computed on one turn are the mover's cells on the next.
+        my_cells = winning_cells(position)
+    # Loop until the game is over (win or tie).
+    while(1):
+        column = None
+        if(light):
+            playable = (mask + bottom_row) & full_mask
+            opponent_cells = winning_cells(position ^ mask)
+            # Win if you can
+            moves = my_cells & playable
+            if(moves == 0):
+                # Block if you must
+                moves = opponent_cells & playable
+            if(moves):
+                lowest = moves & -moves
+                column = (lowest.bit_length() - 1) // height
+            my_cells = opponent_cells
+        if(column == None):
+            column = random.choice(legal[open_columns]) # Make random move
+        new_piece = (mask + bottom_masks[column]) & column_masks[column]
+        mask |= new_piece
+        position |= new_piece # position is the mover's pieces until the turn swaps
+        if(new_piece & top_row):
+            open_columns &= ~(1 << column)
+        # Check for win (only the mover can have won, and the bitboard check
+        # costs about the same as looking around the new piece)
+        if(has_line(position)):
+            if(stats != None): stats.add_rollout(bin(mask).count("1") - len(board.get_moves()))
+            if(played != None): record_played(played, layout, turn, position, mask, start_mask)
+            return 1 if turn == caller else 0
+        # Check for tie
+        if(mask == full_mask):
+            if(stats != None): stats.add_rollout(bin(mask).count("1") - len(board.get_moves()))
+            if(played != None): record_played(played, layout, turn, position, mask, start_mask)
+            return 0.5
+        # Swap turn
+        position ^= mask
+        turn = -turn
@@ -0,0 +1,109 @@
+import cProfile
+import tracemalloc
+
+# Search instrumentation: what happened during one get_move call. The agents
+# only collect these when created with stats=True, so a normal search just
+# pays for a few "is stats None" checks.
+
+
+class SearchStats:
+
+
+    def __init__(self):
+        self.nodes_by_depth = {} # Ply from the root -> positions searched (Minimax)
+        self.cutoffs = 0 # Alpha-beta cutoffs (Minimax)
+        self.first_move_cutoffs = 0 # Cutoffs caused by the first move searched (Minimax)
+        self.heuristic_calls = 0 # Boards scored with the heuristic (Minimax)
+        self.heuristic_time = 0 # Seconds spent in the heuristic (Minimax)
+        self.rollouts = 0 # Simulated games (MCTS, only the ones played in this process)
+        self.rollout_plies = 0 # Total moves played in the simulated games (MCTS)
+        self.tree_size = None # Transposition table entries (Minimax) or tree nodes (MCTS)
+        self.peak_memory = None # Bytes (only if the agent was created with stats_memory=True)
+        self.time = 0 # Seconds for the whole get_move call
+
+
+    # Count a searched position ply moves away from the root
+    def add_node(self, ply):
+        self.nodes_by_depth[ply] = self.nodes_by_depth.get(ply, 0) + 1
+
+
+    # Count a cutoff (first tells if the first move searched caused it)
+    def add_cutoff(self, first):
+        self.cutoffs += 1
+        if(first):
+            self.first_move_cutoffs += 1
+
+
+    # Count a simulated game of the given number of moves
+    def add_rollout(self, plies):
+        self.rollouts += 1
+        self.rollout_plies += plies
+
+
+    # Total positions searched
+    def nodes(self):
+        return sum(self.nodes_by_depth.values())
+
+
+    # Share of cutoffs caused by the first move (1 = perfect move ordering)
+    def first_move_cutoff_ratio(self):
+        if(self.cutoffs == 0): return None
+        return self.first_move_cutoffs / self.cutoffs
+
+
+    # Average number of moves in a simulated game
+    def average_rollout_length(self):
+        if(self.rollouts == 0): return None
+        return self.rollout_plies / self.rollouts
+
+
+    # Everything as a dictionary (e.g., to save as JSON)
+    def as_dict(self):
+        return {"nodes": self.nodes(), "nodes_by_depth": dict(sorted(self.nodes_by_depth.items())),
+                "cutoffs": self.cutoffs, "first_move_cutoff_ratio": self.first_move_cutoff_ratio(),
+                "heuristic_calls": self.heuristic_calls, "heuristic_time": self.heuristic_time,
+                "rollouts": self.rollouts, "average_rollout_length": self.average_rollout_length(),
+                "tree_size": self.tree_size, "peak_memory": self.peak_memory, "time": self.time}
+
+
+    def __repr__(self):
+        return "SearchStats(" + ", ".join(f"{key}={value}" for key, value in self.as_dict().items()) + ")"
+
+
+# Profiles every get_move call of an agent with cProfile. The profile covers
+# all the calls so far and is written to path after each one (open it with
+# pstats or snakeviz).
+class MoveProfiler:
+
+
+    def __init__(self, path):
+        self.__path = path
+        self.__profile = cProfile.Profile()
+
+
+    def start(self):
+        self.__profile.enable()
+
+
+    def stop(self):
+        self.__profile.disable()
+        self.__profile.dump_stats(self.__path)
+
+
+# Start measuring memory for peak_memory. Returns False if it was already
+# being measured (e.g., by the benchmark), in which case it's left alone and
+# the peak is the one since that measuring started.
+def start_memory_tracking():
+    if(tracemalloc.is_tracing()):
+        return False
+    tracemalloc.start()
+    return True
+
+
+# Get the peak memory (bytes) since start_memory_tracking and stop if we
+# started it
+def stop_memory_tracking(started):
+    peak = tracemalloc.get_traced_memory()[1]
+    if(started):
+        tracemalloc.stop()
+    return peak
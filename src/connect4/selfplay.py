@@ -0,0 +1,330 @@
+from connect4.board.board import make_board, get_shape, ROWS, COLUMNS, CONNECT
+from connect4.board.bitboard import get_layout
+from connect4.battle_agents import parse_agent, make_agent, move_arguments
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+import argparse
+import json
+import numpy as np
+import os
+import random
+
+# Self-play data: agents play games in worker processes and every searched
+# position is saved with the search value, the chosen move and the final
+# result of the game, for tuning the heuristic.
+#
+# Shards: the output directory holds files named selfplay-00000.c4sp, ...
+# A shard starts with a header (SHARD_MAGIC, the length of the JSON
+# metadata as uint32, then the metadata: board shape and agent configs),
+# followed by any number of chunks. A chunk is CHUNK_MAGIC, the number of
+# records and of games (uint32 each) and then the records (record_dtype).
+# New games are appended as new chunks, so a shard can be extended by
+# later runs, and a chunk cut short (e.g., the process was killed while
+# writing it) is ignored by the reader.
+#
+# A record is the position as two packed bitboards (BitBoard layout, little
+# endian bytes) and a few small fields, 27 bytes on the standard board.
+#
+# Example:
+#   python -m connect4.selfplay --agent minimax:depth=4 --agent mcts:iterations=1000 --games 1000 --output data
+#   python -m connect4.selfplay --agent minimax:depth=2 --rows 8 --connect 5 --games 500 --output data-8x7-5
+
+SHARD_MAGIC = b"C4SELF1\0"
+CHUNK_MAGIC = b"CHNK"
+CHUNK_HEADER_SIZE = len(CHUNK_MAGIC) + 8
+SHARD_NAME = "selfplay-{:05d}.c4sp"
+
+
+# The record of a shape: pieces has player 1's and player -1's bitboards,
+# turn is the player to move, agent the index (in the metadata's agents) of
+# the agent that searched, value its search value (from the player to
+# move's view: Minimax_Agent value or MCTS score rate, NaN if there is
+# none), result the final result for the player to move (1 win, 0 tie, -1
+# loss) and game the game's number in the shard.
+def record_dtype(shape):
+    return np.dtype([("pieces", "u1", (2, get_layout(shape).bytes)), ("turn", "i1"), ("ply", "u1"),
+                     ("move", "i1"), ("agent", "u1"), ("result", "i1"), ("value", "<f4"), ("game", "<u4")])
+
+
+# Play games (in a worker process) and return their records and the number
+# of games played. The agents are created once and play every game: agent 0
+# is player -1 and agent 1 is player 1, and the starting player alternates.
+# The first random_plies moves of each game are random (and not recorded)
+# so the games are different.
+def play_games(configs, shape, games, random_plies, seed):
+    random.seed(seed)
+    layout = get_layout(get_shape(*shape))
+    agents = {-1: make_agent(configs[0]), 1: make_agent(configs[-1])}
+    indices = {-1: 0, 1: len(configs) - 1}
+    arguments = {-1: move_arguments(configs[0]), 1: move_arguments(configs[-1])}
+    positions = [] # (pieces bytes, turn, ply, move, agent, value, game)
+    results = [] # Result of each game for player 1
+    try:
+        for game in range(games):
+            board = make_board(1 if game % 2 == 0 else -1, "bitboard", *shape)
+            for ply in range(random_plies):
+                board.move(random.choice(board.get_legal_moves()))
+            # Skip the game if a random move ended it
+            if(board.check_win(1) or board.check_win(-1) or board.check_full()):
+                results.append(0)
+                continue
+            winner = 0
+            while(1):
+                turn = board.get_turn()
+                move = agents[turn].get_move(board, **arguments[turn])
+                value = agents[turn].get_last_search_info().get("value")
+                positions.append((board.get_pieces(1).to_bytes(layout.bytes, "little") +
+                                  board.get_pieces(-1).to_bytes(layout.bytes, "little"),
+                                  turn, len(board.get_moves()), move, indices[turn],
+                                  np.nan if value == None else value, game))
+                board.move(move)
+                if(board.check_win(turn)):
+                    winner = turn
+                    break
+                if(board.check_full()):
+                    break
+            results.append(winner)
+    finally:
+        for agent in agents.values():
+            agent.close()
+
+    records = np.zeros(len(positions), dtype=record_dtype(layout.shape))
+    if(len(positions) == 0):
+        return records, games
+    pieces, turns, plies, moves, agent_indices, values, game_numbers = zip(*positions)
+    records["pieces"] = np.frombuffer(b"".join(pieces), dtype=np.uint8).reshape(len(positions), 2, layout.bytes)
+    records["turn"] = turns
+    records["ply"] = plies
+    records["move"] = moves
+    records["agent"] = agent_indices
+    records["value"] = values
+    records["game"] = game_numbers
+    records["result"] = np.array(results)[records["game"]] * records["turn"]
+    return records, games
+
+
+# Get the BoardShape of a shard's metadata
+def shard_shape(metadata):
+    return get_shape(metadata["rows"], metadata["columns"], metadata["connect"])
+
+
+# Read a shard's header. Returns (metadata, offset of the first chunk).
+def read_header(file):
+    header = file.read(len(SHARD_MAGIC) + 4)
+    if(len(header) != len(SHARD_MAGIC) + 4 or header[:len(SHARD_MAGIC)] != SHARD_MAGIC):
+        raise ValueError(f"{file.name} is not a self-play shard")
+    length = int(np.frombuffer(header[len(SHARD_MAGIC):], dtype="<u4")[0])
+    metadata = json.loads(file.read(length).decode())
+    return metadata, len(header) + length
+
+
+# Find the complete chunks of a shard (a buffer from the first chunk on).
+# Returns a list of (offset, records, games), offsets relative to the buffer.
+def find_chunks(buffer, record_size):
+    chunks = []
+    offset = 0
+    while(offset + CHUNK_HEADER_SIZE <= len(buffer)):
+        if(bytes(buffer[offset:offset + len(CHUNK_MAGIC)]) != CHUNK_MAGIC):
+            break
+        records, games = np.frombuffer(buffer, dtype="<u4", count=2, offset=offset + len(CHUNK_MAGIC))
+        end = offset + CHUNK_HEADER_SIZE + int(records) * record_size
+        if(end > len(buffer)):
+            break # Cut short
+        chunks.append((offset + CHUNK_HEADER_SIZE, int(records), int(games)))
+        offset = end
+    return chunks, offset
+
+
+# Writes chunks to one shard (creating it, or appending to it if it exists
+# with the same metadata).
+class ShardWriter:
+
+
+    def __init__(self, path, metadata):
+        self.__records = 0
+        self.__games = 0
+        if(os.path.exists(path) and os.path.getsize(path) > 0):
+            with open(path, "rb") as file:
+                existing, start = read_header(file)
+                if(existing != metadata):
+                    raise ValueError(f"{path} was written with different settings")
+                chunks, end = find_chunks(file.read(), record_dtype(shard_shape(metadata)).itemsize)
+            for offset, records, games in chunks:
+                self.__records += records
+                self.__games += games
+            self.__file = open(path, "r+b")
+            self.__file.truncate(start + end) # Drop a chunk that was cut short
+            self.__file.seek(start + end)
+        else:
+            self.__file = open(path, "wb")
+            encoded = json.dumps(metadata).encode()
+            self.__file.write(SHARD_MAGIC + np.uint32(len(encoded)).tobytes() + encoded)
+        self.__file.flush()
+
+
+    # Number of records and games in the shard
+    def get_record_count(self):
+        return self.__records
+
+    def get_game_count(self):
+        return self.__games
+
+
+    # Append records of games games as one chunk. Game numbers are made
+    # unique within the shard.
+    def write(self, records, games):
+        records = records.copy()
+        records["game"] += self.__games
+        self.__file.write(CHUNK_MAGIC + np.array([len(records), games], dtype="<u4").tobytes())
+        self.__file.write(records.tobytes())
+        self.__file.flush()
+        self.__records += len(records)
+        self.__games += games
+
+
+    def close(self):
+        self.__file.close()
+
+
+# Reads a shard by memory-mapping it: the records of each chunk are NumPy
+# views of the file, so only the parts used are read.
+class SelfPlayShard:
+
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.metadata, start = read_header(file)
+        self.shape = shard_shape(self.metadata)
+        self.dtype = record_dtype(self.shape)
+        self.__chunks = []
+        self.__games = 0
+        if(os.path.getsize(path) > start):
+            buffer = np.memmap(path, dtype=np.uint8, mode="r", offset=start)
+            chunks, end = find_chunks(buffer, self.dtype.itemsize)
+            for offset, records, games in chunks:
+                self.__chunks.append(np.frombuffer(buffer, dtype=self.dtype, count=records, offset=offset))
+                self.__games += games
+
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.__chunks)
+
+
+    # Number of games in the shard
+    def get_game_count(self):
+        return self.__games
+
+
+    # Iterate over the chunks (structured arrays of records)
+    def chunks(self):
+        return iter(self.__chunks)
+
+
+    # All the records in one array (a copy)
+    def records(self):
+        if(len(self.__chunks) == 0):
+            return np.zeros(0, dtype=self.dtype)
+        return np.concatenate(self.__chunks)
+
+
+    # Unpack the positions of records into cells: an (N, rows * columns)
+    # array like Board.get_board
+    def cells(self, records):
+        return cells_from_records(records, self.shape)
+
+
+# Unpack the positions of records (of the given BoardShape) into cells
+def cells_from_records(records, shape):
+    bits = np.unpackbits(records["pieces"], axis=-1, bitorder="little")[:, :, get_layout(shape).cell_bits]
+    return bits[:, 0].astype(np.int8) - bits[:, 1].astype(np.int8)
+
+
+# The shard files of a directory, in order
+def shard_paths(directory):
+    names = sorted(name for name in os.listdir(directory) if name.startswith("selfplay-") and name.endswith(".c4sp"))
+    return [os.path.join(directory, name) for name in names]
+
+
+# Iterate over the chunks of every shard in a directory. Yields
+# (SelfPlayShard, records) for each chunk.
+def read_directory(directory):
+    for path in shard_paths(directory):
+        shard = SelfPlayShard(path)
+        for chunk in shard.chunks():
+            yield shard, chunk
+
+
+# Play games with the agent configs (one config plays itself) and append
+# their positions to the shards in directory. Games are played in batches of
+# games_per_task over workers processes, and every finished batch is written
+# as a chunk right away. A new shard is started once a shard has
+# shard_records records (or if the last one has other settings). Returns the number of positions written.
+def generate(directory, configs, games, workers=None, seed=None, shape=(ROWS, COLUMNS, CONNECT),
+             random_plies=4, games_per_task=16, shard_records=1 << 22):
+    shape = tuple(shape)
+    get_shape(*shape) # Check the shape before starting
+    # Compared with the metadata of existing shards in its JSON form
+    metadata = json.loads(json.dumps({"rows": shape[0], "columns": shape[1], "connect": shape[2],
+                                      "agents": configs}))
+    os.makedirs(directory, exist_ok=True)
+    # Continue the last shard if it has the same settings
+    paths = shard_paths(directory)
+    number = len(paths)
+    if(len(paths) > 0):
+        with open(paths[-1], "rb") as file:
+            if(read_header(file)[0] == metadata):
+                number -= 1
+    writer = ShardWriter(os.path.join(directory, SHARD_NAME.format(number)), metadata)
+
+    generator = random.Random(seed)
+    tasks = []
+    while(games > 0):
+        tasks.append((min(games, games_per_task), generator.getrandbits(32)))
+        games -= games_per_task
+    start_time = perf_counter()
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [executor.submit(play_games, configs, shape, task_games, random_plies, task_seed)
+                       for task_games, task_seed in tasks]
+            for future in as_completed(futures):
+                records, task_games = future.result()
+                if(writer.get_record_count() >= shard_records):
+                    writer.close()
+                    number += 1
+                    writer = ShardWriter(os.path.join(directory, SHARD_NAME.format(number)), metadata)
+                writer.write(records, task_games)
+                written += len(records)
+                elapsed = perf_counter() - start_time
+                print(f"{written} positions, {written / elapsed * 3600:.0f} per hour")
+    finally:
+        writer.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play positions for heuristic tuning.")
+    parser.add_argument("--agent", action="append", default=[],
+                        help="Agent spec as in battle_agents.py (one agent plays itself, two play each other)")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--output", default="selfplay", help="Directory of the shards")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--random-plies", type=int, default=4, help="Random moves at the start of each game")
+    parser.add_argument("--games-per-task", type=int, default=16, help="Games per chunk")
+    parser.add_argument("--shard-records", type=int, default=1 << 22, help="Records per shard")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--columns", type=int, default=COLUMNS)
+    parser.add_argument("--connect", type=int, default=CONNECT)
+    arguments = parser.parse_args()
+    configs = [parse_agent(spec) for spec in arguments.agent] or [parse_agent("minimax:depth=2")]
+    if(len(configs) > 2):
+        parser.error("give one or two agents")
+    count = generate(arguments.output, configs, arguments.games, arguments.workers, arguments.seed,
+                     (arguments.rows, arguments.columns, arguments.connect), arguments.random_plies,
+                     arguments.games_per_task, arguments.shard_records)
+    print("Wrote", count, "positions to", arguments.output)
+
+
+if(__name__ == "__main__"):
+    main()
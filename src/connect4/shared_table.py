@@ -0,0 +1,130 @@
+from multiprocessing import shared_memory, util
+import numpy as np
+import os
+import struct
+
+# Transposition table in shared memory, so the processes of a parallel
+# Minimax search (see Minimax_Agent's workers) all read and write the same
+# entries. Same interface and replacement rule as TranspositionTable.
+#
+# It's lock-free: a slot is three 64 bit words, the check word (the hash
+# XORed with the other two words), the value (a double) and the info word
+# (depth, bound, best move and generation). A slot written by two processes
+# at once, or read while being written, has a check word that doesn't match
+# and just looks empty. The segment starts with a header: the generation
+# and a stop flag that tells the helper processes to stop searching.
+
+HEADER = struct.Struct("<QQ") # Generation, stop flag
+SLOT = struct.Struct("<QdQ") # Check word, value, info
+
+MASK = (1 << 64) - 1
+VALID = 1 << 63 # Set in the info word of every entry (an empty slot is all zeros)
+INTEGER = 1 << 62 # The value was an int
+
+
+# Pack an entry's info word
+def pack_info(depth, bound, best_move, generation, integer):
+    info = VALID | depth | (bound << 16) | ((best_move + 1 if best_move != None else 0) << 18) | (generation << 26)
+    if(integer):
+        info |= INTEGER
+    return info
+
+
+class SharedTranspositionTable:
+
+
+    # Creates a new table of size entries (name=None), or attaches to the
+    # table created with that name by another process.
+    def __init__(self, size=1 << 18, name=None):
+        if(name == None):
+            self.__memory = shared_memory.SharedMemory(create=True, size=HEADER.size + size * SLOT.size)
+            self.__memory.buf[:HEADER.size] = bytes(HEADER.size)
+            self.__memory.buf[HEADER.size:] = bytes(size * SLOT.size)
+            # The process that created the table removes it (not its forks),
+            # also when it's a pool worker that exits without garbage collection
+            self.__finalizer = util.Finalize(self, SharedTranspositionTable.__release, (self.__memory, os.getpid()),
+                                             exitpriority=0)
+        else:
+            self.__memory = shared_memory.SharedMemory(name=name)
+            size = (self.__memory.size - HEADER.size) // SLOT.size
+            self.__finalizer = util.Finalize(self, SharedTranspositionTable.__release, (self.__memory, None), exitpriority=0)
+        self.__size = size
+        self.__buffer = self.__memory.buf
+        self.__generation = HEADER.unpack_from(self.__buffer, 0)[0]
+
+
+    # Tables are passed to other processes by name
+    def __reduce__(self):
+        return (SharedTranspositionTable, (self.__size, self.__memory.name))
+
+
+    @staticmethod
+    def __release(memory, owner):
+        memory.close()
+        if(owner == os.getpid()):
+            memory.unlink()
+
+
+    # Name of the shared memory segment
+    def get_name(self):
+        return self.__memory.name
+
+
+    # Call once per root search (in one process, the others call sync)
+    def new_search(self):
+        self.__generation = (self.__generation + 1) & 0xFFFFFFFF
+        struct.pack_into("<Q", self.__buffer, 0, self.__generation)
+
+
+    # Read the generation set by new_search in another process
+    def sync(self):
+        self.__generation = HEADER.unpack_from(self.__buffer, 0)[0]
+
+
+    # Remove all entries
+    def clear(self):
+        self.__buffer[HEADER.size:] = bytes(self.__size * SLOT.size)
+
+
+    # Tell the processes searching with this table to stop (see
+    # stop_requested), or let them search again
+    def set_stop(self, stop):
+        struct.pack_into("<Q", self.__buffer, 8, 1 if stop else 0)
+
+
+    def stop_requested(self):
+        return HEADER.unpack_from(self.__buffer, 0)[1] != 0
+
+
+    # Return the entry stored for this hash (or None if not stored):
+    # (hash, depth, bound, value, best_move, generation)
+    def probe(self, hash):
+        check, value, info = SLOT.unpack_from(self.__buffer, HEADER.size + (hash % self.__size) * SLOT.size)
+        if(not info & VALID or check != hash ^ info ^ (value.__hash__() & MASK)):
+            return None
+        move = (info >> 18) & 0xFF
+        return (hash, info & 0xFFFF, (info >> 16) & 3, int(value) if info & INTEGER else value,
+                move - 1 if move else None, (info >> 26) & 0xFFFFFFFF)
+
+
+    # Store the result of a search
+    def store(self, hash, depth, bound, value, best_move):
+        offset = HEADER.size + (hash % self.__size) * SLOT.size
+        old_info = SLOT.unpack_from(self.__buffer, offset)[2]
+        if(old_info & VALID and (old_info >> 26) & 0xFFFFFFFF == self.__generation and depth < old_info & 0xFFFF):
+            return
+        info = pack_info(depth, bound, best_move, self.__generation, isinstance(value, int))
+        value = float(value)
+        SLOT.pack_into(self.__buffer, offset, hash ^ info ^ (value.__hash__() & MASK), value, info)
+
+
+    # Number of entries in use
+    def count(self):
+        slots = np.frombuffer(self.__buffer, dtype=np.uint64, offset=HEADER.size).reshape(-1, 3)
+        return int(np.count_nonzero(slots[:, 2] >> np.uint64(63)))
+
+
+    # Stop using the table (the process that created it also removes it)
+    def close(self):
+        self.__buffer = None
+        self.__finalizer()
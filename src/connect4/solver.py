@@ -0,0 +1,171 @@
+from connect4.board.board import get_shape, mirror_move
+from connect4.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from time import perf_counter
+
+# Exact endgame solver: searches every line to the end of the game (no depth
+# limit and no heuristic), so the result is the game-theoretic value.
+#
+# Scores are for the player to move. With E empty cells, a win where the
+# winning move is the p-th move from now scores E + 1 - p (faster wins score
+# higher), a loss scores -(E + 1 - p) and a tie scores 0.
+#
+# Solve modes:
+#   "strong": exact score, so also the number of plies to the end of the game
+#   "weak": only win, tie or loss (scores 1, 0, -1), which is much faster
+
+SOLVE_MODES = ["strong", "weak"]
+
+
+class Solver:
+
+
+    # transposition_table_size is the number of positions remembered
+    # (between solves too, since the same endgame is solved again every move).
+    # With symmetry, a position and its mirror image share table entries.
+    def __init__(self, mode="strong", transposition_table_size=1 << 18, symmetry=False):
+        if(mode not in SOLVE_MODES):
+            raise ValueError(f"Unknown solve mode '{mode}' (choose from {', '.join(SOLVE_MODES)})")
+        self.__mode = mode
+        self.__symmetry = symmetry
+        self.__table = TranspositionTable(transposition_table_size)
+        self.__nodes = 0
+        self.__last_solve_info = None
+        # Shape of the board being solved (set by solve)
+        self.__center_order = get_shape().center_order
+        self.__columns = get_shape().columns
+
+
+    # Negamax alpha-beta search to the end of the game. Returns the score of
+    # the board for the player to move if it's between alpha and beta,
+    # otherwise a bound on it (<= alpha or >= beta).
+    # empty_cells is the number of empty cells on the board.
+    def negamax(self, board, alpha, beta, empty_cells):
+        self.__nodes += 1
+        turn = board.get_turn()
+        # Win right away
+        if(len(board.get_winning_moves(turn)) > 0):
+            return empty_cells
+        # The opponent threatens to win: block, or lose if there are 2 threats
+        legal_moves = board.get_legal_moves()
+        threats = board.get_winning_moves(-turn)
+        if(len(threats) > 1):
+            return -(empty_cells - 1)
+        if(len(threats) == 1):
+            legal_moves = threats
+        # Can't win before our second move from now (a tie scores 0)
+        max_score = max(empty_cells - 2, 0)
+        if(beta > max_score):
+            beta = max_score
+            if(alpha >= beta): return beta
+
+        # Moves are stored for the canonical form (mirrored if flip)
+        if(self.__symmetry):
+            hash = board.canonical_key()
+            flip = board.is_mirrored()
+        else:
+            hash = board.get_hash()
+            flip = False
+        entry = self.__table.probe(hash)
+        best_move = None
+        if(entry != None):
+            if(entry[2] == EXACT): return entry[3]
+            if(entry[2] == LOWER and entry[3] >= beta): return entry[3]
+            if(entry[2] == UPPER and entry[3] <= alpha): return entry[3]
+            best_move = mirror_move(entry[4], self.__columns) if flip else entry[4]
+
+        # Best move from the table first, then from the middle out
+        moves = [move for move in self.__center_order if move in legal_moves]
+        if(best_move in moves):
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        original_alpha = alpha
+        best_score = -empty_cells
+        for move in moves:
+            board.move(move)
+            if(empty_cells == 1):
+                score = 0 # Board is full (the move didn't win, that was checked)
+            else:
+                score = -self.negamax(board, -beta, -alpha, empty_cells - 1)
+            board.unmove()
+            if(score > best_score):
+                best_score = score
+                best_move = move
+            if(score >= beta):
+                self.__table.store(hash, empty_cells, LOWER, score, mirror_move(move, self.__columns) if flip else move)
+                return score
+            if(score > alpha):
+                alpha = score
+        bound = EXACT if best_score > original_alpha else UPPER
+        self.__table.store(hash, empty_cells, bound, best_score, mirror_move(best_move, self.__columns) if flip else best_move)
+        return best_score
+
+
+    # Find the score of the board with null-window searches (each one only
+    # answers "is the score above x?"), narrowing the range in between.
+    def __solve_score(self, board, empty_cells):
+        if(self.__mode == "weak"):
+            low, high = -1, 1
+        else:
+            low, high = -empty_cells, empty_cells
+        while(low < high):
+            middle = low + (high - low) // 2
+            # Check closer to 0 first (cheaper)
+            if(middle <= 0 and low // 2 < middle): middle = low // 2
+            elif(middle >= 0 and high // 2 > middle): middle = high // 2
+            score = self.negamax(board, middle, middle + 1, empty_cells)
+            if(score <= middle):
+                high = score
+            else:
+                low = score
+        if(self.__mode == "weak"):
+            return max(-1, min(1, low))
+        return low
+
+
+    # Solve the board (the game must not be over).
+    # Returns (best move, score, plies to the end of the game). In weak mode
+    # the score is 1, 0 or -1 and the plies are None.
+    def solve(self, board):
+        start_time = perf_counter()
+        self.__nodes = 0
+        self.__table.new_search()
+        shape = board.get_shape()
+        self.__center_order = shape.center_order
+        self.__columns = shape.columns
+        empty_cells = shape.cells - len(board.get_moves())
+        score = self.__solve_score(board, empty_cells)
+        # Find a move that gets the score: a child whose score (for the
+        # opponent) is at most -score. Only needs null-window searches.
+        turn = board.get_turn()
+        legal_moves = [move for move in self.__center_order if move in board.get_legal_moves()]
+        best_move = None
+        winning_moves = board.get_winning_moves(turn)
+        if(score > 0 and len(winning_moves) > 0 and (self.__mode == "weak" or score == empty_cells)):
+            best_move = winning_moves[0]
+        for move in legal_moves:
+            if(best_move != None): break
+            board.move(move)
+            if(board.check_win(turn)):
+                child_score = -empty_cells # Our win, as the opponent's loss
+            elif(board.check_full()):
+                child_score = 0
+            else:
+                child_score = self.negamax(board, -score, -score + 1, empty_cells - 1)
+            board.unmove()
+            if(child_score <= -score):
+                best_move = move
+        if(best_move == None):
+            best_move = legal_moves[0] # Only if every move loses (weak mode)
+        plies = None
+        if(self.__mode == "strong"):
+            plies = empty_cells if score == 0 else empty_cells + 1 - abs(score)
+        self.__last_solve_info = {"mode": self.__mode, "nodes": self.__nodes, "score": score,
+                                  "plies_to_end": plies, "time": perf_counter() - start_time}
+        return best_move, score, plies
+
+
+    # Information about the last solve: mode, nodes searched, score, plies to
+    # the end of the game and time taken (seconds).
+    def get_last_solve_info(self):
+        return self.__last_solve_info
@@ -0,0 +1,54 @@
+# Transposition table: remembers the result of searching a position so the
+# same position reached through a different move order (or on a later turn)
+# doesn't have to be searched again.
+
+# Bound types: what the stored value means
+EXACT = 0
+LOWER = 1 # Real value is >= the stored value (search was cut off at a max node)
+UPPER = 2 # Real value is <= the stored value (search was cut off at a min node)
+
+
+# A fixed-size table indexed by the position's Zobrist hash. Each slot holds
+# one entry: (hash, depth, bound, value, best_move, generation).
+# A new entry replaces the one in its slot (same position or not) if the old
+# one is from an earlier search (older generation) or was searched less
+# deeply. This keeps memory capped at a fixed number of entries.
+class TranspositionTable:
+
+
+    def __init__(self, size=1 << 18):
+        self.__size = size
+        self.__entries = [None] * size
+        self.__generation = 0
+
+
+    # Call once per root search so entries from previous moves become
+    # candidates for replacement.
+    def new_search(self):
+        self.__generation += 1
+
+
+    # Remove all entries
+    def clear(self):
+        self.__entries = [None] * self.__size
+
+
+    # Return the entry stored for this hash (or None if not stored)
+    def probe(self, hash):
+        entry = self.__entries[hash % self.__size]
+        if(entry != None and entry[0] == hash):
+            return entry
+        return None
+
+
+    # Store the result of a search
+    def store(self, hash, depth, bound, value, best_move):
+        index = hash % self.__size
+        old_entry = self.__entries[index]
+        if(old_entry == None or old_entry[5] != self.__generation or depth >= old_entry[1]):
+            self.__entries[index] = (hash, depth, bound, value, best_move, self.__generation)
+
+
+    # Number of entries in use
+    def count(self):
+        return sum(1 for entry in self.__entries if entry != None)
@@ -0,0 +1,206 @@
+from connect4.evaluators import make_evaluator, save_evaluator
+from connect4.selfplay import shard_paths, SelfPlayShard
+from time import perf_counter
+import argparse
+import numpy as np
+
+# Weight tuning: fits the weights of an evaluator (LinearEvaluator by
+# default) to the results of self-play games (see selfplay.py), so that
+# sigmoid(scale * score) predicts the game's result for player 1 (1 win,
+# 0.5 tie, 0 loss). The positions are split by game into a training and a
+# validation set, and the evaluator with the tuned weights is saved to a
+# JSON file that the agents can load (evaluator=tuned.json).
+#
+# Methods:
+#   texel: the scale is fitted once for the starting weights, then the mean
+#       squared error is minimized with mini-batch gradient descent (Adam)
+#       on the feature matrix (LinearEvaluator.features)
+#   spsa: only uses the evaluator's evaluate_batch, get_weights and
+#       set_weights, so it also works for evaluators without features. Each
+#       step measures the loss at two random perturbations of the weights.
+#
+# Examples:
+#   python -m connect4.tuning --data selfplay --output tuned.json
+#   python -m connect4.tuning --data selfplay --method spsa --epochs 500 --output tuned.json
+
+METHODS = ("texel", "spsa")
+
+# Share of the games kept for validation
+DEFAULT_VALIDATION = 0.1
+
+
+# Load the positions of the shards in the given directories (all of the
+# same board shape). Returns the BoardShape, the cells (like
+# Board.get_board), the results for player 1 (1, 0.5 or 0) and a number
+# for each position's game.
+def load_positions(directories):
+    shape = None
+    cells, results, games = [], [], []
+    shards = 0
+    for directory in directories:
+        for path in shard_paths(directory):
+            shard = SelfPlayShard(path)
+            if(shape == None):
+                shape = shard.shape
+            elif(shard.shape != shape):
+                raise ValueError(f"{path} is for {shard.shape}, not {shape}")
+            for chunk in shard.chunks():
+                cells.append(shard.cells(chunk))
+                results.append((chunk["result"].astype(float) * chunk["turn"] + 1) / 2)
+                games.append(shards * (1 << 32) + chunk["game"].astype(np.int64))
+            shards += 1
+    if(shape == None or len(cells) == 0):
+        raise ValueError("No positions found")
+    return shape, np.concatenate(cells), np.concatenate(results), np.concatenate(games)
+
+
+# Split the positions by game: returns the indices of the training and
+# validation positions
+def split_games(games, validation, rng):
+    unique_games = np.unique(games)
+    held_out = rng.choice(unique_games, size=int(round(len(unique_games) * validation)), replace=False)
+    is_validation = np.isin(games, held_out)
+    return np.flatnonzero(~is_validation), np.flatnonzero(is_validation)
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
+
+
+# Mean squared error of sigmoid(scale * scores) against the results
+def loss(scores, results, scale):
+    return float(np.mean((sigmoid(scale * scores) - results) ** 2))
+
+
+# The scale that gives the smallest loss (golden section search on log scale)
+def fit_scale(scores, results, low=1e-3, high=1e2, steps=60):
+    ratio = (np.sqrt(5) - 1) / 2
+    low, high = np.log(low), np.log(high)
+    for _ in range(steps):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if(loss(scores, results, np.exp(a)) < loss(scores, results, np.exp(b))):
+            high = b
+        else:
+            low = a
+    return float(np.exp((low + high) / 2))
+
+
+# Texel tuning: Adam on the loss of sigmoid(scale * features @ weights).
+# Returns the tuned weights.
+def tune_texel(features, results, weights, scale, epochs, batch_size, learning_rate, rng, log=None):
+    weights = weights.copy()
+    moment = np.zeros_like(weights)
+    second_moment = np.zeros_like(weights)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    step = 0
+    for epoch in range(epochs):
+        order = rng.permutation(len(features))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            x = features[batch]
+            prediction = sigmoid(scale * (x @ weights))
+            error = (prediction - results[batch]) * prediction * (1 - prediction)
+            gradient = 2 * scale * (x.T @ error) / len(batch)
+            step += 1
+            moment = beta1 * moment + (1 - beta1) * gradient
+            second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+            weights -= (learning_rate * (moment / (1 - beta1 ** step))
+                        / (np.sqrt(second_moment / (1 - beta2 ** step)) + epsilon))
+        if(log != None):
+            log(epoch, weights)
+    return weights
+
+
+# SPSA tuning of any evaluator with get_weights/set_weights: each step
+# perturbs all the weights at once by +-perturbation and moves them against
+# the estimated gradient (on a random batch of positions). The evaluator is
+# left with the tuned weights, which are also returned.
+def tune_spsa(evaluator, shape, cells, results, scale, steps, batch_size, learning_rate, rng,
+              perturbation=0.05, log=None, log_every=50):
+    weights = evaluator.get_weights(shape)
+    for step in range(steps):
+        # Standard SPSA gain sequences
+        gain = learning_rate / (step + 1 + steps / 10) ** 0.602
+        size = perturbation / (step + 1) ** 0.101
+        batch = rng.choice(len(cells), size=min(batch_size, len(cells)), replace=False)
+        delta = rng.choice([-1.0, 1.0], size=len(weights))
+        evaluator.set_weights(shape, weights + size * delta)
+        loss_plus = loss(evaluator.evaluate_batch(cells[batch], shape), results[batch], scale)
+        evaluator.set_weights(shape, weights - size * delta)
+        loss_minus = loss(evaluator.evaluate_batch(cells[batch], shape), results[batch], scale)
+        weights = weights - gain * (loss_plus - loss_minus) / (2 * size * delta)
+        if(log != None and (step + 1) % log_every == 0):
+            log(step, weights)
+    evaluator.set_weights(shape, weights)
+    return weights
+
+
+# Load the data, tune the evaluator and return it with the losses (before
+# and after, on the validation set, or the training set if there is none)
+def tune(directories, evaluator="linear", method="texel", epochs=20, batch_size=4096, learning_rate=None,
+         validation=DEFAULT_VALIDATION, seed=None, verbose=True):
+    if(method not in METHODS):
+        raise ValueError(f"Unknown method '{method}' (choose from {', '.join(METHODS)})")
+    evaluator = make_evaluator(evaluator)
+    rng = np.random.default_rng(seed)
+    shape, cells, results, games = load_positions(directories)
+    train, test = split_games(games, validation, rng)
+    if(len(test) == 0):
+        test = train
+    if(verbose):
+        print(f"{len(cells)} positions of {len(np.unique(games))} games ({shape}), "
+              f"{len(train)} for training and {len(test)} for validation")
+
+    weights = evaluator.get_weights(shape)
+    scale = fit_scale(evaluator.evaluate_batch(cells[train], shape), results[train])
+    start_loss = loss(evaluator.evaluate_batch(cells[test], shape), results[test], scale)
+    if(verbose):
+        print(f"Scale {scale:.4f}, validation loss {start_loss:.6f}")
+
+    def log(step, weights):
+        if(verbose):
+            evaluator.set_weights(shape, weights)
+            print(f"{method} {step + 1}: validation loss "
+                  f"{loss(evaluator.evaluate_batch(cells[test], shape), results[test], scale):.6f}")
+
+    start_time = perf_counter()
+    if(method == "texel"):
+        if(not hasattr(evaluator, "features")):
+            raise ValueError(f"The {evaluator.name} evaluator has no features (use spsa)")
+        features = evaluator.features(cells, shape)
+        weights = tune_texel(features[train], results[train], weights, scale, epochs, batch_size,
+                             learning_rate or 0.01, rng, log)
+        evaluator.set_weights(shape, weights)
+    else:
+        weights = tune_spsa(evaluator, shape, cells[train], results[train], scale, epochs, batch_size,
+                  learning_rate or 1.0, rng, log=log)
+    end_loss = loss(evaluator.evaluate_batch(cells[test], shape), results[test], scale)
+    if(verbose):
+        print(f"Tuned in {perf_counter() - start_time:.1f} s, validation loss {start_loss:.6f} -> {end_loss:.6f}")
+        names = evaluator.feature_names(shape) if hasattr(evaluator, "feature_names") else range(len(weights))
+        for name, weight in zip(names, weights):
+            print(f"  {name}: {weight:.4f}")
+    return evaluator, start_loss, end_loss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune evaluator weights on self-play games.")
+    parser.add_argument("--data", action="append", required=True, help="Directory of self-play shards")
+    parser.add_argument("--output", default="tuned.json", help="JSON file of the tuned evaluator")
+    parser.add_argument("--evaluator", default="linear", help="Evaluator to start from (name or .json file)")
+    parser.add_argument("--method", choices=METHODS, default="texel")
+    parser.add_argument("--epochs", type=int, default=20, help="Epochs (texel) or steps (spsa)")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--learning-rate", type=float, default=None)
+    parser.add_argument("--validation", type=float, default=DEFAULT_VALIDATION, help="Share of games held out")
+    parser.add_argument("--seed", type=int, default=None)
+    arguments = parser.parse_args()
+    evaluator, _, _ = tune(arguments.data, arguments.evaluator, arguments.method, arguments.epochs,
+                           arguments.batch_size, arguments.learning_rate, arguments.validation, arguments.seed)
+    save_evaluator(evaluator, arguments.output)
+    print("Saved to", arguments.output)
+
+
+if(__name__ == "__main__"):
+    main()
@@ -1,39 +1,43 @@
 
-from board.board import Board
-from minimax import Minimax_Agent
+from connect4.board.board import Board
+from connect4.minimax import Minimax_Agent
 
 # Play against the Minimax agent
 
 board = Board()
-agent = Minimax_Agent(int(input("Enter search depth: ")), 1)
+# The agent ponders (keeps searching) while waiting for the user's move
+agent = Minimax_Agent(int(input("Enter search depth: ")), 1, ponder=True)
 
-board.print_board()
+# The agent is closed however the game ends (e.g., Ctrl-C), so it stops pondering
+try:
+    board.print_board()
 
-# Play until the game is over
-while(1):
+    # Play until the game is over
+    while(1):
     
-    # Agent turn
-    if(board.get_turn() == 1):
-        best_move = agent.get_move(board)
-        print("Agent's move:", best_move)
-        board.move(best_move)
-    # User turn
-    else:
-        move = int(input("\nYour turn. Your move: "))
-        while(move not in board.get_legal_moves()):
-            move = int(input("Illegal move. Try again: "))
-        board.move(move)
+        # Agent turn
+        if(board.get_turn() == 1):
+            best_move = agent.get_move(board)
+            print("Agent's move:", best_move)
+            board.move(best_move)
+        # User turn
+        else:
+            move = int(input("\nYour turn. Your move: "))
+            while(move not in board.get_legal_moves()):
+                move = int(input("Illegal move. Try again: "))
+            board.move(move)
         
-    board.print_board()
+        board.print_board()
     
-    # Check end game conditions
-    if(board.check_win(-1)):
-        print("You win!")
-        break
-    elif(board.check_win(1)):
-        print("Agent wins!")
-        break
-    elif(board.check_full()):
-        print("Tie game.")
-        break
-    
\ No newline at end of file
+        # Check end game conditions
+        if(board.check_win(-1)):
+            print("You win!")
+            break
+        elif(board.check_win(1)):
+            print("Agent wins!")
+            break
+        elif(board.check_full()):
+            print("Tie game.")
+            break
+finally:
+    agent.close()
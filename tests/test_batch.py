@@ -0,0 +1,39 @@
+import random
+import pytest
+from connect4.board.board import make_board
+from connect4.board.batch import heuristic_batch
+
+
+# Shapes (rows, columns, connect), including boards with fewer rows than
+# connect - 1 (no vertical windows at all)
+SHAPES = [(6, 7, 4), (5, 4, 3), (7, 9, 5), (2, 5, 4), (1, 7, 4), (1, 4, 2), (3, 3, 3)]
+
+
+# Boards of random games on a shape (every position of every game)
+def random_positions(shape, games=20, seed=441):
+    generator = random.Random(seed)
+    positions = []
+    for game in range(games):
+        board = make_board(generator.choice([1, -1]), "numpy", *shape)
+        while(True):
+            positions.append((board.get_board(), board.heuristic(0), board.heuristic(1), board.heuristic(2)))
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            if(board.check_win(turn) or board.check_full()):
+                break
+    return positions
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_heuristic_batch_matches_board(shape):
+    positions = random_positions(shape)
+    cells = [position[0] for position in positions]
+    board_shape = make_board(1, "numpy", *shape).get_shape()
+    for heuristic_number in (0, 1, 2):
+        scores = heuristic_batch(cells, heuristic_number, board_shape)
+        assert list(scores) == [position[1 + heuristic_number] for position in positions]
+
+
+def test_unknown_heuristic():
+    with pytest.raises(ValueError):
+        heuristic_batch([make_board(1, "numpy").get_board()], 3)
@@ -0,0 +1,78 @@
+import pytest
+import connect4.battle_agents as battle_agents
+from connect4.battle_agents import play_game, parse_agent, agent_name, schedule_games, elo_ratings, summarize
+
+
+def test_play_game():
+    record = play_game(parse_agent("minimax:depth=2"), parse_agent("mcts:iterations=50"), 1, 441)
+    assert record["winner"] in (1, 2, None)
+    assert len(record["moves"]) == len(record["move_times_1"]) + len(record["move_times_2"])
+
+
+def test_parse_agent():
+    config = parse_agent("minimax:depth=3,heuristic=2")
+    assert config == {"type": "minimax", "depth": 3, "heuristic": 2}
+    assert parse_agent(agent_name(config)) == config
+    assert agent_name(parse_agent("mcts:iterations=50,name=fast")) == "fast"
+    for spec in ("random", "minimax:iterations=5"):
+        with pytest.raises(ValueError):
+            parse_agent(spec)
+
+
+# Every pair plays game_sets sets of two games, one start each
+def test_schedule_games():
+    games = schedule_games(3, 2, 441)
+    assert len(games) == 3 * 2 * 2
+    for i, j in [(0, 1), (0, 2), (1, 2)]:
+        assert sorted(starting_player for a, b, starting_player, seed in games if (a, b) == (i, j)) == [-1, -1, 1, 1]
+    assert len({seed for a, b, starting_player, seed in games}) == len(games)
+
+
+def test_ratings():
+    records = [{"agent1": "a", "agent2": "b", "winner": 1, "move_times_1": [0.1], "move_times_2": [0.2]}] * 3
+    records += [{"agent1": "b", "agent2": "a", "winner": None, "move_times_1": [0.2], "move_times_2": [0.1]}]
+    ratings = elo_ratings(["a", "b"], records)
+    assert ratings["a"] > 0 > ratings["b"] and ratings["a"] == pytest.approx(-ratings["b"])
+    summary = summarize(["a", "b"], records)
+    assert (summary["a"]["wins"], summary["a"]["losses"], summary["a"]["ties"]) == (3, 0, 1)
+    assert summary["a"]["score_rate"] == 3.5 / 4
+    assert summary["b"]["ci_low"] < summary["b"]["score_rate"] < summary["b"]["ci_high"]
+
+
+# Agent whose search fails after a few moves
+class FailingAgent:
+
+
+    def __init__(self, closed, moves_before_failing):
+        self.closed = closed
+        self.moves_left = moves_before_failing
+
+    def get_move(self, board):
+        if(self.moves_left == 0):
+            raise KeyboardInterrupt
+        self.moves_left -= 1
+        return board.get_legal_moves()[0]
+
+    def close(self):
+        self.closed.append(self)
+
+
+def test_play_game_closes_agents_when_a_search_fails(monkeypatch):
+    closed = []
+    agents = iter([FailingAgent(closed, 3), FailingAgent(closed, 100)])
+    monkeypatch.setattr(battle_agents, "make_agent", lambda config: next(agents))
+    with pytest.raises(KeyboardInterrupt):
+        play_game({"type": "minimax"}, {"type": "minimax"}, 1, 441)
+    assert len(closed) == 2
+
+
+def test_play_game_closes_agents_when_one_cant_be_made(monkeypatch):
+    closed = []
+    def make_agent(config):
+        if(config["type"] == "mcts"):
+            raise ValueError("bad agent")
+        return FailingAgent(closed, 100)
+    monkeypatch.setattr(battle_agents, "make_agent", make_agent)
+    with pytest.raises(ValueError):
+        play_game({"type": "minimax"}, {"type": "mcts"}, 1, 441)
+    assert len(closed) == 1
@@ -0,0 +1,176 @@
+import random
+import pytest
+from connect4.board.board import make_board, mirror_move
+
+
+# The original board (before the bitboard backend and the incremental
+# heuristic), written with lists: the standard 6x7 board, connect 4.
+class BaselineBoard:
+
+
+    def __init__(self, starting_player):
+        self.board = [[0] * 7 for row in range(6)]
+        self.top = [0] * 7
+        self.history = []
+        self.turn = starting_player
+
+    def get_legal_moves(self):
+        return [column for column in range(7) if self.board[5][column] == 0]
+
+    def move(self, column):
+        self.board[self.top[column]][column] = self.turn
+        self.history.append(column)
+        self.top[column] += 1
+        self.turn = -self.turn
+
+    def unmove(self):
+        column = self.history.pop()
+        self.top[column] -= 1
+        self.board[self.top[column]][column] = 0
+        self.turn = -self.turn
+
+    def check_full(self):
+        return 1 if all(top == 6 for top in self.top) else 0
+
+    # Windows of 4 cells: vertical, horizontal, diagonal (/) and (\)
+    def windows(self):
+        for column in range(7):
+            for row in range(3):
+                yield [(row + i, column) for i in range(4)]
+        for row in range(6):
+            for column in range(4):
+                yield [(row, column + i) for i in range(4)]
+        for row in range(3):
+            for column in range(4):
+                yield [(row + i, column + i) for i in range(4)]
+        for row in range(3):
+            for column in range(3, 7):
+                yield [(row + i, column - i) for i in range(4)]
+
+    def check_win(self, player):
+        for window in self.windows():
+            if(all(self.board[row][column] == player for row, column in window)):
+                return 1
+        return 0
+
+    def heuristic(self, heuristic_number):
+        score = 0
+        for column in range(7):
+            if(self.top[column] >= 3):
+                eval = sum(self.board[self.top[column] - below][column] for below in (1, 2, 3))
+                score += (eval == 3) - (eval == -3)
+        for window in list(self.windows())[21:]:
+            eval = sum(self.board[row][column] for row, column in window)
+            score += (eval == 3) - (eval == -3)
+        if(heuristic_number > 0):
+            weight = 1
+            for row in range(6 if heuristic_number == 1 else 4):
+                score += self.board[row][3] * weight
+                weight -= 0.1
+        return score
+
+    def get_board(self):
+        return [piece for row in self.board for piece in row]
+
+
+# Play random games on all the boards at once, checking after every move
+# (and again on the way back with unmove) that they agree
+def play_games(boards_of_game, games, seed, check):
+    generator = random.Random(seed)
+    for game in range(games):
+        starting_player = generator.choice([1, -1])
+        boards = boards_of_game(starting_player)
+        check(boards)
+        moves = 0
+        while(1):
+            move = generator.choice(boards[0].get_legal_moves())
+            turn = boards[0].get_turn() if hasattr(boards[0], "get_turn") else boards[0].turn
+            for board in boards:
+                board.move(move)
+            moves += 1
+            check(boards)
+            if(boards[0].check_win(turn) or boards[0].check_full()):
+                break
+        for move in range(moves):
+            for board in boards:
+                board.unmove()
+            check(boards)
+
+
+def test_backends_match_baseline():
+    def check(boards):
+        baseline, numpy_board, bitboard = boards
+        for board in (numpy_board, bitboard):
+            assert board.get_turn() == baseline.turn
+            assert board.get_legal_moves() == baseline.get_legal_moves()
+            assert board.check_full() == baseline.check_full()
+            assert list(board.get_board()) == baseline.get_board()
+            for player in (1, -1):
+                assert board.check_win(player) == baseline.check_win(player)
+            for heuristic_number in (0, 1, 2):
+                assert board.heuristic(heuristic_number) == baseline.heuristic(heuristic_number)
+        assert numpy_board.get_hash() == bitboard.get_hash()
+        assert numpy_board.get_mirrored_hash() == bitboard.get_mirrored_hash()
+    play_games(lambda player: [BaselineBoard(player), make_board(player, "numpy"), make_board(player, "bitboard")],
+               100, 441, check)
+
+
+@pytest.mark.parametrize("shape", [(6, 7, 4), (5, 4, 3), (7, 9, 5), (2, 5, 4), (10, 10, 6), (3, 3, 3)])
+def test_backends_match_each_other(shape):
+    def check(boards):
+        numpy_board, bitboard = boards
+        assert list(numpy_board.get_board()) == list(bitboard.get_board())
+        assert numpy_board.get_legal_moves() == bitboard.get_legal_moves()
+        assert numpy_board.check_full() == bitboard.check_full()
+        assert numpy_board.get_hash() == bitboard.get_hash()
+        for player in (1, -1):
+            # The incremental check_win and heuristic against the full scans
+            assert numpy_board.check_win(player) == numpy_board.full_check_win(player) == bitboard.check_win(player)
+            assert numpy_board.get_winning_moves(player) == bitboard.get_winning_moves(player)
+        for heuristic_number in (0, 1, 2):
+            value = numpy_board.full_heuristic(heuristic_number)
+            assert numpy_board.heuristic(heuristic_number) == value == bitboard.heuristic(heuristic_number)
+    play_games(lambda player: [make_board(player, "numpy", *shape), make_board(player, "bitboard", *shape)],
+               30, 7, check)
+
+
+# get_winning_moves for the player to move: the moves that win when played
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+def test_winning_moves(backend):
+    def check(boards):
+        board = boards[0]
+        turn = board.get_turn()
+        winning_moves = []
+        for move in board.get_legal_moves():
+            board.move(move)
+            if(board.check_win(turn)):
+                winning_moves.append(move)
+            board.unmove()
+        assert board.get_winning_moves(turn) == winning_moves
+    play_games(lambda player: [make_board(player, backend)], 50, 3, check)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+def test_mirrored_hash(backend):
+    generator = random.Random(5)
+    for game in range(50):
+        board = make_board(1, backend)
+        mirrored = make_board(1, backend)
+        for ply in range(generator.randrange(1, 20)):
+            move = generator.choice(board.get_legal_moves())
+            turn = board.get_turn()
+            board.move(move)
+            mirrored.move(mirror_move(move))
+            if(board.check_win(turn) or board.check_full()):
+                break
+        assert board.get_mirrored_hash() == mirrored.get_hash()
+        assert board.canonical_key() == mirrored.canonical_key()
+
+
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+def test_unknown_heuristic(backend):
+    board = make_board(1, backend)
+    board.move(3)
+    for heuristic_number in (-1, 3, 10):
+        with pytest.raises(ValueError):
+            board.heuristic(heuristic_number)
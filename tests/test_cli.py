@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from connect4.cli import main
+
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Modules a plain bestmove must not import (they're slow to load)
+HEAVY_MODULES = ["numpy", "cProfile", "tracemalloc", "colorama", "connect4.solver", "connect4.opening_book",
+                 "connect4.board.batch", "connect4.evaluators", "connect4.search_stats", "connect4.mcts"]
+
+# Runs bestmove (with the given arguments) in a new process and prints the
+# heavy modules it imported
+CHECK_IMPORTS = """
+import contextlib, io, json, sys
+from connect4.cli import main
+with contextlib.redirect_stdout(io.StringIO()):
+    assert main(["bestmove", "3342"] + sys.argv[1:]) == 0
+print(json.dumps([name for name in {heavy_modules!r} if name in sys.modules]))
+"""
+
+
+def imported_heavy_modules(arguments, heavy_modules):
+    environment = dict(os.environ, PYTHONPATH=SOURCE)
+    process = subprocess.run([sys.executable, "-c", CHECK_IMPORTS.format(heavy_modules=heavy_modules)] + arguments,
+                             capture_output=True, text=True, env=environment, check=True)
+    return json.loads(process.stdout)
+
+
+def test_bestmove_doesnt_import_heavy_modules():
+    assert imported_heavy_modules([], HEAVY_MODULES) == []
+
+
+# MCTS only needs NumPy for the node pool (the default tree), not for the
+# objects tree
+@pytest.mark.parametrize("tree, imported", [("objects", []), ("pool", ["numpy"])])
+def test_mcts_bestmove_doesnt_import_heavy_modules(tree, imported):
+    heavy_modules = [name for name in HEAVY_MODULES if name != "connect4.mcts"]
+    assert imported_heavy_modules(["--agent", "mcts:iterations=100,tree=" + tree], heavy_modules) == imported
+
+
+def test_bestmove(capsys):
+    assert main(["bestmove", "3342", "--agent", "minimax:depth=4"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["move"] in range(7)
+    assert result["info"]["depth"] == 4
+
+
+def test_illegal_position(capsys):
+    assert main(["bestmove", "3333333"]) == 1
+    assert "error" in json.loads(capsys.readouterr().out)
@@ -0,0 +1,102 @@
+import random
+import numpy as np
+import pytest
+from connect4.board.board import make_board, get_shape
+from connect4.evaluators import (HeuristicEvaluator, LinearEvaluator, EVALUATORS, LOADERS, make_evaluator,
+                                 register_evaluator, save_evaluator, load_evaluator)
+
+
+# Random boards of a shape that aren't over
+def random_boards(shape, count, backend="bitboard", seed=441):
+    generator = random.Random(seed)
+    boards = []
+    while(len(boards) < count):
+        board = make_board(generator.choice([1, -1]), backend, *shape)
+        for ply in range(generator.randrange(0, 25)):
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            if(board.check_win(turn) or board.check_full()):
+                break
+        else:
+            boards.append(board)
+    return boards
+
+
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+@pytest.mark.parametrize("heuristic_number", [0, 1, 2])
+def test_heuristic_evaluator(backend, heuristic_number):
+    evaluator = HeuristicEvaluator(heuristic_number)
+    boards = random_boards((6, 7, 4), 40, backend)
+    scores = [evaluator.evaluate(board) for board in boards]
+    assert scores == [board.heuristic(heuristic_number) for board in boards]
+    batch = evaluator.evaluate_batch(np.array([board.get_board() for board in boards]), get_shape())
+    assert np.allclose(batch, scores)
+
+
+# evaluate, evaluate_batch and features @ get_weights give the same scores
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+@pytest.mark.parametrize("shape", [(6, 7, 4), (8, 7, 5), (5, 6, 4)])
+@pytest.mark.parametrize("weights", [None, {"open_1": 0.25, "open_2": -0.5, "middle_row_0": 2, "column_2": 0.3}])
+def test_linear_evaluator(backend, shape, weights):
+    evaluator = LinearEvaluator(weights)
+    board_shape = get_shape(*shape)
+    boards = random_boards(shape, 40, backend)
+    cells = np.array([board.get_board() for board in boards])
+    scores = [evaluator.evaluate(board) for board in boards]
+    assert np.allclose(evaluator.evaluate_batch(cells, board_shape), scores)
+    assert np.allclose(evaluator.features(cells, board_shape) @ evaluator.get_weights(board_shape), scores)
+    # A board and its colours swapped score the opposite
+    assert np.allclose(evaluator.evaluate_batch(-cells, board_shape), -np.array(scores))
+
+
+def test_set_weights():
+    shape = get_shape()
+    evaluator = LinearEvaluator()
+    boards = random_boards((6, 7, 4), 10)
+    evaluator.evaluate(boards[0]) # (Fills the tables of the old weights)
+    weights = np.arange(len(LinearEvaluator.feature_names(shape)), dtype=float)
+    evaluator.set_weights(shape, weights)
+    assert list(evaluator.get_weights(shape)) == list(weights)
+    assert evaluator.evaluate(boards[0]) == pytest.approx(float(evaluator.features(boards[0].get_board(), shape)[0]
+                                                                @ weights))
+
+
+@pytest.mark.parametrize("evaluator", [HeuristicEvaluator(2), LinearEvaluator({"open_3": 1.5, "column_1": -0.2})])
+def test_save_and_load(tmp_path, evaluator):
+    path = str(tmp_path / "evaluator.json")
+    save_evaluator(evaluator, path)
+    for loaded in (load_evaluator(path), make_evaluator(path)):
+        assert type(loaded) == type(evaluator)
+        assert loaded.to_dict() == evaluator.to_dict()
+        for board in random_boards((6, 7, 4), 10):
+            assert loaded.evaluate(board) == evaluator.evaluate(board)
+
+
+# A LinearEvaluator registered under another name
+def double_linear(weights=None):
+    evaluator = LinearEvaluator(weights or {"open_3": 2})
+    evaluator.name = "double_linear"
+    return evaluator
+
+
+# A registered evaluator is made by name, and saved ones are loaded with its
+# loader
+def test_register_evaluator(tmp_path, monkeypatch):
+    monkeypatch.setattr("connect4.evaluators.EVALUATORS", dict(EVALUATORS))
+    monkeypatch.setattr("connect4.evaluators.LOADERS", dict(LOADERS))
+    with pytest.raises(ValueError):
+        make_evaluator("double_linear")
+    register_evaluator("double_linear", double_linear, lambda data: double_linear(data.get("weights")))
+    evaluator = make_evaluator("double_linear")
+    evaluator.set_weights(get_shape(), 2 * evaluator.get_weights(get_shape()))
+    path = str(tmp_path / "double.json")
+    save_evaluator(evaluator, path)
+    loaded = load_evaluator(path)
+    assert loaded.name == "double_linear"
+    assert list(loaded.get_weights(get_shape())) == list(evaluator.get_weights(get_shape()))
+    # Without a loader, the saved name is made with the factory
+    register_evaluator("heuristic_zero", lambda: HeuristicEvaluator(0))
+    (tmp_path / "zero.json").write_text('{"evaluator": "heuristic_zero"}')
+    assert load_evaluator(str(tmp_path / "zero.json")).heuristic_number == 0
+    # Objects are returned as they are
+    assert make_evaluator(evaluator) is evaluator
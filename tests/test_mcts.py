@@ -0,0 +1,226 @@
+import random
+import pytest
+from connect4.board.board import make_board
+from connect4.mcts import MCTS_Agent, choice_decided
+
+
+def position(moves, backend="bitboard"):
+    board = make_board(1, backend)
+    for move in moves:
+        board.move(move)
+    return board
+
+
+# Random positions that aren't over
+def random_positions(count, seed=441, max_moves=30):
+    generator = random.Random(seed)
+    positions = []
+    while(len(positions) < count):
+        board = make_board(generator.choice([1, -1]), "bitboard")
+        for ply in range(generator.randrange(0, max_moves)):
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            if(board.check_win(turn) or board.check_full()):
+                break
+        else:
+            positions.append(board)
+    return positions
+
+
+# Both parallel modes play a legal move, and the root children's games add
+# up to every game played by the workers (leaf mode: leaf_games per worker
+# and leaf, root mode: the workers' trees merged)
+@pytest.mark.parametrize("parallel", ["leaf", "root"])
+def test_parallel_search(parallel):
+    board = position([3, 3])
+    random.seed(441)
+    agent = MCTS_Agent(400, workers=2, parallel=parallel, leaf_games=4)
+    try:
+        move = agent.get_move(board)
+    finally:
+        agent.close()
+    info = agent.get_last_search_info()
+    assert move in board.get_legal_moves()
+    assert board.get_moves() == [3, 3]
+    assert info["rollouts"] == 400
+    assert info["games"] == 400
+    if(parallel == "leaf"):
+        assert info["iterations"] == 400 // (2 * 4)
+    else:
+        assert info["iterations"] == 400
+
+
+# Stopping early (the time limit is never reached, so only max_iterations
+# and choice_decided stop the search) plays the same move as searching the
+# whole budget with the same seed
+@pytest.mark.parametrize("solver", [False, True])
+def test_early_stopping_keeps_the_move(solver):
+    stopped = 0
+    for index, board in enumerate(random_positions(15, seed=5)):
+        random.seed(index)
+        agent = MCTS_Agent(1000, solver=solver)
+        move = agent.get_move(board, time_limit_ms=10 ** 7, max_iterations=1000)
+        if(agent.get_last_search_info()["stop"] == "decided"):
+            stopped += 1
+            assert agent.get_last_search_info()["iterations"] < 1000
+        random.seed(index)
+        assert MCTS_Agent(1000, solver=solver).get_move(board) == move
+    # (With the solver any child can still be proven won or lost, so only
+    # proven results stop it early)
+    assert stopped > 0 or solver
+
+
+def test_choice_decided():
+    # 0.7 with 10 games left can't drop below 700 / 1010, 0.2 can't reach 60 / 310
+    assert choice_decided({0: (50, 250, None), 3: (700, 1000, None)}, 10)
+    assert not choice_decided({0: (50, 250, None), 3: (700, 1000, None)}, 500)
+    # A child before the leader is played on a tie
+    assert not choice_decided({0: (0, 10, None), 3: (5, 10, 0.5)}, 10)
+    assert choice_decided({0: (5, 10, 0.5), 3: (0, 10, None)}, 10)
+    # A winning move is decided, unless the solver could prove an earlier one
+    assert choice_decided({0: (1, 2, None), 3: (1, 1, 1)}, 10)
+    assert not choice_decided({0: (1, 2, None), 3: (1, 1, 1)}, 10, solver=True)
+    assert choice_decided({0: (0, 1, 0), 3: (1, 1, 1)}, 10, solver=True)
+
+
+# Statistics of a node's subtree: (action, score, games, result, children)
+def subtree_statistics(pool, node):
+    return (int(pool.action[node]), float(pool.score[node]), int(pool.games[node]), int(pool.result[node]),
+            [subtree_statistics(pool, child) for child in pool.children(node)])
+
+
+def test_extract_subtree_keeps_statistics():
+    random.seed(441)
+    agent = MCTS_Agent(2000, rave=300, solver=True)
+    board = position([3, 3])
+    root = agent.search(board)
+    pool = agent._MCTS_Agent__tree
+    for moves in ([3], [2, 4], [3, 3, 3]):
+        node = root
+        for move in moves:
+            node = pool.child(node, move)
+        subtree = pool.extract_subtree(node)
+        assert subtree_statistics(subtree, 0) == subtree_statistics(pool, node)
+        assert subtree.rave == 300 and subtree.solver
+        for name in ("amaf_score", "amaf_games"):
+            assert list(getattr(subtree, name)[:subtree.size]) ==\
+                [getattr(pool, name)[index] for index in subtree_nodes(pool, node)]
+
+
+# Indices of a subtree's nodes in the order extract_subtree copies them
+def subtree_nodes(pool, node):
+    nodes = [node]
+    to_copy = [node]
+    while(len(to_copy) > 0):
+        children = pool.children(to_copy.pop())
+        nodes += children
+        to_copy += children
+    return nodes
+
+
+# After the agent's move and the reply, the search goes on from the
+# grandchild: its games are kept (the same as in the objects tree, which
+# keeps the TreeNode itself)
+def test_reuse_two_plies_down():
+    statistics = {}
+    for tree in ("objects", "pool"):
+        random.seed(441)
+        agent = MCTS_Agent(2000, tree=tree)
+        board = position([3, 3])
+        root = agent.search(board)
+        move = agent.get_move(board)
+        if(tree == "objects"):
+            grandchild = root.children[move].children[3]
+        board.move(move)
+        board.move(3)
+        # Zero iterations: the kept tree as it is
+        new_root = agent.search(board, time_limit_ms=10 ** 7, max_iterations=0)
+        statistics[tree] = agent.root_statistics(new_root)
+        if(tree == "objects"):
+            assert new_root is grandchild
+        games = sum(child[1] for child in statistics[tree].values())
+        assert games > 0
+        agent.get_move(board)
+        assert agent.get_last_search_info()["games"] == games + 2000
+    assert statistics["pool"] == statistics["objects"]
+
+
+# Boards that aren't a continuation of the last search, or that leave the
+# tree, get a new tree
+@pytest.mark.parametrize("starting_player, moves, simulations", [
+    (1, [3, 2, 0, 0], 2000), # Different moves before
+    (-1, [3, 3, 0, 0], 2000), # Same moves, other starting player (other hash)
+    (1, [3], 2000), # Moves taken back
+    (1, [3, 3, 0, 0], 1), # Only the root was expanded
+])
+def test_rebuild_tree(starting_player, moves, simulations):
+    random.seed(441)
+    agent = MCTS_Agent(simulations)
+    agent.search(position([3, 3]))
+    board = make_board(starting_player, "bitboard")
+    for move in moves:
+        board.move(move)
+    root = agent.search(board, time_limit_ms=10 ** 7, max_iterations=0)
+    assert agent.root_statistics(root) == {}
+    assert agent.get_last_search_info()["nodes"] == 1
+    assert board.get_moves() == moves
+
+
+# Positions with a forced win for the player to move (starting player,
+# moves, winning move): a win in 5 plies and one in 3. After the winning
+# move, the opponent is lost in 4 and 2 plies.
+FORCED_WINS = [(-1, [0, 6, 5, 3, 4, 0, 0, 5, 2, 4, 1, 4, 1, 1, 2], 3),
+               (1, [6, 2, 1, 5, 3, 0, 2, 6, 6, 4, 4, 0, 4, 2, 6, 3], 4)]
+
+
+@pytest.mark.parametrize("rave", [0, 300])
+@pytest.mark.parametrize("starting_player, moves, winning_move", FORCED_WINS)
+def test_solver_proves_forced_results(starting_player, moves, winning_move, rave):
+    from connect4.minimax import Minimax_Agent, decrease_above
+    board = make_board(starting_player, "bitboard")
+    for move in moves:
+        board.move(move)
+    minimax = Minimax_Agent(5)
+    assert minimax.get_move(board) == winning_move
+    assert minimax.get_last_search_info()["value"] > decrease_above
+    for lost in (False, True):
+        if(lost):
+            board.move(winning_move)
+        random.seed(441)
+        agent = MCTS_Agent(20000, solver=True, rave=rave)
+        statistics = agent.root_statistics(agent.search(board))
+        info = agent.get_last_search_info()
+        assert info["solved"] and info["stop"] == "solved" and info["iterations"] < 20000
+        if(lost):
+            # Every move loses (game_result 0)
+            assert {statistics[move][2] for move in statistics} == {0}
+            minimax = Minimax_Agent(5)
+            minimax.get_move(board)
+            assert minimax.get_last_search_info()["value"] < -decrease_above
+        else:
+            # The winning move is proven won and played
+            assert statistics[winning_move][2] == 1
+            assert agent.get_move(board) == winning_move
+        # Without the solver nothing is proven and the search goes on
+        random.seed(441)
+        agent = MCTS_Agent(2000, rave=rave)
+        agent.search(board)
+        assert not agent.get_last_search_info()["solved"]
+        assert agent.get_last_search_info()["iterations"] == 2000
+
+
+# With the solver, RAVE and progressive bias off, the pool's search is
+# plain UCB: the same statistics as the objects tree (TreeNode) with the
+# same seed
+@pytest.mark.parametrize("starting_player, moves", [(1, []), (1, [3, 3, 2, 4])] +
+                         [(starting_player, moves) for starting_player, moves, move in FORCED_WINS])
+def test_pool_without_extensions_is_plain_ucb(starting_player, moves):
+    board = make_board(starting_player, "bitboard")
+    for move in moves:
+        board.move(move)
+    statistics = []
+    for options in ({"tree": "objects"}, {"solver": False, "rave": 0, "progressive_bias": 0}):
+        random.seed(7)
+        agent = MCTS_Agent(1500, reuse_tree=False, **options)
+        statistics.append(agent.root_statistics(agent.search(board)))
+    assert statistics[0] == statistics[1]
@@ -0,0 +1,125 @@
+import random
+import pytest
+from connect4.board.board import make_board
+from connect4.minimax import Minimax_Agent, ALL_MOVE_ORDERING, big_value, decrease_above
+from connect4.transposition import TranspositionTable, EXACT, LOWER
+
+
+# Value of the board for the player to move, searched depth_left more moves
+# deep without pruning (the values Minimax_Agent's search gives: a win
+# loses 100 for each move before it).
+def plain_value(board, depth_left, heuristic_number):
+    best_value = -big_value
+    for move in board.get_legal_moves():
+        best_value = max(best_value, plain_move_value(board, move, depth_left, heuristic_number))
+    return best_value
+
+
+def plain_move_value(board, move, depth_left, heuristic_number):
+    turn = board.get_turn()
+    board.move(move)
+    if(board.check_win(turn)):
+        value = big_value
+    elif(board.check_full()):
+        value = 0
+    elif(depth_left == 0):
+        value = board.heuristic(heuristic_number) * turn
+    else:
+        value = -plain_value(board, depth_left - 1, heuristic_number)
+        if(value > decrease_above):
+            value -= 100
+    board.unmove()
+    return value
+
+
+# Random positions that aren't over
+def random_positions(count, backend="bitboard", seed=441, max_moves=36):
+    generator = random.Random(seed)
+    positions = []
+    while(len(positions) < count):
+        board = make_board(generator.choice([1, -1]), backend)
+        for ply in range(generator.randrange(0, max_moves)):
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            if(board.check_win(turn) or board.check_full()):
+                break
+        else:
+            positions.append(board)
+    return positions
+
+
+# Agent settings whose search values must equal the plain search's
+SETTINGS = {
+    "alpha-beta": {"transposition_table_size": 0, "move_ordering": ()},
+    "table": {"move_ordering": ()},
+    "center": {"transposition_table_size": 0, "move_ordering": ("center",)},
+    "threats": {"transposition_table_size": 0, "move_ordering": ("threats",)},
+    "killers, history": {"move_ordering": ("killers", "history")},
+    "all ordering": {},
+    "pvs": {"transposition_table_size": 0, "pvs": True},
+    "table, pvs": {"pvs": True},
+    "batch leaves": {"pvs": True, "batch_leaves": True},
+    "symmetry": {"pvs": True, "symmetry": True},
+    "small table": {"transposition_table_size": 64, "pvs": True},
+}
+
+
+@pytest.mark.parametrize("name", list(SETTINGS))
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_search_matches_plain_minimax(name, depth):
+    for board in random_positions(15, seed=depth):
+        agent = Minimax_Agent(depth, **SETTINGS[name])
+        move = agent.get_move(board)
+        value = plain_value(board, depth, 1)
+        assert agent.get_last_search_info()["value"] == value
+        assert plain_move_value(board, move, depth, 1) == value
+
+
+# The moves are the same too (ties go to the middle-most move whatever the
+# order the moves are searched in)
+def test_same_moves_at_depth_5():
+    for board in random_positions(8, seed=5, max_moves=20):
+        moves = set()
+        values = set()
+        for name in ("alpha-beta", "all ordering", "table, pvs"):
+            agent = Minimax_Agent(5, **SETTINGS[name])
+            moves.add(agent.get_move(board))
+            values.add(agent.get_last_search_info()["value"])
+        assert len(moves) == 1 and len(values) == 1
+
+
+def test_numpy_board_same_as_bitboard():
+    for numpy_board, bitboard in zip(random_positions(10, "numpy", seed=9), random_positions(10, "bitboard", seed=9)):
+        assert Minimax_Agent(3, pvs=True).get_move(numpy_board) == Minimax_Agent(3, pvs=True).get_move(bitboard)
+
+
+def test_transposition_table_is_bounded():
+    table = TranspositionTable(16)
+    for hash in range(1000):
+        table.store(hash, 1, EXACT, hash, 3)
+    assert table.count() <= 16
+    assert table.probe(999) == (999, 1, EXACT, 999, 3, 0)
+    assert table.probe(3) == None
+    # Within a search, a deeper entry isn't replaced by a shallower one
+    table.store(999 + 16, 0, LOWER, 5, 2)
+    assert table.probe(999 + 16) == None
+    # A new search can replace it
+    table.new_search()
+    table.store(999 + 16, 0, LOWER, 5, 2)
+    assert table.probe(999 + 16) == (999 + 16, 0, LOWER, 5, 2, 1)
+
+
+def test_iterative_deepening_finds_a_move():
+    for board in random_positions(5, seed=11):
+        agent = Minimax_Agent(4)
+        move = agent.get_move(board, time_limit_ms=50, max_depth=3)
+        info = agent.get_last_search_info()
+        assert move in board.get_legal_moves()
+        assert info["depth"] <= 3
+        if(info["depth"] == 3):
+            assert info["value"] == plain_value(board, 3, 1)
+
+
+def test_unknown_heuristic():
+    with pytest.raises(ValueError, match="Unknown heuristic 3"):
+        Minimax_Agent(4, heuristic_number=3)
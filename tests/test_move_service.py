@@ -0,0 +1,148 @@
+import asyncio
+import json
+import random
+from connect4.board.board import make_board
+from connect4.minimax import Minimax_Agent
+from connect4.move_service import MoveService, batched_moves, serve_lines
+
+
+# Positions of random games that aren't over: (starting player, moves)
+def random_positions(count, seed=441):
+    generator = random.Random(seed)
+    positions = []
+    while(len(positions) < count):
+        starting_player = generator.choice([1, -1])
+        board = make_board(starting_player, "bitboard")
+        for ply in range(generator.randrange(0, 30)):
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            if(board.check_win(turn) or board.check_full()):
+                break
+        else:
+            positions.append((starting_player, "".join(str(move) for move in board.get_moves())))
+    return positions
+
+
+def position_board(starting_player, moves):
+    board = make_board(starting_player, "bitboard")
+    for move in moves:
+        board.move(int(move))
+    return board
+
+
+# The move and value of a new agent
+def agent_move(board, depth, heuristic_number):
+    agent = Minimax_Agent(depth, heuristic_number, solve_below=0)
+    move = agent.get_move(board)
+    return move, agent.get_last_search_info()["value"]
+
+
+def test_batched_moves_match_agent():
+    boards = [position_board(*position) for position in random_positions(40)]
+    for depth in (0, 1, 2, 3):
+        for heuristic_number in (0, 1, 2):
+            expected = [agent_move(board, depth, heuristic_number) for board in boards]
+            assert batched_moves(boards, depth, heuristic_number) == expected
+
+
+# Send the requests as JSON lines, all at once, and return the answers by id
+def serve(requests, workers=2):
+    lines = [json.dumps(request) + "\n" for request in requests]
+    answers = {}
+    async def readline():
+        return lines.pop(0) if lines else ""
+    async def write(text):
+        answer = json.loads(text)
+        answers[answer["id"]] = answer
+    async def run():
+        service = MoveService(workers)
+        await service.start()
+        try:
+            await serve_lines(service, readline, write)
+        finally:
+            await service.close()
+    asyncio.run(run())
+    return answers
+
+
+def test_concurrent_games_match_agent():
+    # Depths 1 and 2 are batched, 3 and 4 go to the workers. Every request
+    # gets its own agent name, so the workers' agents start out new.
+    requests = []
+    for index, (starting_player, moves) in enumerate(random_positions(16, seed=7)):
+        depth = index % 4 + 1
+        requests.append({"id": index, "agent": f"minimax:depth={depth},solve_below=0,name=game{index}",
+                         "moves": moves, "starting_player": starting_player})
+    answers = serve(requests)
+    assert len(answers) == len(requests)
+    for request in requests:
+        answer = answers[request["id"]]
+        assert "error" not in answer
+        depth = request["id"] % 4 + 1
+        board = position_board(request["starting_player"], request["moves"])
+        assert answer["move"] == agent_move(board, depth, 1)[0]
+        assert ("batch_size" in answer["info"]) == (depth <= 2)
+
+
+def test_bad_requests():
+    answers = serve([{"id": 1, "moves": "3333333"}, {"id": 2, "agent": {"type": "nope"}},
+                     {"id": 3, "agent": "minimax:depth=1,heuristic=7"}, {"id": 4, "agent": "minimax:heuristic=7"},
+                     {"id": 5, "agent": "minimax:depth=1", "moves": "33"}], workers=1)
+    for id in (1, 2, 3, 4):
+        assert "error" in answers[id]
+    assert answers[3]["error"] == "Unknown heuristic 7 (choose from 0, 1, 2)"
+    # The batched requests are still answered after a bad one
+    assert answers[5]["move"] in range(7)
+
+
+# The service over stdin/stdout in its own process. Each request is sent
+# once the last one was answered, so the worker processes start while the
+# stdin thread is blocked reading (see worker_context). The service must
+# answer every request and exit once stdin is closed.
+def test_stdio_service():
+    import os
+    import subprocess
+    import sys
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    process = subprocess.Popen([sys.executable, "-m", "connect4.move_service", "--stdio", "--workers", "2"],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                               env=dict(os.environ, PYTHONPATH=source))
+    try:
+        for index, moves in enumerate(["", "3", "33"]):
+            process.stdin.write(json.dumps({"id": index, "agent": "minimax:depth=3", "moves": moves}) + "\n")
+            process.stdin.flush()
+            answer = json.loads(process.stdout.readline())
+            assert answer["id"] == index and answer["move"] in range(7)
+        process.stdin.close()
+        assert process.wait(timeout=30) == 0
+    finally:
+        process.kill()
+
+
+# A batch is searched off the event loop: a request that comes in while a
+# slow batch is being searched is answered before the batch is
+def test_batch_does_not_block_loop(monkeypatch):
+    import time
+    import connect4.move_service
+    def slow_batched_moves(boards, depth, heuristic_number):
+        time.sleep(1)
+        return batched_moves(boards, depth, heuristic_number)
+    monkeypatch.setattr(connect4.move_service, "batched_moves", slow_batched_moves)
+    answered = {}
+    async def run():
+        service = MoveService(1)
+        await service.start()
+        async def request(id, agent):
+            await service.get_move({"id": id, "agent": agent, "moves": "33"})
+            answered[id] = time.perf_counter()
+        try:
+            # Start the worker process before timing
+            await service.get_move({"id": 0, "agent": "minimax:depth=3", "moves": ""})
+            batched = asyncio.create_task(request(1, "minimax:depth=1"))
+            await asyncio.sleep(0.2) # (The batch is being searched)
+            await request(2, "minimax:depth=3")
+            await batched
+        finally:
+            await service.close()
+    asyncio.run(run())
+    assert answered[2] < answered[1] - 0.5
@@ -0,0 +1,95 @@
+import random
+import tracemalloc
+from math import log, inf
+import numpy as np
+import pytest
+from connect4.board.board import make_board
+from connect4.mcts import MCTS_Agent, count_nodes
+from connect4.node_pool import NodePool, NO_RESULT, WIN, TIE, LOSS
+
+
+def position(moves, backend="bitboard"):
+    board = make_board(1, backend)
+    for move in moves:
+        board.move(move)
+    return board
+
+
+# Root children's statistics after a search with the given tree
+def search_statistics(tree, board, simulations, seed):
+    random.seed(seed)
+    agent = MCTS_Agent(simulations, tree=tree, reuse_tree=False)
+    return {action: (float(score), float(games), result)
+            for action, (score, games, result) in agent.root_statistics(agent.search(board)).items()}
+
+
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+@pytest.mark.parametrize("moves", [[], [3, 3, 2, 4], [3, 2, 3, 2, 4, 4, 2, 3, 1]])
+def test_pool_matches_objects_tree(backend, moves):
+    board = position(moves, backend)
+    for seed in (1, 2):
+        assert search_statistics("pool", board, 1000, seed) == search_statistics("objects", board, 1000, seed)
+
+
+# choose_expansion without RAVE or progressive bias, computed like the
+# vectorized version
+def reference_choice(pool, node, c):
+    children = pool.children(node)
+    games = pool.games[children.start:children.stop]
+    played_games = np.maximum(games, 1)
+    favorability = pool.score[children.start:children.stop] / played_games
+    favorability = favorability + c * np.sqrt(log(pool.games[node]) / played_games)
+    favorability[games == 0] = inf
+    results = pool.result[children.start:children.stop]
+    if(pool.solver):
+        favorability[results == WIN] = inf
+        favorability[results == LOSS] = -inf
+    else:
+        favorability[results == WIN] = 1
+    favorability[results == TIE] = 0.5
+    return children.start + int(favorability.argmax())
+
+
+@pytest.mark.parametrize("solver", [False, True])
+def test_choose_expansion(solver):
+    generator = random.Random(441)
+    for trial in range(300):
+        pool = NodePool(solver=solver)
+        root = pool.new_root(position([]))
+        pool.create_children(root, position([]))
+        for child in pool.children(root):
+            pool.games[child] = generator.choice([0, 1, 2, 5, 30])
+            pool.score[child] = generator.randint(0, 2 * pool.games[child]) / 2
+            pool.result[child] = generator.choice([NO_RESULT] * 6 + [WIN, TIE, LOSS])
+        pool.games[root] = sum(pool.games[child] for child in pool.children(root)) + 1
+        assert pool.choose_expansion(root, 1.4) == reference_choice(pool, root, 1.4)
+
+
+# Memory of the nodes built by a search (tracemalloc peak, bytes) and their number
+def tree_memory(tree, simulations=1500):
+    board = position([])
+    random.seed(441)
+    agent = MCTS_Agent(simulations, tree=tree, reuse_tree=False)
+    tracemalloc.start()
+    root = agent.search(board)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, count_nodes(root) if tree == "objects" else agent.get_last_search_info()["nodes"]
+
+
+def test_pool_bytes_per_node():
+    pool = NodePool()
+    assert pool.bytes_per_node() == 15
+    object_bytes, object_nodes = tree_memory("objects")
+    pool_bytes, pool_nodes = tree_memory("pool")
+    assert object_nodes == pool_nodes
+    # A TreeNode takes over 100 bytes (the pool's peak also counts the spare
+    # capacity and the copy made when it grows)
+    assert object_bytes / object_nodes > 7 * pool.bytes_per_node()
+    assert pool_bytes < object_bytes / 3
+
+
+def test_default_tree_is_pool():
+    agent = MCTS_Agent(50)
+    agent.get_move(position([3]))
+    assert agent.get_last_search_info()["nodes"] != None
@@ -0,0 +1,95 @@
+import itertools
+import numpy as np
+import pytest
+from connect4.board.board import make_board, mirror_move
+from connect4.minimax import Minimax_Agent
+from connect4.opening_book import (OpeningBook, BOOK_MAGIC, HEADER_SIZE, ENTRY_DTYPE, book_positions,
+                                   generate_book, write_book, position_key)
+
+PLIES = 2
+DEPTH = 4
+
+
+@pytest.fixture(scope="module")
+def book_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("book") / "book.bin"
+    generate_book(str(path), PLIES, DEPTH, workers=1)
+    return path
+
+
+def position(starting_player, moves, backend="bitboard"):
+    board = make_board(starting_player, backend)
+    for move in moves:
+        board.move(move)
+    return board
+
+
+# Every position up to PLIES moves (mirror images included)
+def all_positions():
+    for starting_player in [1, -1]:
+        for plies in range(PLIES + 1):
+            for moves in itertools.product(range(7), repeat=plies):
+                yield starting_player, list(moves)
+
+
+def test_book_positions():
+    positions = book_positions(PLIES)
+    keys = {position_key(position(starting_player, [int(move) for move in moves]))[0]
+            for starting_player, moves in positions}
+    assert len(keys) == len(positions)
+    # Mirror images share an entry: 1 + 4 + 25 positions per starting player
+    # (of the 49 after 2 moves, only 3 3 is its own mirror image)
+    assert len(positions) == 2 * (1 + 4 + 25)
+    for starting_player, moves in all_positions():
+        assert position_key(position(starting_player, moves))[0] in keys
+
+
+def test_file_format(book_path):
+    data = book_path.read_bytes()
+    count = int(np.frombuffer(data[len(BOOK_MAGIC):HEADER_SIZE], dtype="<u8")[0])
+    assert data[:len(BOOK_MAGIC)] == BOOK_MAGIC
+    assert ENTRY_DTYPE.itemsize == 18
+    assert len(data) == HEADER_SIZE + count * ENTRY_DTYPE.itemsize
+    entries = np.frombuffer(data[HEADER_SIZE:], dtype=ENTRY_DTYPE)
+    assert list(entries["key"]) == sorted(entries["key"])
+    assert set(entries["depth"]) == {DEPTH}
+    assert len(OpeningBook(book_path)) == count == len(book_positions(PLIES))
+
+
+# A lookup gives the move and value a direct search finds, for a position
+# and for its mirror image (the stored move flipped)
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+def test_lookup_matches_search(book_path, backend):
+    book = OpeningBook(book_path)
+    for starting_player, moves in all_positions():
+        board = position(starting_player, moves, backend)
+        mirrored = position(starting_player, [mirror_move(move) for move in moves], backend)
+        agent = Minimax_Agent(DEPTH)
+        move = agent.get_move(board)
+        value = agent.get_last_search_info()["value"]
+        assert book.lookup(board) == (move, value, DEPTH)
+        assert book.lookup(mirrored) == (mirror_move(move), value, DEPTH)
+        assert board.get_moves() == moves
+
+
+def test_agent_plays_book_moves(book_path):
+    agent = Minimax_Agent(DEPTH, opening_book=str(book_path))
+    board = position(1, [3, 2])
+    move = agent.get_move(board)
+    assert agent.get_last_search_info()["book"]
+    assert move == OpeningBook(book_path).lookup(board)[0]
+    # Deeper than the book: a search
+    board.move(move)
+    agent.get_move(board)
+    assert not agent.get_last_search_info()["book"]
+
+
+def test_missing_and_bad_books(tmp_path):
+    path = tmp_path / "empty.bin"
+    write_book(str(path), [])
+    book = OpeningBook(path)
+    assert len(book) == 0 and book.lookup(position(1, [])) == None
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"C4BOOK0\0" + bytes(8))
+    with pytest.raises(ValueError):
+        OpeningBook(path)
@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+import pytest
+from connect4.board.board import make_board
+from connect4.mcts import MCTS_Agent
+from connect4.minimax import Minimax_Agent
+
+
+def position(moves, backend="bitboard"):
+    board = make_board(1, backend)
+    for move in moves:
+        board.move(move)
+    return board
+
+
+# Wait until the agent has nothing left to ponder
+def wait_for_pondering(agent, timeout=60):
+    end = time.perf_counter() + timeout
+    while(agent.is_pondering()):
+        assert time.perf_counter() < end
+        time.sleep(0.01)
+
+
+def fresh_minimax(board):
+    agent = Minimax_Agent(4)
+    move = agent.get_move(board)
+    return move, agent.get_last_search_info()["value"]
+
+
+@pytest.mark.parametrize("backend", ["numpy", "bitboard"])
+def test_minimax_ponder_hit(backend):
+    board = position([3, 3, 2], backend)
+    agent = Minimax_Agent(4)
+    move = agent.get_move(board)
+    for reply in (0, 6):
+        agent.start_pondering(board, move)
+        wait_for_pondering(agent)
+        assert board.get_moves() == [3, 3, 2]
+        board.move(move)
+        board.move(reply)
+        expected = fresh_minimax(board)
+        assert agent.get_move(board) == expected[0]
+        info = agent.get_last_search_info()
+        assert info["ponder"] == True and info["value"] == expected[1]
+        board.unmove()
+        board.unmove()
+
+
+def test_minimax_ponder_miss():
+    board = position([3, 3, 2])
+    agent = Minimax_Agent(4, ponder=True)
+    move = agent.get_move(board)
+    assert agent.is_pondering()
+    wait_for_pondering(agent)
+    # The caller played another move than the agent's: nothing pondered fits
+    other_move = 0 if move != 0 else 1
+    board.move(other_move)
+    board.move(3)
+    expected = fresh_minimax(board)
+    assert agent.get_move(board) == expected[0]
+    info = agent.get_last_search_info()
+    assert "ponder" not in info and info["value"] == expected[1]
+    agent.close()
+
+
+def test_mcts_ponder_hit():
+    board = position([3, 3, 2])
+    agent = MCTS_Agent(300)
+    move = agent.get_move(board)
+    agent.start_pondering(board, move)
+    wait_for_pondering(agent)
+    assert board.get_moves() == [3, 3, 2]
+    board.move(move)
+    board.move(4)
+    assert agent.get_move(board) in board.get_legal_moves()
+    # The search went on from the pondered tree (pondering stops after 8
+    # times the simulations, spread over the replies)
+    assert agent.get_last_search_info()["games"] > 300
+
+
+def test_mcts_ponder_miss():
+    board = position([3, 3, 2])
+    agent = MCTS_Agent(300, ponder=True)
+    move = agent.get_move(board)
+    wait_for_pondering(agent)
+    other_move = 0 if move != 0 else 1
+    board.move(other_move)
+    board.move(4)
+    random.seed(441)
+    move = agent.get_move(board)
+    assert agent.get_last_search_info()["games"] == 300
+    # (The agent ponders again after its move, drawing random numbers)
+    agent.close()
+    random.seed(441)
+    assert MCTS_Agent(300).get_move(board) == move
+
+
+# stop_pondering waits until the thread is gone, and the agent's
+# searches never touch the caller's board
+@pytest.mark.parametrize("make_agent", [lambda: Minimax_Agent(8), lambda: MCTS_Agent(100000)])
+def test_stop_pondering(make_agent):
+    board = position([3, 3])
+    hash = board.get_hash()
+    threads = threading.active_count()
+    agent = make_agent()
+    agent.start_pondering(board, 2)
+    time.sleep(0.05)
+    assert agent.is_pondering()
+    assert threading.active_count() == threads + 1
+    agent.stop_pondering()
+    assert not agent.is_pondering()
+    assert threading.active_count() == threads
+    assert board.get_moves() == [3, 3] and board.get_hash() == hash
+    # Pondering on a finished game does nothing
+    board = position([3, 2, 3, 2, 3, 2])
+    agent.start_pondering(board, 3)
+    assert not agent.is_pondering()
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from connect4.battle_agents import parse_agent
+from connect4.board.board import make_board, get_shape
+from connect4.board.bitboard import get_layout
+from connect4.selfplay import (ShardWriter, SelfPlayShard, record_dtype, play_games, generate, shard_paths,
+                               read_directory, cells_from_records, CHUNK_MAGIC)
+
+CONFIGS = [parse_agent("minimax:depth=1")]
+
+
+def metadata(shape):
+    return {"rows": shape[0], "columns": shape[1], "connect": shape[2], "agents": CONFIGS}
+
+
+# Records of random boards (numbered as games 0, 1, ...) and the boards'
+# cells
+def random_records(shape, count, seed):
+    generator = np.random.default_rng(seed)
+    layout = get_layout(get_shape(*shape))
+    records = np.zeros(count, dtype=record_dtype(get_shape(*shape)))
+    cells = []
+    for index in range(count):
+        board = make_board(1, "bitboard", *shape)
+        for ply in range(generator.integers(0, 12)):
+            legal_moves = board.get_legal_moves()
+            board.move(int(legal_moves[generator.integers(len(legal_moves))]))
+        records[index]["pieces"] = np.frombuffer(board.get_pieces(1).to_bytes(layout.bytes, "little") +
+                                                 board.get_pieces(-1).to_bytes(layout.bytes, "little"),
+                                                 dtype=np.uint8).reshape(2, layout.bytes)
+        records[index]["turn"] = board.get_turn()
+        records[index]["game"] = index
+        cells.append(board.get_board())
+    return records, np.array(cells)
+
+
+@pytest.mark.parametrize("shape", [(6, 7, 4), (8, 7, 5)])
+def test_cells_round_trip(tmp_path, shape):
+    path = tmp_path / "shard.c4sp"
+    records, cells = random_records(shape, 50, 1)
+    writer = ShardWriter(path, metadata(shape))
+    writer.write(records, 50)
+    writer.close()
+    shard = SelfPlayShard(path)
+    assert shard.metadata == metadata(shape) and len(shard) == 50 and shard.get_game_count() == 50
+    assert (shard.records() == records).all()
+    assert (shard.cells(shard.records()) == cells).all()
+
+
+def test_append_to_shard(tmp_path):
+    path = tmp_path / "shard.c4sp"
+    shape = (6, 7, 4)
+    first, first_cells = random_records(shape, 20, 1)
+    second, second_cells = random_records(shape, 30, 2)
+    writer = ShardWriter(path, metadata(shape))
+    writer.write(first, 20)
+    writer.close()
+    writer = ShardWriter(path, metadata(shape))
+    assert writer.get_record_count() == 20 and writer.get_game_count() == 20
+    writer.write(second, 30)
+    writer.close()
+    shard = SelfPlayShard(path)
+    assert [len(chunk) for chunk in shard.chunks()] == [20, 30]
+    assert shard.get_game_count() == 50
+    # Game numbers go on from the games already in the shard
+    assert list(shard.records()["game"]) == list(range(50))
+    assert (shard.cells(shard.records()) == np.concatenate([first_cells, second_cells])).all()
+    with pytest.raises(ValueError):
+        ShardWriter(path, metadata((8, 7, 5)))
+
+
+# A chunk cut short isn't read, and the next writer replaces it
+@pytest.mark.parametrize("cut", [2, len(CHUNK_MAGIC) + 8, len(CHUNK_MAGIC) + 8 + 100])
+def test_truncated_chunk(tmp_path, cut):
+    path = tmp_path / "shard.c4sp"
+    shape = (6, 7, 4)
+    records, cells = random_records(shape, 20, 1)
+    writer = ShardWriter(path, metadata(shape))
+    writer.write(records[:10], 10)
+    writer.write(records[10:], 10)
+    writer.close()
+    size = path.stat().st_size
+    last_chunk = len(CHUNK_MAGIC) + 8 + 10 * records.dtype.itemsize
+    with open(path, "r+b") as file:
+        file.truncate(size - last_chunk + cut)
+    shard = SelfPlayShard(path)
+    assert len(shard) == 10 and shard.get_game_count() == 10
+    assert (shard.cells(shard.records()) == cells[:10]).all()
+    writer = ShardWriter(path, metadata(shape))
+    assert writer.get_record_count() == 10
+    writer.write(records[10:], 10)
+    writer.close()
+    assert path.stat().st_size == size
+    assert (SelfPlayShard(path).cells(SelfPlayShard(path).records()) == cells).all()
+
+
+# Every record of a game is the position before its move: the next record
+# of the game has one more piece, in that move's column
+def test_play_games():
+    shape = (6, 7, 4)
+    records, games = play_games(CONFIGS, shape, 4, 2, 441)
+    assert games == 4 and len(records) > 0
+    cells = cells_from_records(records, get_shape(*shape))
+    for index in range(len(records) - 1):
+        if(records[index]["game"] != records[index + 1]["game"]):
+            continue
+        changed = np.flatnonzero(cells[index + 1] != cells[index])
+        assert len(changed) == 1 and changed[0] % 7 == records[index]["move"]
+        assert cells[index + 1][changed[0]] == records[index]["turn"]
+        assert records[index + 1]["turn"] == -records[index]["turn"]
+    assert set(records["result"]) <= {-1, 0, 1}
+
+
+def test_generate_appends(tmp_path):
+    directory = tmp_path / "data"
+    written = generate(directory, CONFIGS, 3, workers=1, seed=1, games_per_task=2)
+    written += generate(directory, CONFIGS, 2, workers=1, seed=2, games_per_task=2)
+    assert len(shard_paths(directory)) == 1
+    shard = SelfPlayShard(shard_paths(directory)[0])
+    assert len(shard) == written and shard.get_game_count() == 5
+    assert sum(len(records) for shard, records in read_directory(directory)) == written
+    # Other settings start a new shard
+    generate(directory, CONFIGS, 1, workers=1, seed=3, shape=(8, 7, 5))
+    assert len(shard_paths(directory)) == 2
@@ -0,0 +1,135 @@
+import multiprocessing
+import random
+from multiprocessing import shared_memory
+import pytest
+from connect4.board.board import make_board
+from connect4.minimax import Minimax_Agent
+from connect4.shared_table import SharedTranspositionTable, HEADER, SLOT
+from connect4.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+@pytest.fixture
+def shared_table():
+    table = SharedTranspositionTable(64)
+    yield table
+    table.close()
+
+
+def position(moves):
+    board = make_board(1, "bitboard")
+    for move in moves:
+        board.move(move)
+    return board
+
+
+# Read the bytes of the slot of a hash, or write them
+def shared_table_slot(table, hash, data=None):
+    memory = shared_memory.SharedMemory(name=table.get_name())
+    try:
+        offset = HEADER.size + (hash % 64) * SLOT.size
+        if(data == None):
+            return bytes(memory.buf[offset:offset + SLOT.size])
+        memory.buf[offset:offset + SLOT.size] = data
+    finally:
+        memory.close()
+
+
+def test_same_entries_as_transposition_table(shared_table):
+    table = TranspositionTable(64)
+    generator = random.Random(441)
+    for store in range(3000):
+        if(generator.random() < 0.01):
+            table.new_search()
+            shared_table.new_search()
+        hash = generator.getrandbits(64)
+        if(generator.random() < 0.5):
+            hash = generator.randrange(200) # (The same positions again)
+        value = generator.choice([generator.randint(-100000, 100000), generator.uniform(-50, 50)])
+        arguments = (hash, generator.randrange(40), generator.choice([EXACT, LOWER, UPPER]), value,
+                     generator.choice([None, 0, 3, 6]))
+        table.store(*arguments)
+        shared_table.store(*arguments)
+        probe = generator.choice([hash, generator.randrange(200)])
+        entry = shared_table.probe(probe)
+        assert entry == table.probe(probe)
+        if(entry != None):
+            assert type(entry[3]) == type(table.probe(probe)[3])
+    assert shared_table.count() == table.count()
+
+
+# A slot whose words don't go together (a write from another process that
+# was torn, or any other damage) reads as empty
+@pytest.mark.parametrize("word", [0, 1, 2])
+def test_corrupted_slot_is_a_miss(shared_table, word):
+    shared_table.store(100, 5, EXACT, 1.5, 3)
+    assert shared_table.probe(100) == (100, 5, EXACT, 1.5, 3, 0)
+    slot = bytearray(shared_table_slot(shared_table, 100))
+    slot[word * 8] ^= 0x10
+    shared_table_slot(shared_table, 100, bytes(slot))
+    assert shared_table.probe(100) == None
+
+
+# Slots written together from different entries (as if two processes
+# stored at the same time) read as empty too
+def test_torn_write_is_a_miss(shared_table):
+    shared_table.store(100, 5, EXACT, 1.5, 3)
+    first = shared_table_slot(shared_table, 100)
+    shared_table.store(100 + 64, 9, LOWER, -7, 2)
+    second = shared_table_slot(shared_table, 100)
+    for word in range(3):
+        torn = second[:word * 8] + first[word * 8:(word + 1) * 8] + second[(word + 1) * 8:]
+        shared_table_slot(shared_table, 100, torn)
+        assert shared_table.probe(100) == None
+        assert shared_table.probe(100 + 64) == None
+
+
+# Helpers stop at the table's stop flag (checked every 256 positions)
+def test_stop_flag(shared_table):
+    agent = Minimax_Agent(0, solve_below=0, transposition_table=shared_table)
+    shared_table.set_stop(True)
+    assert shared_table.stop_requested()
+    assert agent.help_search(position([]), 20, 1) <= 256
+    shared_table.set_stop(False)
+    assert not shared_table.stop_requested()
+    assert agent.help_search(position([]), 3, 1) > 0
+
+
+# What a helper leaves in the table doesn't change the search's results
+# (helpers of a fixed depth search go no deeper than it)
+@pytest.mark.parametrize("moves", [[], [3, 3, 2, 4], [3, 2, 3, 2, 4, 4, 2, 3, 1], [2, 3, 3, 4, 4, 1, 5]])
+def test_helper_entries_keep_results(shared_table, moves):
+    board = position(moves)
+    agent = Minimax_Agent(5)
+    move = agent.get_move(board)
+    helper = Minimax_Agent(0, solve_below=0, transposition_table=shared_table)
+    helper.help_search(board, 5, 2)
+    shared_agent = Minimax_Agent(5, transposition_table=shared_table)
+    assert shared_agent.get_move(board) == move
+    assert shared_agent.get_last_search_info()["value"] == agent.get_last_search_info()["value"]
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+@pytest.mark.parametrize("moves", [[], [3, 3, 2, 4], [3, 2, 3, 2, 4, 4, 2, 3, 1]])
+def test_parallel_same_as_one_worker(moves, workers):
+    board = position(moves)
+    agent = Minimax_Agent(5, workers=1)
+    parallel_agent = Minimax_Agent(5, workers=workers)
+    try:
+        assert parallel_agent.get_move(board) == agent.get_move(board)
+        assert parallel_agent.get_last_search_info()["value"] == agent.get_last_search_info()["value"]
+        assert board.get_moves() == moves
+    finally:
+        parallel_agent.close()
+
+
+def test_helpers_exit_after_close():
+    agent = Minimax_Agent(3, workers=3)
+    agent.get_move(position([3]))
+    assert len(multiprocessing.active_children()) == 2
+    agent.close()
+    assert multiprocessing.active_children() == []
+    # The next get_move starts them again
+    agent.get_move(position([3, 3]))
+    assert len(multiprocessing.active_children()) == 2
+    agent.close()
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,111 @@
+import random
+import pytest
+from connect4.board.board import make_board
+from connect4.minimax import Minimax_Agent, big_value
+from connect4.solver import Solver
+
+
+# Score of the board for the player to move, from every line to the end of
+# the game (no pruning; positions are remembered by hash). Same scale as
+# Solver: a win with the p-th move from now scores empty_cells + 1 - p.
+def brute_force(board, empty_cells, memo):
+    key = board.get_hash()
+    if(key not in memo):
+        turn = board.get_turn()
+        if(len(board.get_winning_moves(turn)) > 0):
+            memo[key] = empty_cells
+        else:
+            best_score = -empty_cells
+            for move in board.get_legal_moves():
+                board.move(move)
+                score = 0 if board.check_full() else -brute_force(board, empty_cells - 1, memo)
+                board.unmove()
+                best_score = max(best_score, score)
+            memo[key] = best_score
+    return memo[key]
+
+
+# Score of a move for the player to move (see brute_force)
+def move_score(board, move, empty_cells, memo):
+    turn = board.get_turn()
+    board.move(move)
+    if(board.check_win(turn)):
+        score = empty_cells
+    elif(board.check_full()):
+        score = 0
+    else:
+        score = -brute_force(board, empty_cells - 1, memo)
+    board.unmove()
+    return score
+
+
+# Random positions that aren't over, with at most max_empty empty cells
+def endgame_positions(count, shape, max_empty, backend="bitboard", seed=441):
+    generator = random.Random(seed)
+    rows, columns, connect = shape
+    positions = []
+    while(len(positions) < count):
+        board = make_board(generator.choice([1, -1]), backend, rows, columns, connect)
+        empty_cells = rows * columns
+        target = generator.randint(1, max_empty)
+        while(empty_cells > target):
+            turn = board.get_turn()
+            board.move(generator.choice(board.get_legal_moves()))
+            empty_cells -= 1
+            if(board.check_win(turn) or board.check_full()):
+                break
+        else:
+            positions.append((board, empty_cells))
+    return positions
+
+
+SHAPES = [((6, 7, 4), 12), ((4, 5, 3), 12), ((4, 4, 3), 16), ((3, 6, 4), 14)]
+
+
+@pytest.mark.parametrize("shape, max_empty", SHAPES)
+@pytest.mark.parametrize("symmetry", [False, True])
+def test_strong_solve_matches_brute_force(shape, max_empty, symmetry):
+    solver = Solver("strong", symmetry=symmetry)
+    for board, empty_cells in endgame_positions(25, shape, max_empty):
+        memo = {}
+        expected = brute_force(board, empty_cells, memo)
+        move, score, plies = solver.solve(board)
+        assert score == expected
+        assert move_score(board, move, empty_cells, memo) == expected
+        assert plies == (empty_cells if score == 0 else empty_cells + 1 - abs(score))
+
+
+@pytest.mark.parametrize("shape, max_empty", SHAPES)
+def test_weak_solve_matches_brute_force(shape, max_empty):
+    solver = Solver("weak")
+    for board, empty_cells in endgame_positions(25, shape, max_empty, seed=7):
+        memo = {}
+        expected = brute_force(board, empty_cells, memo)
+        move, score, plies = solver.solve(board)
+        sign = (expected > 0) - (expected < 0)
+        assert score == sign and plies == None
+        move_sign = move_score(board, move, empty_cells, memo)
+        assert (move_sign > 0) - (move_sign < 0) == sign
+
+
+def test_both_backends_solve_the_same():
+    for backend in ("numpy", "bitboard"):
+        solver = Solver()
+        for board, empty_cells in endgame_positions(15, (6, 7, 4), 12, backend=backend, seed=3):
+            assert solver.solve(board)[1] == brute_force(board, empty_cells, {})
+
+
+def test_agent_solves_only_when_asked():
+    for board, empty_cells in endgame_positions(10, (6, 7, 4), 10, seed=5):
+        agent = Minimax_Agent(2)
+        agent.get_move(board)
+        assert not agent.get_last_search_info()["solved"]
+        solving_agent = Minimax_Agent(2, solve_below=14)
+        move = solving_agent.get_move(board)
+        info = solving_agent.get_last_search_info()
+        assert info["solved"]
+        expected = brute_force(board, empty_cells, {})
+        assert (info["value"] > 0) == (expected > 0) and (info["value"] < 0) == (expected < 0)
+        if(expected > 0):
+            assert info["value"] > big_value - 100 * empty_cells
+        assert move_score(board, move, empty_cells, {}) == expected